@@ -91,7 +91,7 @@ setup(
 
         # Specify the Python versions you support here. In particular, ensure
         # that you indicate whether you support Python 2, Python 3 or both.
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.8',
     ],
 
     # This field adds keywords for your project which will appear on the
@@ -117,7 +117,11 @@ setup(
     #
     # For an analysis of "install_requires" vs pip's requirements files see:
     # https://packaging.python.org/en/latest/requirements.html
-    install_requires=['statsmodels==0.8', 'scipy==1.0', 'numpy==1.13', 'pandas==0.21'],
+    install_requires=['scipy>=1.3.2', 'numpy>=1.17.3', 'pandas>=1.0'],
+
+    # The shards of the likelihood rely on multiprocessing.shared_memory, which is only
+    # available as of Python 3.8.
+    python_requires='>=3.8',
 
     # List additional groups of dependencies here (e.g. development
     # dependencies). Users will be able to install these using the "extras"
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+"""This module runs the benchmarks for the hot paths of the package and compares the results."""
+from auxiliary_tests import distribute_command_line_arguments
+from auxiliary_tests import process_command_line_arguments
+from auxiliary_benchmark import check_import_budget
+from auxiliary_benchmark import compare_benchmarks
+from auxiliary_benchmark import get_benchmark_fnames
+from auxiliary_benchmark import write_benchmarks
+from auxiliary_benchmark import run_benchmarks
+
+
+def run(args):
+    """Run the benchmarks or compare the results of two earlier runs."""
+    args = distribute_command_line_arguments(args)
+
+    if args['request'] in ['run']:
+        rslt = run_benchmarks(args['max_agents'])
+        fname = write_benchmarks(rslt)
+        print('\n ... results stored in ' + fname)
+
+        violations = check_import_budget(rslt)
+        if len(violations) > 0:
+            raise SystemExit('\n ... import budget exceeded: ' + ', '.join(violations))
+
+    elif args['request'] in ['compare']:
+        fname_base, fname_target = get_benchmark_fnames(args['base'], args['target'])
+
+        regressions = compare_benchmarks(fname_base, fname_target, args['tolerance'])
+        if len(regressions) > 0:
+            raise SystemExit('\n ... regressions detected: ' + ', '.join(regressions))
+
+
+if __name__ == '__main__':
+
+    args = process_command_line_arguments('benchmark')
+
+    run(args)
@@ -0,0 +1,329 @@
+"""This module contains some auxiliary functions for the benchmarking of the package."""
+from datetime import datetime
+import subprocess
+import platform
+import tempfile
+import glob
+import json
+import time
+import sys
+import os
+
+import numpy as np
+
+from trempy.interface.interface_copulpy import get_copula_nonstationary
+from trempy.shared.shared_auxiliary import determine_optimal_compensation
+from trempy.montecarlo.montecarlo_auxiliary import get_init_dict as get_truth_dict
+from trempy.shared.shared_auxiliary import get_optimal_compensations
+from trempy.shared.shared_auxiliary import dist_class_attributes
+from trempy.shared.shared_auxiliary import criterion_function
+from trempy.shared.shared_auxiliary import print_init_dict
+from trempy.config_trempy import PACKAGE_DIR
+from trempy.clsModel import ModelCls
+from trempy.read.read import read
+from trempy import simulate
+from trempy import estimate
+
+# We benchmark the simulation for an increasing number of agents and the criterion function for
+# an increasing size of the observed panel.
+SIMULATE_AGENTS = [1000, 10000, 100000, 1000000]
+CRITERION_AGENTS = [100, 1000, 10000]
+
+# We use a fixed budget of function evaluations to benchmark the estimation.
+ESTIMATE_MAXFUN = 50
+
+# The entry points may only add this budget in seconds to the import of the dependencies that
+# are required in any case. Each import is timed in a fresh interpreter.
+IMPORT_BUDGET = 0.25
+IMPORT_DEPENDENCIES = 'import numpy, pandas, scipy.optimize, scipy.special, copulpy'
+IMPORT_REPEATS = 5
+
+# The estimator of the benchmarks, the remaining options are pinned in get_init_dict().
+BENCHMARK_SETTINGS = {'optimizer': 'SCIPY-L-BFGS-B', 'maxfun': 1, 'solver': 'brenth',
+                      'warm_start': False, 'adaptive': False}
+
+
+def get_init_dict(version, num_agents=100, maxfun=1):
+    """Create a fixed initialization dictionary for the benchmarks.
+
+    The model is the truth of the Monte Carlo studies. All options of the simulation and the
+    estimation are pinned here, so the benchmarks measure the same configuration across commits.
+    """
+    init_dict = get_truth_dict(version, num_agents, 123, BENCHMARK_SETTINGS)
+
+    init_dict['SIMULATION'] = dict()
+    init_dict['SIMULATION']['agents'] = num_agents
+    init_dict['SIMULATION']['seed'] = 123
+    init_dict['SIMULATION']['file'] = 'bench'
+    init_dict['SIMULATION']['format'] = 'pickle'
+
+    init_dict['ESTIMATION'] = dict()
+    init_dict['ESTIMATION']['optimizer'] = 'SCIPY-L-BFGS-B'
+    init_dict['ESTIMATION']['maxfun'] = maxfun
+    init_dict['ESTIMATION']['agents'] = num_agents
+    init_dict['ESTIMATION']['skip'] = 0
+    init_dict['ESTIMATION']['file'] = 'bench.trempy.pkl'
+    init_dict['ESTIMATION']['start'] = 'init'
+    init_dict['ESTIMATION']['detailed'] = False
+    init_dict['ESTIMATION']['fingerprint'] = False
+    init_dict['ESTIMATION']['instrument'] = False
+    init_dict['ESTIMATION']['solver'] = 'brenth'
+    init_dict['ESTIMATION']['warm_start'] = False
+    init_dict['ESTIMATION']['adaptive'] = False
+    init_dict['ESTIMATION']['backend'] = 'serial'
+    init_dict['ESTIMATION']['workers'] = 1
+    init_dict['ESTIMATION']['shards'] = 1
+    init_dict['ESTIMATION']['chunk'] = None
+    init_dict['ESTIMATION']['presearch'] = 0
+    init_dict['ESTIMATION']['inference'] = 'none'
+    init_dict['ESTIMATION']['budget'] = None
+
+    return init_dict
+
+
+def get_model_args(fname):
+    """Distribute the model attributes that are required for the benchmarks."""
+    model_obj = ModelCls(fname)
+
+    args = [model_obj, 'paras_obj', 'questions', 'cutoffs', 'version']
+    paras_obj, questions, cutoffs, version = dist_class_attributes(*args)
+
+    if version in ['scaled_archimedean']:
+        upper, marginals = dist_class_attributes(model_obj, 'upper', 'marginals')
+        version_specific = {'upper': upper, 'marginals': marginals}
+    else:
+        version_specific = dict()
+
+    return model_obj, paras_obj, questions, cutoffs, version, version_specific
+
+
+def time_function(func, num_repeats):
+    """Time repeated calls of a function and return some summary statistics."""
+    timings = []
+    for _ in range(num_repeats):
+        start = time.perf_counter()
+        func()
+        timings += [time.perf_counter() - start]
+
+    rslt = dict()
+    rslt['best'] = float(np.min(timings))
+    rslt['median'] = float(np.median(timings))
+    rslt['repeats'] = num_repeats
+
+    return rslt
+
+
+def benchmark_optimal_compensation(rslt):
+    """Benchmark the determination of the optimal compensations."""
+    for version in ['scaled_archimedean', 'nonstationary']:
+        print_init_dict(get_init_dict(version), 'bench.trempy.ini')
+        _, paras_obj, questions, _, version, version_specific = \
+            get_model_args('bench.trempy.ini')
+
+        label = 'get_optimal_compensations_{}'.format(version)
+        rslt[label] = time_function(
+            lambda: get_optimal_compensations(version, paras_obj, questions, **version_specific),
+            10)
+
+        # We compare the Chebyshev solver to the default of brenth on the same questions.
+        label = 'get_optimal_compensations_{}_chebyshev'.format(version)
+        rslt[label] = time_function(
+            lambda: get_optimal_compensations(version, paras_obj, questions, solver='chebyshev',
+                                              **version_specific), 10)
+
+    # We time the root-finding for each question separately as their cost differs a lot. The
+    # nonstationary utility function supports all questions.
+    nparas_econ = paras_obj.attr['nparas_econ']
+    copula = get_copula_nonstationary(
+        *paras_obj.get_values('econ', 'all')[:nparas_econ],
+        discounting=paras_obj.attr['discounting'],
+        stationary_model=paras_obj.attr['stationary_model'],
+        df_other=paras_obj.attr['df_other'])
+
+    for q in questions:
+        label = 'determine_optimal_compensation_{}'.format(q)
+        rslt[label] = time_function(lambda: determine_optimal_compensation(copula, q), 10)
+
+
+def benchmark_criterion_function(rslt):
+    """Benchmark the criterion function for increasing panel sizes."""
+    for num_agents in CRITERION_AGENTS:
+        print_init_dict(get_init_dict('nonstationary', num_agents), 'bench.trempy.ini')
+        df, _ = simulate('bench.trempy.ini')
+        _, paras_obj, questions, cutoffs, version, version_specific = \
+            get_model_args('bench.trempy.ini')
+
+        nparas_econ = paras_obj.attr['nparas_econ']
+        sds = paras_obj.get_values('econ', 'all')[nparas_econ:]
+
+        label = 'criterion_function_{}'.format(num_agents)
+        rslt[label] = time_function(lambda: criterion_function(
+            df, questions, cutoffs, paras_obj, version, sds, **version_specific), 5)
+
+
+def benchmark_simulate(rslt, max_agents):
+    """Benchmark the simulation for an increasing number of agents."""
+    for num_agents in SIMULATE_AGENTS:
+        if num_agents > max_agents:
+            continue
+        print_init_dict(get_init_dict('nonstationary', num_agents), 'bench.trempy.ini')
+
+        label = 'simulate_{}'.format(num_agents)
+        rslt[label] = time_function(lambda: simulate('bench.trempy.ini'), 1)
+
+
+def benchmark_read(rslt):
+    """Benchmark the reading and writing of the initialization files."""
+    init_dict = get_init_dict('nonstationary')
+
+    rslt['print_init_dict'] = time_function(
+        lambda: print_init_dict(init_dict, 'bench.trempy.ini'), 100)
+    rslt['read'] = time_function(lambda: read('bench.trempy.ini'), 100)
+
+
+def benchmark_estimate(rslt):
+    """Benchmark an estimation with a fixed budget of function evaluations."""
+    print_init_dict(get_init_dict('nonstationary', 100, ESTIMATE_MAXFUN), 'bench.trempy.ini')
+    simulate('bench.trempy.ini')
+
+    label = 'estimate_{}'.format(ESTIMATE_MAXFUN)
+    rslt[label] = time_function(lambda: estimate('bench.trempy.ini'), 1)
+
+
+def get_import_time(statement):
+    """Time a single import statement in a fresh interpreter."""
+    code = 'import time; start = time.perf_counter(); {:}; print(time.perf_counter() - start)'
+    cmd = [sys.executable, '-c', code.format(statement)]
+    return float(subprocess.check_output(cmd))
+
+
+def benchmark_import(rslt):
+    """Benchmark the import of the entry points and of their dependencies."""
+    statements = dict()
+    statements['dependencies'] = IMPORT_DEPENDENCIES
+    for label in ['simulate', 'estimate']:
+        statements[label] = 'from trempy import ' + label
+
+    for label, statement in statements.items():
+        timings = [get_import_time(statement) for _ in range(IMPORT_REPEATS)]
+        rslt['import_{}'.format(label)] = {'best': float(np.min(timings)),
+                                           'median': float(np.median(timings)),
+                                           'repeats': IMPORT_REPEATS}
+
+
+def check_import_budget(rslt):
+    """Return the entry points whose import exceeds the budget on top of their dependencies."""
+    base = rslt['import_dependencies']['median']
+
+    violations = []
+    for label in ['simulate', 'estimate']:
+        if rslt['import_{}'.format(label)]['median'] > base + IMPORT_BUDGET:
+            violations += [label]
+
+    return violations
+
+
+def run_benchmarks(max_agents):
+    """Run all benchmarks and return the results."""
+    rslt = dict()
+
+    # All files are written to a temporary directory so we do not clutter the working directory.
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())
+
+    try:
+        benchmark_import(rslt)
+        benchmark_read(rslt)
+        benchmark_optimal_compensation(rslt)
+        benchmark_criterion_function(rslt)
+        benchmark_simulate(rslt, max_agents)
+        benchmark_estimate(rslt)
+    finally:
+        os.chdir(cwd)
+
+    return rslt
+
+
+def get_commit():
+    """Return the identifier of the current commit of the package."""
+    cmd = ['git', 'rev-parse', '--short', 'HEAD']
+    commit = subprocess.check_output(cmd, cwd=PACKAGE_DIR).decode('utf-8').strip()
+
+    # We flag results that do not correspond to a committed state of the package.
+    cmd = ['git', 'status', '--porcelain', '--untracked-files=no']
+    if subprocess.check_output(cmd, cwd=PACKAGE_DIR).decode('utf-8').strip() != '':
+        commit += '-dirty'
+
+    return commit
+
+
+def write_benchmarks(rslt):
+    """Write the results of the benchmarks to a file that is specific to the commit."""
+    commit = get_commit()
+
+    info = dict()
+    info['commit'] = commit
+    info['date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    info['python'] = platform.python_version()
+    info['machine'] = platform.node()
+    info['benchmarks'] = rslt
+
+    fname = 'benchmark.{}.trempy.json'.format(commit)
+    with open(fname, 'w') as outfile:
+        json.dump(info, outfile, indent=4, sort_keys=True)
+
+    return fname
+
+
+def get_benchmark_fnames(base=None, target=None):
+    """Return the files with the results for the two commits to compare.
+
+    If no commits are specified, we compare the two most recent runs.
+    """
+    fnames = sorted(glob.glob('benchmark.*.trempy.json'), key=os.path.getmtime)
+
+    rslt = []
+    for commit, default in [(base, -2), (target, -1)]:
+        if commit is not None:
+            rslt += ['benchmark.{}.trempy.json'.format(commit)]
+        elif len(fnames) >= 2:
+            rslt += [fnames[default]]
+        else:
+            raise AssertionError('not enough benchmark results available')
+
+    return rslt
+
+
+def compare_benchmarks(fname_base, fname_target, tolerance):
+    """Compare the results of two benchmark runs and return the detected regressions."""
+    benchmarks = []
+    for fname in [fname_base, fname_target]:
+        with open(fname) as infile:
+            benchmarks += [json.load(infile)['benchmarks']]
+    base, target = benchmarks
+
+    regressions = []
+
+    with open('compare.trempy.info', 'w') as outfile:
+        outfile.write('\n {:<25} {:<40}\n'.format('Base', fname_base))
+        outfile.write(' {:<25} {:<40}\n\n'.format('Target', fname_target))
+
+        fmt_ = ' {:<45}' + '{:>15}' * 3 + '{:>15}\n'
+        outfile.write(fmt_.format('Benchmark', 'Base', 'Target', 'Ratio', ''))
+        outfile.write('\n')
+
+        for label in sorted(set(base.keys()) & set(target.keys())):
+            stat_base, stat_target = base[label]['best'], target[label]['best']
+            ratio = stat_target / stat_base
+
+            flag = ''
+            if ratio > 1.0 + tolerance:
+                flag = 'REGRESSION'
+                regressions += [label]
+
+            line = [label] + ['{:15.5f}'.format(stat) for stat in [stat_base, stat_target, ratio]]
+            outfile.write(fmt_.format(*line + [flag]))
+
+        outfile.write('\n Regressions {:>10}\n'.format(len(regressions)))
+
+    return regressions
@@ -1,12 +1,15 @@
 """This module contains some auxiliary functions for the property testing."""
 from datetime import datetime
 import importlib
+import traceback
+import tempfile
 import shutil
 import glob
 import os
 
 import numpy as np
 
+from trempy.shared.shared_auxiliary import floating_point_policy
 from trempy.config_trempy import PACKAGE_DIR
 
 
@@ -23,7 +26,46 @@ def run_property_test(module, test, dirname=None):
         os.mkdir(dirname)
         os.chdir(dirname)
 
-    test_fun()
+    floating_point_policy(test_fun)()
+
+
+def run_property_case(test_dict, seed, queue):
+    """This function runs a single property test in its own sandbox and reports the result."""
+    module, test = choose_test(test_dict, seed)
+
+    cwd, dirname = os.getcwd(), tempfile.mkdtemp()
+    msg = None
+    try:
+        run_property_test(module, test, dirname)
+    except Exception:
+        msg = traceback.format_exc()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(dirname, ignore_errors=True)
+
+    queue.put((module, test, seed, msg))
+
+
+def choose_test(test_dict, seed):
+    """This function chooses a test based on the seed.
+
+    The test then continues with the same state of the random number generator, so each failure
+    is reproduced by its seed alone.
+    """
+    np.random.seed(seed)
+    module = choose_module(test_dict)
+    test = np.random.choice(test_dict[module])
+
+    return module, test
+
+
+def choose_module(inp_dict):
+    """Chooses a module with probability proportional to number of stored tests."""
+    prob_dist = np.array([])
+    for module in inp_dict.keys():
+        prob_dist = np.append(prob_dist, len(inp_dict[module]))
+    prob_dist = prob_dist / np.sum(prob_dist)
+    return np.random.choice(list(inp_dict.keys()), p=prob_dist)
 
 
 def collect_tests():
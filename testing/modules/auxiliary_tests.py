@@ -35,6 +35,12 @@ def distribute_command_line_arguments(args):
     except AttributeError:
         pass
 
+    for label in ['max_agents', 'base', 'target', 'tolerance', 'workers']:
+        try:
+            rslt[label] = getattr(args, label)
+        except AttributeError:
+            pass
+
     rslt['is_check'] = rslt['request'] in ['check', 'investigate']
 
     return rslt
@@ -48,16 +54,20 @@ def cleanup():
 def process_command_line_arguments(which):
     """This function processes the command line arguments for the test battery."""
     is_request, is_hours, is_seed, is_test, is_update = False, False, False, False, False
+    is_benchmark, is_workers = False, False
 
     if which == 'robustness':
         msg = 'Test robustness of package'
         is_request, is_hours, is_seed = True, True, True
     elif which == 'regression':
         msg = 'Test package for regressions'
-        is_request, is_test, is_update = True, True, True
+        is_request, is_test, is_update, is_workers = True, True, True, True
     elif which == 'property':
         msg = 'Property testing of package'
-        is_request, is_seed, is_hours = True, True, True
+        is_request, is_seed, is_hours, is_workers = True, True, True, True
+    elif which == 'benchmark':
+        msg = 'Benchmark the package'
+        is_request, is_benchmark = True, True
     else:
         raise NotImplementedError
 
@@ -67,6 +77,9 @@ def process_command_line_arguments(which):
         if which == 'regression':
             parser.add_argument('--request', action='store', dest='request', help='task to perform',
                                 required=True, choices=['check', 'create'])
+        elif which == 'benchmark':
+            parser.add_argument('--request', action='store', dest='request', help='task to perform',
+                                required=True, choices=['run', 'compare'])
         else:
             parser.add_argument('--request', action='store', dest='request', help='task to perform',
                                 required=True, choices=['run', 'investigate'])
@@ -85,6 +98,20 @@ def process_command_line_arguments(which):
         parser.add_argument('--update', action='store_true', dest='is_update', required=False,
                             help='update regression vault')
 
+    if is_workers:
+        parser.add_argument('--workers', action='store', dest='workers', type=int, default=None,
+                            help='number of worker processes')
+
+    if is_benchmark:
+        parser.add_argument('--agents', action='store', dest='max_agents', type=int,
+                            default=1000000, help='maximum number of simulated agents')
+        parser.add_argument('--base', action='store', dest='base', default=None,
+                            help='commit of the baseline results')
+        parser.add_argument('--target', action='store', dest='target', default=None,
+                            help='commit of the results to compare')
+        parser.add_argument('--tolerance', action='store', dest='tolerance', type=float,
+                            default=0.10, help='relative slowdown flagged as regression')
+
     return parser.parse_args()
 
 
@@ -2,34 +2,24 @@
 """This module is the first attempt to start some regression tests."""
 from datetime import timedelta
 from datetime import datetime
+import multiprocessing
 import functools
-import traceback
-import shutil
 import random
+import queue
 import os
 
-import numpy as np
-
 from auxiliary_tests import distribute_command_line_arguments
-from trempy.tests.test_auxiliary import get_random_string
 from auxiliary_tests import process_command_line_arguments
+from auxiliary_property import run_property_case
 from auxiliary_property import run_property_test
 from auxiliary_tests import send_notification
 from auxiliary_property import print_rslt_ext
 from auxiliary_property import collect_tests
+from auxiliary_property import choose_test
 from auxiliary_property import finish
 from auxiliary_tests import cleanup
 
 
-def choose_module(inp_dict):
-    """Chooses a module with probability proportional to number of stored tests."""
-    prob_dist = np.array([])
-    for module in inp_dict.keys():
-        prob_dist = np.append(prob_dist, len(inp_dict[module]))
-    prob_dist = prob_dist / np.sum(prob_dist)
-    return np.random.choice(list(inp_dict.keys()), p=prob_dist)
-
-
 def run(args):
     """This function runs the property test battery."""
     args = distribute_command_line_arguments(args)
@@ -45,9 +35,7 @@ def run(args):
     cleanup()
 
     if args['is_check']:
-        np.random.seed(args['seed'])
-        module = choose_module(test_dict)
-        test = np.random.choice(test_dict[module])
+        module, test = choose_test(test_dict, args['seed'])
         run_property_test(module, test)
 
     else:
@@ -58,31 +46,50 @@ def run(args):
         print_rslt = functools.partial(print_rslt_ext, start, timeout)
         print_rslt(rslt, err_msg)
 
+        workers = args['workers']
+        if workers is None:
+            workers = os.cpu_count()
+
+        # Each test runs in its own process, so the tests are free to start processes themselves
+        # and a crash does not take down the whole battery.
+        results, running = multiprocessing.Queue(), dict()
         while True:
 
-            seed = random.randrange(1, 100000)
-            dirname = get_random_string()
-            np.random.seed(seed)
-            module = choose_module(test_dict)
-            test = np.random.choice(test_dict[module])
+            while len(running) < workers and timeout > datetime.now() - start:
+                seed = random.randrange(1, 100000)
+                if seed in running.keys():
+                    continue
+
+                running[seed] = multiprocessing.Process(
+                    target=run_property_case, args=(test_dict, seed, results))
+                running[seed].start()
+
+            if len(running) == 0:
+                break
 
             try:
-                run_property_test(module, test, dirname)
+                module, test, seed, msg = results.get(timeout=1.0)
+                running.pop(seed).join()
+            except queue.Empty:
+                # The results of processes that terminated regularly are still in the queue.
+                crashed = [seed for seed, process in running.items()
+                           if process.exitcode not in [None, 0]]
+                if len(crashed) == 0:
+                    continue
+
+                seed = crashed[0]
+                module, test = choose_test(test_dict, seed)
+                msg = 'process terminated with exit code {:}\n'.format(
+                    running.pop(seed).exitcode)
+
+            if msg is None:
                 rslt[module][test][0] += 1
-            except Exception:
+            else:
                 rslt[module][test][1] += 1
-                msg = traceback.format_exc()
                 err_msg += [(module, test, seed, msg)]
 
-            os.chdir('../')
-
-            shutil.rmtree(dirname)
-
             print_rslt(rslt, err_msg)
 
-            if timeout < datetime.now() - start:
-                break
-
         finish(rslt)
 
         send_notification('property', hours=args['hours'])
@@ -1,94 +1,130 @@
 #!/usr/bin/env python
 """This module is the first attempt to start some regression tests."""
-import pickle as pkl
+from concurrent.futures import ProcessPoolExecutor
+import traceback
+import tempfile
 import shutil
+import json
+import time
+import os
 
 import numpy as np
 
-from trempy.shared.shared_auxiliary import dist_class_attributes
-from trempy.shared.shared_auxiliary import criterion_function
 from auxiliary_tests import distribute_command_line_arguments
-from trempy.tests.test_regression import run_regression_test
-from trempy.tests.test_auxiliary import get_random_init
+from trempy.tests.test_regression import get_regression_stat
 from auxiliary_tests import process_command_line_arguments
+from trempy.tests.test_auxiliary import random_dict
+from trempy.tests.test_regression import write_vault
+from trempy.tests.test_regression import read_vault
 from trempy.config_trempy import PACKAGE_DIR
 from auxiliary_tests import send_notification
-from trempy.clsModel import ModelCls
-from auxiliary_tests import cleanup
-from trempy import simulate
+from auxiliary_benchmark import get_commit
 
+VAULT_FNAME = 'regression_vault.trempy.jsonl'
 
-def create_regression_vault(num_tests):
+
+def create_regression_vault(num_tests, workers=None):
     """Create a set of regression tests."""
     np.random.seed(123)
 
-    tests = []
+    # The initialization dictionaries are drawn in sequence so the vault does not depend on the
+    # number of workers.
+    init_dicts = []
     for _ in range(num_tests):
-
-        print('\n ... creating test ' + str(_))
-
         constr = dict()
         constr['maxfun'] = np.random.random_integers(1, 5)
+        init_dicts += [random_dict(constr)]
 
-        # Create and process initialization file
-        init_dict = get_random_init(constr)
-        model_obj = ModelCls('test.trempy.ini')
-        df, _ = simulate('test.trempy.ini')
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        rslt = list(executor.map(run_scratch, init_dicts))
 
-        # Distribute class attributes for further processing.
-        args = [model_obj, 'paras_obj', 'questions', 'cutoffs', 'version']
-        paras_obj, questions, cutoffs, version = dist_class_attributes(*args)
+    tests = []
+    for init_dict, (stat, seconds, message) in zip(init_dicts, rslt):
+        if message is not None:
+            raise AssertionError(message)
+        tests += [{'init_dict': init_dict, 'stat': stat, 'seconds': seconds}]
 
-        # Handle version-specific objects not included in the para_obj
-        if version in ['scaled_archimedean']:
-            upper, marginals = dist_class_attributes(*[model_obj, 'upper', 'marginals'])
-            version_specific = {'upper': upper, 'marginals': marginals}
-        elif version in ['nonstationary']:
-            version_specific = dict()
+    write_vault(tests, VAULT_FNAME)
 
-        # Get number of economic parameters. Paras with higher index belong to questions.
-        nparas_econ = paras_obj.attr['nparas_econ']
 
-        # Now get correct standard deviations. Versions are handled implicitly.
-        x_econ_all = paras_obj.get_values('econ', 'all')
-        sds = x_econ_all[nparas_econ:]
+def check_regression_vault(num_tests, workers=None):
+    """Check an existing regression tests.
 
-        # Evaluate criterion function and process results
-        stat, _ = criterion_function(df, questions, cutoffs, paras_obj,
-                                     version, sds, **version_specific)
-        tests += [(init_dict, stat)]
+    The timing of each test is written to regression.trempy.jsonl alongside the time it took
+    when the test was created.
+    """
+    tests = read_vault(PACKAGE_DIR + '/tests/' + VAULT_FNAME)[:num_tests]
 
-        cleanup()
+    init_dicts = [test['init_dict'] for test in tests]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        rslt = list(executor.map(run_scratch, init_dicts))
 
-    pkl.dump(tests, open('regression_vault.trempy.pkl', 'wb'))
+    failures, timings = [], []
+    for i, (test, (stat, seconds, message)) in enumerate(zip(tests, rslt)):
+        if message is None:
+            try:
+                np.testing.assert_almost_equal(stat, test['stat'])
+            except AssertionError as error:
+                message = str(error)
 
+        if message is not None:
+            failures += [i]
+            print('\n ... test {:} failed\n{:}'.format(i, message))
 
-def check_regression_vault(num_tests):
-    """Check an existing regression tests."""
-    fname = PACKAGE_DIR + '/tests/regression_vault.trempy.pkl'
-    tests = pkl.load(open(fname, 'rb'))
+        timings += [{'test': i, 'is_success': message is None, 'seconds': seconds,
+                     'seconds_vault': test['seconds']}]
 
-    for i, test in enumerate(tests[:num_tests]):
-        try:
-            run_regression_test(test)
-        except Exception:
-            send_notification('regression', is_failed=True, count=i)
-            raise SystemError
+    write_timings(timings)
 
-        cleanup()
+    if len(failures) > 0:
+        send_notification('regression', is_failed=True, count=failures[0])
+        raise SystemError
 
     send_notification('regression', is_failed=False, num_tests=num_tests)
 
 
+def run_scratch(init_dict):
+    """Run a single regression test in its own temporary directory.
+
+    The value of the criterion function, the time it took and a possible error message are
+    returned.
+    """
+    cwd = os.getcwd()
+    dirname = tempfile.mkdtemp()
+
+    os.chdir(dirname)
+    stat, message = None, None
+    start = time.perf_counter()
+    try:
+        stat = get_regression_stat(init_dict)
+    except Exception:
+        message = traceback.format_exc()
+    finally:
+        seconds = time.perf_counter() - start
+        os.chdir(cwd)
+        shutil.rmtree(dirname, ignore_errors=True)
+
+    return stat, seconds, message
+
+
+def write_timings(timings):
+    """Append the timing of each test to the record of all checks."""
+    with open('regression.trempy.jsonl', 'a') as outfile:
+        header = {'commit': get_commit(), 'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+        for timing in timings:
+            timing.update(header)
+            outfile.write(json.dumps(timing) + '\n')
+
+
 def run(args):
     """Create or check the regression tests."""
     args = distribute_command_line_arguments(args)
     if args['is_check']:
-        check_regression_vault(args['num_tests'])
+        check_regression_vault(args['num_tests'], args['workers'])
     else:
-        create_regression_vault(args['num_tests'])
+        create_regression_vault(args['num_tests'], args['workers'])
         if args['is_update']:
-            shutil.copy('regression_vault.trempy.pkl', PACKAGE_DIR + '/tests')
+            shutil.copy(VAULT_FNAME, PACKAGE_DIR + '/tests')
 
 
 if __name__ == '__main__':
@@ -15,6 +15,10 @@ request['regression'] = dict()
 request['regression']['run'] = True
 request['regression']['tests'] = 1000
 
+request['benchmark'] = dict()
+request['benchmark']['run'] = False
+request['benchmark']['agents'] = 1000000
+
 ####################################################################################################
 ####################################################################################################
 
@@ -33,3 +37,10 @@ if request['regression']['run']:
     cmd = PYTHON_EXEC + ' run.py --request check --tests ' + str(request['regression']['tests'])
     subprocess.check_call(cmd, shell=True)
     os.chdir('../')
+
+# benchmarking
+if request['benchmark']['run']:
+    os.chdir('benchmark')
+    cmd = PYTHON_EXEC + ' run.py --request run --agents ' + str(request['benchmark']['agents'])
+    subprocess.check_call(cmd, shell=True)
+    os.chdir('../')
@@ -1,2 +1,42 @@
-from trempy.estimate.estimate import estimate  # noqa: F401
-from trempy.simulate.simulate import simulate  # noqa: F401
+"""The entry points of the package are only imported once they are used.
+
+Their dependencies are expensive to import, which every worker process would pay for otherwise.
+The entry points estimate and simulate share their names with subpackages. The import system
+binds each subpackage to the package once it is imported, so we resolve the entry points by
+properties that take precedence.
+"""
+import importlib
+import types
+import sys
+
+ENTRY_POINTS = dict()
+ENTRY_POINTS['estimate'] = 'trempy.estimate.estimate'
+ENTRY_POINTS['simulate'] = 'trempy.simulate.simulate'
+ENTRY_POINTS['estimate_agents'] = 'trempy.estimate.estimate_agents'
+ENTRY_POINTS['bootstrap'] = 'trempy.estimate.estimate_bootstrap'
+
+
+class _PackageCls(types.ModuleType):
+    """This class resolves the entry points of the package on first access."""
+
+    def __dir__(self):
+        """Include the entry points in the attributes of the package."""
+        return sorted(set(super().__dir__()) | set(ENTRY_POINTS.keys()))
+
+
+def _get_entry_point(label):
+    """Create the property that resolves a single entry point."""
+    def get_function(_):
+        return getattr(importlib.import_module(ENTRY_POINTS[label]), label)
+
+    def set_subpackage(*_):
+        # The import system binds the subpackages, which must not replace the entry points.
+        pass
+
+    return property(get_function, set_subpackage)
+
+
+for label in ENTRY_POINTS.keys():
+    setattr(_PackageCls, label, _get_entry_point(label))
+
+sys.modules[__name__].__class__ = _PackageCls
@@ -55,6 +55,7 @@ class ModelCls(BaseCls):
         self.attr['sim_agents'] = init_dict['SIMULATION']['agents']
         self.attr['sim_seed'] = init_dict['SIMULATION']['seed']
         self.attr['sim_file'] = init_dict['SIMULATION']['file']
+        self.attr['sim_format'] = init_dict['SIMULATION']['format']
 
         # Estimation
         self.attr['est_detailed'] = init_dict['ESTIMATION']['detailed']
@@ -65,6 +66,18 @@ class ModelCls(BaseCls):
         self.attr['est_file'] = init_dict['ESTIMATION']['file']
         self.attr['maxfun'] = init_dict['ESTIMATION']['maxfun']
         self.attr['start'] = init_dict['ESTIMATION']['start']
+        self.attr['fingerprint'] = init_dict['ESTIMATION']['fingerprint']
+        self.attr['instrument'] = init_dict['ESTIMATION']['instrument']
+        self.attr['budget'] = init_dict['ESTIMATION']['budget']
+        self.attr['warm_start'] = init_dict['ESTIMATION']['warm_start']
+        self.attr['adaptive'] = init_dict['ESTIMATION']['adaptive']
+        self.attr['solver'] = init_dict['ESTIMATION']['solver']
+        self.attr['backend'] = init_dict['ESTIMATION']['backend']
+        self.attr['workers'] = init_dict['ESTIMATION']['workers']
+        self.attr['shards'] = init_dict['ESTIMATION']['shards']
+        self.attr['chunk'] = init_dict['ESTIMATION']['chunk']
+        self.attr['presearch'] = init_dict['ESTIMATION']['presearch']
+        self.attr['inference'] = init_dict['ESTIMATION']['inference']
 
         # Optimizer options
         self.attr['opt_options'] = dict()
@@ -82,6 +95,10 @@ class ModelCls(BaseCls):
         self.attr['opt_options']['SCIPY-L-BFGS-B']['ftol'] = init_dict['SCIPY-L-BFGS-B']['ftol']
         self.attr['opt_options']['SCIPY-L-BFGS-B']['eps'] = init_dict['SCIPY-L-BFGS-B']['eps']
 
+        self.attr['opt_options']['BHHH'] = dict()
+        self.attr['opt_options']['BHHH']['gtol'] = init_dict['BHHH']['gtol']
+        self.attr['opt_options']['BHHH']['eps'] = init_dict['BHHH']['eps']
+
         para_objs = paras_obj.get_attr('para_objs')
 
         questions = []
@@ -115,7 +132,7 @@ class ModelCls(BaseCls):
 
         # Group block labels: basis labels and version specific labels.
         basis_labels = ['VERSION', 'SIMULATION', 'ESTIMATION', 'SCIPY-BFGS',
-                        'SCIPY-POWELL', 'SCIPY-L-BFGS-B', 'CUTOFFS', 'QUESTIONS']
+                        'SCIPY-POWELL', 'SCIPY-L-BFGS-B', 'BHHH', 'CUTOFFS', 'QUESTIONS']
         version_labels = []
         if version in ['scaled_archimedean']:
             version_labels += ['UNIATTRIBUTE SELF', 'UNIATTRIBUTE OTHER', 'MULTIATTRIBUTE COPULA']
@@ -139,6 +156,7 @@ class ModelCls(BaseCls):
         init_dict['SIMULATION']['agents'] = self.attr['sim_agents']
         init_dict['SIMULATION']['seed'] = self.attr['sim_seed']
         init_dict['SIMULATION']['file'] = self.attr['sim_file']
+        init_dict['SIMULATION']['format'] = self.attr['sim_format']
 
         # 3) Estimation
         init_dict['ESTIMATION']['detailed'] = self.attr['est_detailed']
@@ -148,6 +166,18 @@ class ModelCls(BaseCls):
         init_dict['ESTIMATION']['file'] = self.attr['est_file']
         init_dict['ESTIMATION']['maxfun'] = self.attr['maxfun']
         init_dict['ESTIMATION']['start'] = self.attr['start']
+        init_dict['ESTIMATION']['fingerprint'] = self.attr['fingerprint']
+        init_dict['ESTIMATION']['instrument'] = self.attr['instrument']
+        init_dict['ESTIMATION']['budget'] = self.attr['budget']
+        init_dict['ESTIMATION']['warm_start'] = self.attr['warm_start']
+        init_dict['ESTIMATION']['adaptive'] = self.attr['adaptive']
+        init_dict['ESTIMATION']['solver'] = self.attr['solver']
+        init_dict['ESTIMATION']['backend'] = self.attr['backend']
+        init_dict['ESTIMATION']['workers'] = self.attr['workers']
+        init_dict['ESTIMATION']['shards'] = self.attr['shards']
+        init_dict['ESTIMATION']['chunk'] = self.attr['chunk']
+        init_dict['ESTIMATION']['presearch'] = self.attr['presearch']
+        init_dict['ESTIMATION']['inference'] = self.attr['inference']
 
         # 4+5) Optimizer options
         init_dict['SCIPY-BFGS'] = dict()
@@ -163,6 +193,10 @@ class ModelCls(BaseCls):
         init_dict['SCIPY-L-BFGS-B']['ftol'] = self.attr['opt_options']['SCIPY-L-BFGS-B']['ftol']
         init_dict['SCIPY-L-BFGS-B']['eps'] = self.attr['opt_options']['SCIPY-L-BFGS-B']['eps']
 
+        init_dict['BHHH'] = dict()
+        init_dict['BHHH']['gtol'] = self.attr['opt_options']['BHHH']['gtol']
+        init_dict['BHHH']['eps'] = self.attr['opt_options']['BHHH']['eps']
+
         # 6) Cutoffs
         init_dict['CUTOFFS'] = self.attr['cutoffs']
 
@@ -20,12 +20,21 @@ TINY_FLOAT = 10e-20
 
 NEVER_SWITCHERS = 9999
 
+# The exact sums of the log-likelihood contributions are integers in units of the smallest
+# subnormal number divided by 2 ** 53.
+EXACT_SCALE = 2 ** 1127
+
 # We set the range of questions that are possible to handle.
 QUESTIONS_ALL = list(range(1, 46))
 
+# The nonstationary utility function has discount factors and weights for these delays in months.
+DELAYS = np.array([0, 1, 3, 6, 12, 24])
+
 # We want to be strict about any problems due to floating-point errors. However, during estimation,
-# we might have a problem with UNDERFLOW when evaluating the probability density function.
-np.seterr(divide='raise', over='raise', invalid='raise', under='ignore')
+# we might have a problem with UNDERFLOW when evaluating the probability density function. The
+# policy is only active in the entry points, so importing the package leaves the global settings
+# of NUMPY untouched.
+FLOATING_POINT = {'divide': 'raise', 'over': 'raise', 'invalid': 'raise', 'under': 'ignore'}
 
 # We need to impose some bounds on selected estimation parameters. The bounds are included in the
 # package's admissible values.
@@ -136,3 +145,58 @@ LOTTERY_BOUNDS = {
     44: [-5.0000, 5.0000],
     45: [-2.0000, 5.0000],
 }
+
+# The warm-started root-finding starts with a bracket around the previous solution. Its initial
+# half-width is this share of the width of the full bracket and it doubles after each failure.
+WARM_START_WIDTH = 0.01
+
+# The cache of the validated requests for the observed datasets keeps at most this number of
+# entries, where only the most recent version of each dataset is retained.
+FINGERPRINT_MAX = 100
+
+# The adaptive tolerance policy solves for the optimal compensations with loose tolerances while
+# the criterion function still improves quickly. The last tolerance is the default of brenth.
+XTOL_SCHEDULE = [1e-4, 1e-6, 1e-8, 1e-10, 2e-12]
+
+# We move to the next tolerance once the relative improvement of the criterion function over the
+# number of evaluations in the window falls below the threshold.
+XTOL_WINDOW = 10
+XTOL_PROGRESS = 1e-3
+
+# The tolerance needs to be small relative to the step size of the finite-difference
+# approximation of the gradient.
+XTOL_FD_SHARE = 1e-3
+
+# The automatic starting values approximate the Jacobian of the moment conditions by forward
+# differences with this step relative to the magnitude of each parameter.
+START_FD_STEP = 1e-6
+
+# The pre-search for the automatic starting values passes this number of the best points of its
+# design to the local search. The design is drawn with a fixed seed.
+PRESEARCH_BEST = 3
+PRESEARCH_SEED = 123
+
+# The Hessian of the criterion function at the estimate is approximated by central differences
+# with this step relative to the magnitude of each parameter.
+INFERENCE_STEP = 1e-4
+
+# The line search of the BHHH optimizer halves the step at most this number of times.
+BHHH_MAX_HALVING = 10
+
+# The Chebyshev solver interpolates the criterion of the root-finding at the Chebyshev-Lobatto
+# nodes of this degree, which include the bounds of the bracket. We polish the root of the
+# interpolant with at most this number of Newton steps on the true criterion.
+CHEBYSHEV_DEGREE = 8
+CHEBYSHEV_POLISH = 5
+
+# The cost of the root-finding for a question is roughly proportional to the number of
+# evaluations of the utility copula for lottery B. The temporal questions require a single
+# evaluation, while the risky questions require two or three.
+QUESTION_COSTS = dict()
+for q in QUESTIONS_ALL:
+    if q <= 30:
+        QUESTION_COSTS[q] = 1
+    elif q <= 39:
+        QUESTION_COSTS[q] = 2
+    else:
+        QUESTION_COSTS[q] = 3
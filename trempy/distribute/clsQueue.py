@@ -0,0 +1,142 @@
+"""This module contains the class to manage a file-backed queue of jobs."""
+import sqlite3
+import json
+import time
+
+import pandas as pd
+
+from trempy.custom_exceptions import TrempyError
+from trempy.shared.clsBase import BaseCls
+
+# The tasks that the workers are able to run.
+TASKS = ['simulate', 'estimate', 'estimate_agents']
+
+# The layout of the table in the queue.
+SCHEMA = 'CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, task TEXT, ' \
+         'spec TEXT, dataset TEXT, status TEXT, worker TEXT, attempts INTEGER, ' \
+         'lease_until REAL, submitted REAL, finished REAL, result TEXT, message TEXT)'
+
+
+class QueueCls(BaseCls):
+    """This class manages a queue of jobs in a SQLite database.
+
+    Each job consists of the content of an initialization file, a reference to a dataset and the
+    task to run. A worker holds a lease on each job it claims and needs to renew it while the job
+    is running. Once the lease of a crashed worker expires, the job is claimed again, unless it
+    already used up all attempts.
+
+    The write-ahead log allows the workers to read the queue while another one claims a job. It
+    requires all workers to access the database through the same host. On network filesystems,
+    the rollback journal, i.e. journal_mode='delete', is required instead.
+    """
+
+    def __init__(self, fname, lease=600.0, max_attempts=3, journal_mode='wal'):
+        """Init class."""
+        if journal_mode not in ['wal', 'delete']:
+            raise TrempyError('journal mode not implemented')
+
+        self.attr = dict()
+        self.attr['max_attempts'] = max_attempts
+        self.attr['journal_mode'] = journal_mode
+        self.attr['lease'] = lease
+        self.attr['fname'] = fname
+
+        # We manage the transactions ourselves and wait for the locks of the other workers.
+        self.attr['conn'] = sqlite3.connect(fname, timeout=60.0, isolation_level=None)
+        self.attr['conn'].execute('PRAGMA journal_mode={:}'.format(journal_mode))
+        self.attr['conn'].execute(SCHEMA)
+
+    def submit(self, task, spec, dataset=None):
+        """Add a job to the queue and return its identifier.
+
+        The specification is the content of an initialization file. For the estimation tasks, the
+        dataset replaces the estimation sample of the specification. For the simulation, the
+        simulated sample is copied to the dataset.
+        """
+        if task not in TASKS:
+            raise TrempyError('task not implemented')
+
+        line = [task, spec, dataset, 'pending', None, 0, None, time.time(), None, None, None]
+        rslt = self.attr['conn'].execute(
+            'INSERT INTO jobs (task, spec, dataset, status, worker, attempts, lease_until, '
+            'submitted, finished, result, message) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', line)
+
+        return rslt.lastrowid
+
+    def claim(self, worker):
+        """Claim the next job that is pending or whose lease expired."""
+        conn, now = self.attr['conn'], time.time()
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Jobs of crashed workers that used up all attempts are not claimed again.
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', message = 'lease expired' WHERE "
+                "status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, self.attr['max_attempts']))
+
+            row = conn.execute(
+                "SELECT id, task, spec, dataset, attempts FROM jobs WHERE status = 'pending' OR "
+                "(status = 'running' AND lease_until < ?) ORDER BY id LIMIT 1", (now,)).fetchone()
+
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                    "lease_until = ? WHERE id = ?", (worker, now + self.attr['lease'], row[0]))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if row is None:
+            return None
+
+        job = dict()
+        job['id'], job['task'], job['spec'], job['dataset'], job['attempts'] = row
+        job['attempts'] += 1
+
+        return job
+
+    def renew(self, job_id, worker):
+        """Extend the lease on a running job and report whether it is still held."""
+        rslt = self.attr['conn'].execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time() + self.attr['lease'], job_id, worker))
+
+        return rslt.rowcount == 1
+
+    def complete(self, job_id, worker, result):
+        """Record the result of a job, unless the worker lost its lease in the meantime."""
+        rslt = self.attr['conn'].execute(
+            "UPDATE jobs SET status = 'finished', finished = ?, result = ?, message = NULL "
+            "WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time(), json.dumps(result), job_id, worker))
+
+        return rslt.rowcount == 1
+
+    def fail(self, job_id, worker, message):
+        """Record the failure of a job, which is attempted again if possible."""
+        rslt = self.attr['conn'].execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "message = ?, lease_until = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+            (self.attr['max_attempts'], message, job_id, worker))
+
+        return rslt.rowcount == 1
+
+    def is_open(self):
+        """Check whether any job is still pending or running."""
+        row = self.attr['conn'].execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')").fetchone()
+
+        return row[0] > 0
+
+    def get_jobs(self):
+        """Collect the status of all jobs in a single table."""
+        query = 'SELECT id, task, dataset, status, worker, attempts, submitted, finished, ' \
+                'result, message FROM jobs ORDER BY id'
+
+        return pd.read_sql_query(query, self.attr['conn'], index_col='id')
+
+    def close(self):
+        """Close the connection to the queue."""
+        self.attr['conn'].close()
@@ -0,0 +1,167 @@
+"""This module contains the capabilities to run the jobs of a file-backed queue."""
+import threading
+import tempfile
+import socket
+import shutil
+import uuid
+import os
+
+from trempy.process.process_auxiliary import get_dataset_fname
+from trempy.estimate.estimate_agents import estimate_agents
+from trempy.shared.shared_auxiliary import get_random_string
+from trempy.process.process_auxiliary import is_columnar
+from trempy.estimate.estimate import estimate_model
+from trempy.distribute.clsQueue import QueueCls
+from trempy.simulate.simulate import simulate
+from trempy.clsModel import ModelCls
+
+
+def run_worker(fname, worker=None, max_jobs=None, is_wait=False, poll=1.0, **queue_options):
+    """Claim and run the jobs of a queue one after the other.
+
+    The worker stops once there are no more jobs to claim. If requested, it waits for the jobs
+    that are still running elsewhere as they might return to the queue. The lease on the current
+    job is renewed in the background. An estimation stops at its best point so far once the lease
+    is lost. All options of the queue, e.g. the duration of the lease, need to be the same for
+    all workers. The number of jobs that were run is returned.
+    """
+    if worker is None:
+        worker = '{:}-{:}-{:}'.format(socket.gethostname(), os.getpid(), uuid.uuid4().hex[:6])
+
+    queue_obj = QueueCls(fname, **queue_options)
+
+    num_jobs = 0
+    try:
+        while max_jobs is None or num_jobs < max_jobs:
+            job = queue_obj.claim(worker)
+
+            if job is None:
+                if is_wait and queue_obj.is_open():
+                    threading.Event().wait(poll)
+                    continue
+                break
+
+            stop_event, heartbeat_event = threading.Event(), threading.Event()
+            args = (fname, job['id'], worker, stop_event, heartbeat_event, queue_options)
+            heartbeat = threading.Thread(target=_renew_lease, args=args, daemon=True)
+            heartbeat.start()
+
+            try:
+                result = run_job(job, stop_event)
+            except Exception as error:
+                queue_obj.fail(job['id'], worker, repr(error))
+            else:
+                queue_obj.complete(job['id'], worker, result)
+            finally:
+                heartbeat_event.set()
+                heartbeat.join()
+
+            num_jobs += 1
+    finally:
+        queue_obj.close()
+
+    return num_jobs
+
+
+def run_job(job, stop_event=None):
+    """Run a single job in its own scratch directory and return its result.
+
+    Relative references to the dataset refer to the working directory of the worker.
+    """
+    dataset = job['dataset']
+    if dataset is not None:
+        dataset = os.path.abspath(dataset)
+
+    cwd = os.getcwd()
+    dirname = tempfile.mkdtemp()
+
+    os.chdir(dirname)
+    try:
+        with open('job.trempy.ini', 'w') as outfile:
+            outfile.write(job['spec'])
+        model_obj = ModelCls('job.trempy.ini')
+
+        result = dict()
+        if job['task'] in ['simulate']:
+            _, result['fval'] = simulate('job.trempy.ini')
+
+            sim_file, sim_format = model_obj.get_attr('sim_file'), model_obj.get_attr('sim_format')
+            if dataset is not None:
+                _copy_dataset(get_dataset_fname(sim_file, sim_format), dataset)
+            result['dataset'] = dataset
+
+        elif job['task'] in ['estimate']:
+            if dataset is not None:
+                model_obj.set_attr('est_file', dataset)
+
+            rslt = estimate_model(model_obj, stop_event=stop_event)
+            result['fval'] = rslt[0]
+            result['x_econ_all'] = list(rslt[1])
+            if len(rslt) > 2:
+                result['se'] = rslt[2].get_attr('se').tolist()
+
+        elif job['task'] in ['estimate_agents']:
+            if dataset is not None:
+                model_obj.set_attr('est_file', dataset)
+            model_obj.write_out('job.trempy.ini')
+
+            # The stop event cannot be shared with the worker processes of the estimation.
+            df_rslt = estimate_agents('job.trempy.ini')
+            result['agents'] = df_rslt.reset_index().to_dict(orient='list')
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(dirname, ignore_errors=True)
+
+    return result
+
+
+def _copy_dataset(source, target):
+    """Copy a dataset in any format, replacing an existing one.
+
+    We first copy to a temporary location so other workers never see a partial dataset. A file
+    replaces a file in a single step. Otherwise, the existing dataset is moved aside right before
+    the replacement and only deleted afterwards, so it is restored if the replacement fails.
+    """
+    suffix = get_random_string()
+
+    scratch = '{:}.{:}.scratch'.format(target, suffix)
+    if is_columnar(source):
+        shutil.copytree(source, scratch)
+    else:
+        shutil.copy(source, scratch)
+
+    stale = None
+    if os.path.lexists(target) and (is_columnar(source) or is_columnar(target)):
+        stale = '{:}.{:}.stale'.format(target, suffix)
+        os.replace(target, stale)
+
+    try:
+        os.replace(scratch, target)
+    except OSError:
+        if stale is not None:
+            os.replace(stale, target)
+        _remove_dataset(scratch)
+        raise
+
+    if stale is not None:
+        _remove_dataset(stale)
+
+
+def _remove_dataset(fname):
+    """Remove a dataset in any format."""
+    if is_columnar(fname):
+        shutil.rmtree(fname)
+    else:
+        os.remove(fname)
+
+
+def _renew_lease(fname, job_id, worker, stop_event, heartbeat_event, queue_options):
+    """Renew the lease on a job in regular intervals until the job is finished."""
+    queue_obj = QueueCls(fname, **queue_options)
+    try:
+        while not heartbeat_event.wait(queue_obj.get_attr('lease') / 4.0):
+            if not queue_obj.renew(job_id, worker):
+                stop_event.set()
+                break
+    finally:
+        queue_obj.close()
@@ -0,0 +1,131 @@
+"""This module contains the class to control the progress and the termination of an estimation."""
+import threading
+import signal
+import time
+import os
+
+from trempy.shared.clsBase import BaseCls
+
+# The user can still request a stop of a running estimation by creating this file in the working
+# directory. It is checked by a background thread and not during each evaluation.
+STOP_FILE = '.stop.trempy.scratch'
+
+# We check for the stop file in regular intervals measured in seconds.
+STOP_FILE_INTERVAL = 1.0
+
+
+class ControlCls(BaseCls):
+    """This class manages the cooperative termination and the progress reporting of an estimation.
+
+    A stop can be requested by setting the stop event, by returning True from a progress callback,
+    by exceeding the wall-clock budget, by sending SIGINT or SIGTERM, or by creating the stop file.
+    The check during each evaluation does not require any access to the filesystem.
+    """
+
+    def __init__(self, stop_event=None, callbacks=None, budget=None):
+        """Init class.
+
+        Any object with the methods is_set() and set() can serve as the stop event. This allows
+        to pass, for example, a multiprocessing.Manager().Event() to estimations in worker pools.
+        """
+        if stop_event is None:
+            stop_event = threading.Event()
+
+        if callbacks is None:
+            callbacks = []
+
+        self.attr = dict()
+        self.attr['stop_event'] = stop_event
+        self.attr['callbacks'] = list(callbacks)
+        self.attr['budget'] = budget
+
+        # Housekeeping attributes
+        self.attr['watcher_event'] = threading.Event()
+        self.attr['watcher'] = None
+        self.attr['handlers'] = dict()
+        self.attr['deadline'] = None
+        self.attr['reason'] = None
+        self.attr['start'] = None
+
+    def start(self):
+        """Start the clock, the watcher for the stop file, and the handling of signals."""
+        self.attr['start'] = time.perf_counter()
+        if self.attr['budget'] is not None:
+            self.attr['deadline'] = self.attr['start'] + self.attr['budget']
+
+        # Signal handlers can only be installed from the main thread of the interpreter.
+        if threading.current_thread() is threading.main_thread():
+            for signum in [signal.SIGINT, signal.SIGTERM]:
+                self.attr['handlers'][signum] = signal.signal(signum, self._handle_signal)
+
+        self.attr['watcher_event'].clear()
+        self.attr['watcher'] = threading.Thread(target=self._watch_stop_file, daemon=True)
+        self.attr['watcher'].start()
+
+    def finish(self):
+        """Restore the original signal handlers and shut down the watcher for the stop file."""
+        for signum, handler in self.attr['handlers'].items():
+            signal.signal(signum, handler)
+        self.attr['handlers'] = dict()
+
+        if self.attr['watcher'] is not None:
+            self.attr['watcher_event'].set()
+            self.attr['watcher'].join()
+            self.attr['watcher'] = None
+
+    def stop(self, reason='event'):
+        """Request a stop of the estimation."""
+        # We only keep track of the first reason for a stop.
+        if self.attr['reason'] is None:
+            self.attr['reason'] = reason
+        self.attr['stop_event'].set()
+
+    def is_stopped(self):
+        """Check whether a stop of the estimation is requested."""
+        is_stopped = self.attr['stop_event'].is_set()
+        if is_stopped and self.attr['reason'] is None:
+            self.attr['reason'] = 'event'
+        return is_stopped
+
+    def get_elapsed(self):
+        """Return the wall-clock time since the start of the estimation."""
+        if self.attr['start'] is None:
+            return 0.0
+        return time.perf_counter() - self.attr['start']
+
+    def check(self, progress):
+        """Report the progress to all callbacks and check whether a stop is requested."""
+        for callback in self.attr['callbacks']:
+            if callback(progress):
+                self.stop('callback')
+
+        if self.attr['deadline'] is not None and time.perf_counter() > self.attr['deadline']:
+            self.stop('budget')
+
+        return self.is_stopped()
+
+    def get_message(self):
+        """Return a message about the reason for the stop of the estimation."""
+        messages = dict()
+        messages['event'] = 'Optimization stopped by request.'
+        messages['callback'] = 'Optimization stopped by progress callback.'
+        messages['budget'] = 'Optimization stopped as wall-clock budget was exhausted.'
+        messages['signal'] = 'Optimization stopped by signal.'
+        messages['file'] = 'Optimization stopped by user.'
+
+        return messages[self.attr['reason']]
+
+    def _handle_signal(self, signum, frame):
+        """Request a stop after the current evaluation once a signal is received."""
+        # A second interrupt terminates the estimation immediately.
+        if self.attr['reason'] == 'signal' and signum == signal.SIGINT:
+            raise KeyboardInterrupt
+        self.stop('signal')
+
+    def _watch_stop_file(self):
+        """Check for the stop file in regular intervals in the background."""
+        while not self.attr['watcher_event'].wait(STOP_FILE_INTERVAL):
+            if os.path.exists(STOP_FILE):
+                os.remove(STOP_FILE)
+                self.stop('file')
+                break
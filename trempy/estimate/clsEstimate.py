@@ -1,11 +1,17 @@
 """This module contains the class to manage the model estimation."""
 import os
 
+from trempy.interface.clsUtilityModel import UtilityModelCls
 from trempy.shared.shared_auxiliary import criterion_function
 from trempy.shared.shared_auxiliary import char_floats
+from trempy.record.clsInstrument import instrument_obj
+from trempy.estimate.clsControl import ControlCls
 from trempy.record.clsLogger import logger_obj
 
 from trempy.config_trempy import PREFERENCE_PARAMETERS
+from trempy.config_trempy import XTOL_PROGRESS
+from trempy.config_trempy import XTOL_WINDOW
+from trempy.config_trempy import SMALL_FLOAT
 from trempy.custom_exceptions import MaxfunError
 from trempy.config_trempy import HUGE_FLOAT
 from trempy.shared.clsBase import BaseCls
@@ -15,11 +21,19 @@ class EstimateClass(BaseCls):
     """This class manages all issues about the model estimation."""
 
     def __init__(self, df, cutoffs, questions, paras_obj, max_eval, optimizer,
-                 version, **version_specific):
+                 version, control_obj=None, warm_start=False, xtol_schedule=None,
+                 solver='brenth', executor_obj=None, likelihood_obj=None, **version_specific):
         """Init class."""
         self.attr = dict()
         self.attr['version'] = version
 
+        if control_obj is None:
+            control_obj = ControlCls()
+
+        # Without a schedule, the root-finding always uses the default tolerance.
+        if xtol_schedule is None:
+            xtol_schedule = [None]
+
         # Handle version-specific objects outside paras_obj.
         if version in ['scaled_archimedean']:
             for key, value in version_specific.items():
@@ -37,6 +51,14 @@ class EstimateClass(BaseCls):
 
         # Housekeeping attributes
         self.attr['optimizer'] = optimizer
+        self.attr['control_obj'] = control_obj
+        self.attr['warm_start'] = warm_start
+        self.attr['likelihood_obj'] = likelihood_obj
+        self.attr['solver'] = solver
+        self.attr['xtol_schedule'] = xtol_schedule
+        self.attr['xtol_level'] = 0
+        self.attr['xtol_eval'] = 0
+        self.attr['xtol_f'] = HUGE_FLOAT
         self.attr['num_step'] = 0
         self.attr['num_eval'] = 0
 
@@ -54,6 +76,10 @@ class EstimateClass(BaseCls):
 
         self.attr['paras_label'] = PREFERENCE_PARAMETERS[version] + questions
 
+        # The utility copula persists across evaluations.
+        self.attr['utility_obj'] = UtilityModelCls(paras_obj, questions, executor_obj,
+                                                   **version_specific)
+
         self._logging_start()
 
     def evaluate(self, x_optim_free_current):
@@ -74,16 +100,26 @@ class EstimateClass(BaseCls):
             version_specific = dict()
 
         # Construct relevant set of parameters
-        paras_obj.set_values('optim', 'free', x_optim_free_current)
-        x_optim_all_current = paras_obj.get_values('optim', 'all')
-        x_econ_all_current = paras_obj.get_values('econ', 'all')
+        with instrument_obj.phase('parameters'):
+            paras_obj.set_values('optim', 'free', x_optim_free_current)
+            x_optim_all_current = paras_obj.get_values('optim', 'all')
+            x_econ_all_current = paras_obj.get_values('econ', 'all')
 
         # Get standard deviations. They have a larger index than nparas_econ.
         nparas_econ = paras_obj.attr['nparas_econ']
         sds = x_econ_all_current[nparas_econ:]
 
+        # The root-finding starts from the optimal compensations of the previous evaluation.
+        m_start = None
+        if self.attr['warm_start']:
+            m_start = self.attr['m_optimal_current']
+
+        xtol = self.attr['xtol_schedule'][self.attr['xtol_level']]
+
         fval, m_optimal = criterion_function(df, questions, cutoffs, paras_obj,
-                                             version, sds, **version_specific)
+                                             version, sds, m_start, xtol, self.attr['solver'],
+                                             self.attr['utility_obj'],
+                                             self.attr['likelihood_obj'], **version_specific)
 
         self._update_evaluation(fval, x_econ_all_current, x_optim_all_current, m_optimal)
 
@@ -113,7 +149,65 @@ class EstimateClass(BaseCls):
             self.attr['f_step'] = fval
             self.attr['num_step'] += 1
 
-        self._logging_evaluation(x_econ_all_current, x_optim_all_current)
+        self._update_tolerance()
+
+        with instrument_obj.phase('logging'):
+            self._logging_evaluation(x_econ_all_current, x_optim_all_current)
+
+    def _update_tolerance(self):
+        """Tighten the tolerance of the root-finding once the criterion function stalls."""
+        num_eval, f_step = self.attr['num_eval'], self.attr['f_step']
+
+        if self.attr['xtol_level'] == len(self.attr['xtol_schedule']) - 1:
+            return
+
+        if num_eval == 1:
+            self.attr['xtol_eval'], self.attr['xtol_f'] = num_eval, f_step
+            return
+
+        if num_eval - self.attr['xtol_eval'] < XTOL_WINDOW:
+            return
+
+        progress = (self.attr['xtol_f'] - f_step) / max(abs(f_step), SMALL_FLOAT)
+        if progress < XTOL_PROGRESS:
+            self.attr['xtol_level'] += 1
+
+        self.attr['xtol_eval'], self.attr['xtol_f'] = num_eval, f_step
+
+    def recompute_step(self):
+        """Recompute the criterion function at the best point with the default root-finding."""
+        # Distribute general class attributes
+        x_econ_all_step = self.attr['x_econ_all_step']
+        paras_obj = self.attr['paras_obj']
+        questions = self.attr['questions']
+        version = self.attr['version']
+        cutoffs = self.attr['cutoffs']
+        df = self.attr['df']
+
+        # There is nothing to do if all evaluations use the default tolerance and root-finding.
+        if self.attr['xtol_schedule'] == [None] and self.attr['solver'] in ['brenth']:
+            return
+
+        version_specific = dict()
+        if version in ['scaled_archimedean']:
+            version_specific = {'upper': self.attr['upper'], 'marginals': self.attr['marginals']}
+
+        paras_obj.set_values('econ', 'all', x_econ_all_step)
+        sds = x_econ_all_step[paras_obj.attr['nparas_econ']:]
+
+        fval, m_optimal = criterion_function(df, questions, cutoffs, paras_obj, version, sds,
+                                             utility_obj=self.attr['utility_obj'],
+                                             likelihood_obj=self.attr['likelihood_obj'],
+                                             **version_specific)
+
+        self.attr['m_optimal_step'] = m_optimal
+        self.attr['f_step'] = fval
+
+        self._write_info()
+
+        with open('est.trempy.log', 'a') as outfile:
+            fmt_ = '\n\n Criterion at Full Precision {:>25}\n'
+            outfile.write(fmt_.format(char_floats(fval)[0]))
 
     def _logging_start(self):
         """Record some basic properties of the estimation at the beginning."""
@@ -121,8 +215,12 @@ class EstimateClass(BaseCls):
         paras_obj = self.attr['paras_obj']
         df = self.attr['df']
 
-        # Construct auxiliary objects
-        est_agents = df.index.get_level_values(0).nunique()
+        # Construct auxiliary objects. The observed sample is not in memory for a chunked
+        # evaluation of the likelihood.
+        if df is None:
+            est_agents = self.attr['likelihood_obj'].get_attr('num_agents')
+        else:
+            est_agents = df.index.get_level_values(0).nunique()
 
         with open('est.trempy.log', 'w') as outfile:
             outfile.write('\n ESTIMATION SETUP\n')
@@ -148,7 +246,73 @@ class EstimateClass(BaseCls):
         questions = self.attr['questions']
         version = self.attr['version']
 
-        # Update class attributes
+        self._write_info()
+
+        with open('est.trempy.log', 'a') as outfile:
+
+            outfile.write('\n\n')
+            fmt_ = '\n EVALUATION {:>10}  STEP {:>10}\n'
+            outfile.write(fmt_.format(*[self.attr['num_eval'], self.attr['num_step']]))
+
+            fmt_ = '\n Criterion {:>28}  \n\n\n'
+            outfile.write(fmt_.format(char_floats(self.attr['f_current'])[0]))
+
+            fmt_ = ' {:>10}   ' + '{:<20}   ' + '{:>25}    ' * 2
+            line = ['Identifier', 'Label', 'Economic', 'Optimizer']
+            outfile.write(fmt_.format(*line) + '\n\n')
+
+            for i, _ in enumerate(range(len(questions) + len(PREFERENCE_PARAMETERS[version]))):
+                line = [i]
+                line += [para_labels[i]]
+                # Handle optional arguments with None value
+                if (x_econ_all_current[i] or x_optim_all_current[i]) is None:
+                    continue
+                line += char_floats([x_econ_all_current[i], x_optim_all_current[i]])
+                outfile.write(fmt_.format(*line) + '\n')
+            # We need to keep track of captured warnings.
+            logger_obj.flush(outfile)
+
+            # We also record the results from the fitting of the copula, if it was rebuilt in
+            # this process.
+            is_rebuilt = self.attr['utility_obj'].get_attr('is_rebuilt')
+            if version in ['scaled_archimedean'] and is_rebuilt:
+                outfile.write('\n')
+                with open('fit.copulpy.info') as infile:
+                    outfile.write(infile.read())
+                os.remove('fit.copulpy.info')
+
+        # We can terminate the estimation if the number of requested function evaluations is
+        # reached or a stop is requested. The latter check does not require any access to the
+        # filesystem.
+        is_finish = (self.attr['max_eval'] == self.attr['num_eval']) and (self.attr['max_eval'] > 1)
+        is_stop = self.attr['control_obj'].check(self.get_progress())
+        if is_finish:
+            raise MaxfunError
+        if is_stop:
+            raise MaxfunError
+
+    def get_progress(self):
+        """Collect the progress of the estimation that is reported to the callbacks."""
+        progress = dict()
+        progress['num_eval'] = self.attr['num_eval']
+        progress['num_step'] = self.attr['num_step']
+        progress['f_start'] = self.attr['f_start']
+        progress['f_step'] = self.attr['f_step']
+        progress['f_current'] = self.attr['f_current']
+        progress['x_econ_all_step'] = self.attr['x_econ_all_step']
+        progress['x_econ_all_current'] = self.attr['x_econ_all_current']
+        progress['elapsed'] = self.attr['control_obj'].get_elapsed()
+        progress['xtol'] = self.attr['xtol_schedule'][self.attr['xtol_level']]
+
+        return progress
+
+    def _write_info(self):
+        """Write the current state of the estimation to the information file."""
+        # Distribute attributes
+        para_labels = self.attr['paras_label']
+        questions = self.attr['questions']
+        version = self.attr['version']
+
         with open('est.trempy.info', 'w') as outfile:
             fmt_ = ' {:>10}    ' + '{:<20}    ' + '{:>25}    ' * 3
 
@@ -193,46 +357,8 @@ class EstimateClass(BaseCls):
             outfile.write(fmt_.format(*['Number of Evaluations', self.attr['num_eval']]))
             outfile.write(fmt_.format(*['Number of Steps', self.attr['num_step']]))
 
-        with open('est.trempy.log', 'a') as outfile:
-
-            outfile.write('\n\n')
-            fmt_ = '\n EVALUATION {:>10}  STEP {:>10}\n'
-            outfile.write(fmt_.format(*[self.attr['num_eval'], self.attr['num_step']]))
-
-            fmt_ = '\n Criterion {:>28}  \n\n\n'
-            outfile.write(fmt_.format(char_floats(self.attr['f_current'])[0]))
-
-            fmt_ = ' {:>10}   ' + '{:<20}   ' + '{:>25}    ' * 2
-            line = ['Identifier', 'Label', 'Economic', 'Optimizer']
-            outfile.write(fmt_.format(*line) + '\n\n')
-
-            for i, _ in enumerate(range(len(questions) + len(PREFERENCE_PARAMETERS[version]))):
-                line = [i]
-                line += [para_labels[i]]
-                # Handle optional arguments with None value
-                if (x_econ_all_current[i] or x_optim_all_current[i]) is None:
-                    continue
-                line += char_floats([x_econ_all_current[i], x_optim_all_current[i]])
-                outfile.write(fmt_.format(*line) + '\n')
-            # We need to keep track of captured warnings.
-            logger_obj.flush(outfile)
-
-            if version in ['scaled_archimedean']:
-                # We also record the results from the fitting of the copula.
-                outfile.write('\n')
-                with open('fit.copulpy.info') as infile:
-                    outfile.write(infile.read())
-                os.remove('fit.copulpy.info')
-
-        # We can determine the estimation if the number of requested function evaluations is
-        # reached or the user requests a stop.
-        is_finish = (self.attr['max_eval'] == self.attr['num_eval']) and (self.attr['max_eval'] > 1)
-        is_stop = os.path.exists('.stop.trempy.scratch')
-        if is_finish:
-            raise MaxfunError
-        if is_stop:
-            os.remove('.stop.trempy.scratch')
-            raise MaxfunError
+            # Timing and counting of events, if requested.
+            instrument_obj.write_info(outfile)
 
     @staticmethod
     def finish(opt):
@@ -240,6 +366,8 @@ class EstimateClass(BaseCls):
         with open('est.trempy.info', 'a') as outfile:
             outfile.write('\n {:<25}'.format('TERMINATED'))
 
+        instrument_obj.write_json('est.trempy.json')
+
         with open('est.trempy.log', 'a') as outfile:
             outfile.write('\n {:<25}\n'.format('OPTIMIZER RETURN'))
             outfile.write('\n Message    {:<40}'.format(str(opt['message'])))
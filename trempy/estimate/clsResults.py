@@ -0,0 +1,72 @@
+"""This module contains the class to collect the results of the inference at the estimate."""
+import pandas as pd
+import numpy as np
+
+from trempy.shared.shared_auxiliary import char_floats
+from trempy.shared.clsBase import BaseCls
+
+
+class ResultsCls(BaseCls):
+    """This class collects the covariance matrix and standard errors of the free parameters.
+
+    All results refer to the economic parametrization of the free parameters.
+    """
+
+    def __init__(self, labels, x_econ_free, fval, num_obs, cov, method, **info):
+        """Init class.
+
+        Any additional information, e.g. the Hessian of the criterion function, is stored
+        alongside the covariance matrix.
+        """
+        cov = np.array(cov, dtype=np.float64)
+
+        # We flag the standard errors as missing if the covariance matrix is not well-behaved.
+        with np.errstate(invalid='ignore'):
+            se = np.sqrt(np.diag(cov))
+
+        self.attr = dict()
+        self.attr['x_econ_free'] = np.array(x_econ_free, dtype=np.float64)
+        self.attr['num_obs'] = num_obs
+        self.attr['labels'] = labels
+        self.attr['method'] = method
+        self.attr['fval'] = fval
+        self.attr['cov'] = cov
+        self.attr['se'] = se
+
+        for key, value in info.items():
+            self.attr[key] = value
+
+    def get_table(self):
+        """Return the estimates and their standard errors in a table."""
+        df = pd.DataFrame(index=pd.Index(self.attr['labels'], name='Label'))
+        df['Estimate'] = self.attr['x_econ_free']
+        df['Standard Error'] = self.attr['se']
+
+        return df
+
+    def write_info(self, fname='est.trempy.info'):
+        """Write the standard errors and the covariance matrix to the information file."""
+        labels, x_econ_free, se, cov = [self.attr[key] for key in ['labels', 'x_econ_free', 'se',
+                                                                   'cov']]
+
+        with open(fname, 'a') as outfile:
+            fmt_ = ' {:>10}    ' + '{:<20}    ' + '{:>25}    ' * 2
+
+            outfile.write('\n\n {:<25}\n\n'.format('Standard Errors'))
+            outfile.write(' {:<25}   {:>25}\n'.format('Method', self.attr['method']))
+            outfile.write(' {:<25}   {:>25}\n\n'.format('Observations', self.attr['num_obs']))
+
+            line = ['Identifier', 'Label', 'Estimate', 'Standard Error']
+            outfile.write(fmt_.format(*line) + '\n\n')
+            for i, label in enumerate(labels):
+                line = [i, label] + char_floats([x_econ_free[i], se[i]])
+                outfile.write(fmt_.format(*line) + '\n')
+
+            fmt_ = ' {:>10}    ' + '{:>10}    ' + '{:>25}    '
+
+            outfile.write('\n\n {:<25}\n\n'.format('Covariance Matrix'))
+            outfile.write(fmt_.format(*['Identifier', 'Identifier', 'Covariance']) + '\n\n')
+            for i in range(len(labels)):
+                for j in range(i + 1):
+                    line = [i, j] + char_floats(cov[i, j])
+                    outfile.write(fmt_.format(*line) + '\n')
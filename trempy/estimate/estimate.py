@@ -8,26 +8,58 @@ from scipy.optimize import minimize
 from trempy.estimate.estimate_auxiliary import get_automatic_starting_values
 from trempy.shared.shared_auxiliary import dist_class_attributes
 from trempy.estimate.estimate_auxiliary import estimate_simulate
+from trempy.estimate.estimate_auxiliary import get_xtol_schedule
+from trempy.shared.shared_auxiliary import floating_point_policy
+from trempy.estimate.estimate_inference import get_inference
+from trempy.estimate.estimate_bhhh import minimize_bhhh
 from trempy.estimate.estimate_auxiliary import estimate_cleanup
+from trempy.record.clsInstrument import instrument_obj
 from trempy.estimate.clsEstimate import EstimateClass
+from trempy.shared.clsLikelihood import ChunkedLikelihoodCls
+from trempy.shared.clsLikelihood import LikelihoodCls
+from trempy.estimate.clsControl import ControlCls
+from trempy.shared.clsExecutor import ExecutorCls
 from trempy.custom_exceptions import MaxfunError
 from trempy.custom_exceptions import TrempyError
+from trempy.process.process import process_chunked
 from trempy.process.process import process
 from trempy.clsModel import ModelCls
 
 
-def estimate(fname):
+@floating_point_policy
+def estimate(fname, callbacks=None, stop_event=None):
     """Estimate the model by the method of maximum likelihood."""
-    estimate_cleanup()
-
     model_obj = ModelCls(fname)
 
+    return estimate_model(model_obj, callbacks=callbacks, stop_event=stop_event)
+
+
+@floating_point_policy
+def estimate_model(model_obj, df_obs=None, callbacks=None, stop_event=None,
+                   likelihood_obj=None):
+    """Estimate the model for a given specification.
+
+    The observed dataset is processed based on the specification, unless it is provided directly.
+    A prepared likelihood object replaces the observed dataset altogether. Each callback is called
+    with the progress of the estimation after each evaluation and requests a stop by returning
+    True. Setting the stop event also ends the estimation at the best point so far.
+    """
+    estimate_cleanup()
+
     # Distribute class parameters except for economic parameters and version-specific thing
     args = [model_obj, 'version', 'est_file', 'questions', 'paras_obj', 'start', 'cutoffs',
-            'maxfun', 'est_detailed', 'opt_options', 'optimizer', 'est_agents', 'num_skip']
+            'maxfun', 'est_detailed', 'opt_options', 'optimizer', 'est_agents', 'num_skip',
+            'fingerprint', 'instrument', 'budget', 'warm_start', 'adaptive', 'solver', 'backend',
+            'workers', 'shards', 'chunk', 'inference']
 
     version, est_file, questions, paras_obj, start, cutoffs, maxfun, est_detailed, \
-        opt_options, optimizer, est_agents, num_skip = dist_class_attributes(*args)
+        opt_options, optimizer, est_agents, num_skip, fingerprint, instrument, budget, \
+        warm_start, adaptive, solver, backend, workers, shards, chunk, inference = \
+        dist_class_attributes(*args)
+
+    # We start with a clean record of the instrumentation.
+    instrument_obj.activate(instrument)
+    instrument_obj.reset()
 
     # Handle version-specific objects not included in the para_obj
     if version in ['scaled_archimedean']:
@@ -40,29 +72,124 @@ def estimate(fname):
     if len(paras_obj.get_values('optim', 'free')) == 0:
         raise TrempyError('no free parameter to estimate')
 
+    # The observed sample is only read in chunks during each evaluation if requested. Then it is
+    # not available for the automatic starting values and the detailed output. The same holds
+    # for a prepared likelihood object.
+    is_prepared = likelihood_obj is not None
+    is_chunked = df_obs is None and chunk is not None and not is_prepared
+    if (is_chunked or is_prepared) and (start in ['auto'] or est_detailed):
+        raise TrempyError('estimation without the observed sample in memory requires start '
+                          'values and no detailed output')
+
     # Some initial setup
-    df_obs = process(est_file, questions, num_skip, est_agents, cutoffs)
+    if is_prepared:
+        df_obs = None
+    elif is_chunked:
+        process_chunked(est_file, questions, num_skip, est_agents, cutoffs, chunk, fingerprint)
+    elif df_obs is None:
+        df_obs = process(est_file, questions, num_skip, est_agents, cutoffs, fingerprint)
+
+    control_obj = ControlCls(stop_event, callbacks, budget)
+
+    # We loosen the tolerance of the root-finding at the beginning of the estimation, if requested.
+    xtol_schedule = None
+    if adaptive:
+        xtol_schedule = get_xtol_schedule(optimizer, opt_options)
+
+    # The workers for the determination of the optimal compensations are kept alive throughout
+    # the estimation.
+    executor_obj = ExecutorCls(backend, workers)
+
+    # The observed sample is prepared once and, if requested, shared with the workers for the
+    # evaluation of the likelihood.
+    if is_chunked:
+        likelihood_obj = ChunkedLikelihoodCls(est_file, questions, num_skip, est_agents, cutoffs,
+                                              chunk)
+    elif not is_prepared:
+        likelihood_obj = LikelihoodCls(df_obs, questions, cutoffs, shards)
 
     estimate_obj = EstimateClass(
         df=df_obs, cutoffs=cutoffs, questions=questions, paras_obj=copy.deepcopy(paras_obj),
-        max_eval=maxfun, optimizer=optimizer, version=version, **version_specific)
+        max_eval=maxfun, optimizer=optimizer, version=version, control_obj=control_obj,
+        warm_start=warm_start, xtol_schedule=xtol_schedule, solver=solver,
+        executor_obj=executor_obj, likelihood_obj=likelihood_obj, **version_specific)
+
+    control_obj.start()
+    try:
+        opt = _optimize(estimate_obj, control_obj, model_obj, paras_obj, df_obs, executor_obj,
+                        **version_specific)
+
+        # The best evaluation might have used a loose tolerance or the Chebyshev solver, so we
+        # report it at full precision.
+        estimate_obj.recompute_step()
+
+        # The inference at the estimate uses the same workers as the estimation.
+        results_obj = None
+        if inference not in ['none']:
+            args = [estimate_obj.get_attr(label) for label in ['utility_obj', 'paras_obj',
+                                                               'x_econ_all_step']]
+            results_obj = get_inference(args[0], likelihood_obj, *args[1:], inference)
+            results_obj.write_info('est.trempy.info')
+    finally:
+        control_obj.finish()
+        executor_obj.close()
+        # A prepared likelihood object remains with the caller.
+        if not is_prepared:
+            likelihood_obj.close()
+
+    # Now we can wrap up all estimation related tasks.
+    estimate_obj.finish(opt)
+
+    # We simulate a sample at the stopping point.
+    if est_detailed:
+        x_econ_all_step = estimate_obj.get_attr('x_econ_all_step')
+        paras_obj.set_values('econ', 'all', x_econ_all_step)
+        x_optim_free_step = paras_obj.get_values('optim', 'free')
+        estimate_simulate('stop', x_optim_free_step, model_obj, df_obs)
+        shutil.copy('stop/compare.trempy.info', 'compare.trempy.info')
+
+    # We only return the best value of the criterion function and the corresponding parameter
+    # vector. The results of the inference are added, if requested.
+    rslt = list()
+    rslt.append(estimate_obj.get_attr('f_step'))
+    rslt.append(estimate_obj.get_attr('x_econ_all_step'))
+    if results_obj is not None:
+        rslt.append(results_obj)
+
+    return rslt
+
+
+def _optimize(estimate_obj, control_obj, model_obj, paras_obj, df_obs, executor_obj=None,
+              **version_specific):
+    """Run the optimization and return the information about its termination."""
+    args = [model_obj, 'version', 'questions', 'start', 'maxfun', 'est_detailed', 'opt_options',
+            'optimizer', 'presearch']
+    version, questions, start, maxfun, est_detailed, opt_options, optimizer, presearch = \
+        dist_class_attributes(*args)
 
     # We lock in an evaluation at the starting values as not all optimizers actually start there.
     if start in ['auto']:
-        paras_obj = get_automatic_starting_values(paras_obj, df_obs, questions,
-                                                  version, **version_specific)
+        paras_obj = get_automatic_starting_values(paras_obj, df_obs, questions, version,
+                                                  executor_obj, presearch, **version_specific)
 
     # Objects for scipy.minimize
     x_optim_free_start = paras_obj.get_values('optim', 'free')
     x_free_bounds = paras_obj.get_bounds('free')
-    estimate_obj.evaluate(x_optim_free_start)
+    try:
+        estimate_obj.evaluate(x_optim_free_start)
+    except MaxfunError:
+        pass
 
     # We simulate a sample at the starting point.
     if est_detailed:
         estimate_simulate('start', x_optim_free_start, model_obj, df_obs)
 
     # Optimization of likelihood function
-    if maxfun > 1:
+    if control_obj.is_stopped():
+        opt = dict()
+        opt['message'] = control_obj.get_message()
+        opt['success'] = False
+    elif maxfun > 1:
 
         options = dict()
 
@@ -83,15 +210,24 @@ def estimate(fname):
             method = 'L-BFGS-B'
             bounds = x_free_bounds
             # Add bounds
+        elif optimizer == 'BHHH':
+            options['gtol'] = opt_options['BHHH']['gtol']
+            options['eps'] = opt_options['BHHH']['eps']
+            method = 'BHHH'
         else:
             raise TrempyError('flawed choice of optimization method')
 
         try:
-            opt = minimize(estimate_obj.evaluate, x_optim_free_start, method=method,
-                           options=options, bounds=bounds)
+            if method in ['BHHH']:
+                opt = minimize_bhhh(estimate_obj, x_optim_free_start, **options)
+            else:
+                opt = minimize(estimate_obj.evaluate, x_optim_free_start, method=method,
+                               options=options, bounds=bounds)
         except MaxfunError:
             opt = dict()
             opt['message'] = 'Optimization reached maximum number of function evaluations.'
+            if control_obj.is_stopped():
+                opt['message'] = control_obj.get_message()
             opt['success'] = False
     else:
         # We are not faced with a serious estimation request.
@@ -99,21 +235,4 @@ def estimate(fname):
         opt['message'] = 'Single evaluation of criterion function at starting values.'
         opt['success'] = False
 
-    # Now we can wrap up all estimation related tasks.
-    estimate_obj.finish(opt)
-
-    # We simulate a sample at the stopping point.
-    if est_detailed:
-        x_econ_all_step = estimate_obj.get_attr('x_econ_all_step')
-        paras_obj.set_values('econ', 'all', x_econ_all_step)
-        x_optim_free_step = paras_obj.get_values('optim', 'free')
-        estimate_simulate('stop', x_optim_free_step, model_obj, df_obs)
-        shutil.copy('stop/compare.trempy.info', 'compare.trempy.info')
-
-    # We only return the best value of the criterion function and the corresponding parameter
-    # vector.
-    rslt = list()
-    rslt.append(estimate_obj.get_attr('f_step'))
-    rslt.append(estimate_obj.get_attr('x_econ_all_step'))
-
-    return rslt
+    return opt
@@ -0,0 +1,94 @@
+"""This module contains the capabilities to estimate the model for each agent separately."""
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import os
+
+import pandas as pd
+
+from trempy.shared.shared_auxiliary import dist_class_attributes
+from trempy.shared.shared_auxiliary import floating_point_policy
+from trempy.config_trempy import PREFERENCE_PARAMETERS
+from trempy.estimate.estimate import estimate_model
+from trempy.custom_exceptions import TrempyError
+from trempy.process.process import process
+from trempy.clsModel import ModelCls
+
+
+@floating_point_policy
+def estimate_agents(fname, workers=None, is_pooled=True, stop_event=None):
+    """Estimate the model for each agent in the estimation sample separately.
+
+    The dataset is only processed once. We first estimate the model on the pooled sample and use
+    the results as the starting values for the estimation of each agent. Each estimation runs in
+    its own directory, i.e. agents/pooled and agents/<identifier>. The results are collected in a
+    single table and also stored in agents.trempy.pkl. A stop event that is shared between
+    processes, e.g. multiprocessing.Manager().Event(), ends all estimations at their best point so
+    far.
+    """
+    model_obj = ModelCls(fname)
+
+    args = [model_obj, 'version', 'heterogeneity', 'est_file', 'questions', 'num_skip',
+            'est_agents', 'cutoffs', 'fingerprint']
+    version, heterogeneity, est_file, questions, num_skip, est_agents, cutoffs, fingerprint = \
+        dist_class_attributes(*args)
+
+    # Only the heterogeneity setup ensures that the standard deviations are identified for a
+    # single agent.
+    if not heterogeneity:
+        raise TrempyError('estimation for each agent requires heterogeneity')
+
+    df_obs = process(est_file, questions, num_skip, est_agents, cutoffs, fingerprint)
+
+    # We do not want to simulate samples at the beginning and end of each estimation, nor
+    # conduct the inference for each agent.
+    model_obj.set_attr('est_detailed', False)
+    model_obj.set_attr('inference', 'none')
+
+    if not os.path.exists('agents'):
+        os.mkdir('agents')
+
+    if is_pooled:
+        _, x_econ_all_step = _estimate_scratch(model_obj, df_obs, 'pooled', stop_event)
+        model_obj.update('econ', 'all', x_econ_all_step)
+        model_obj.set_attr('start', 'init')
+
+    agents = df_obs.index.get_level_values(0).unique().tolist()
+
+    # Each worker receives only the observations of its agent.
+    args = [[], [], [], []]
+    for agent in agents:
+        args[0] += [copy.deepcopy(model_obj)]
+        args[1] += [df_obs.xs(agent, level=0, drop_level=False)]
+        args[2] += [str(agent)]
+        args[3] += [stop_event]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        rslt = list(executor.map(_estimate_scratch, *args))
+
+    # We collect the results for all agents in a single table.
+    labels = PREFERENCE_PARAMETERS[version] + questions
+
+    df_rslt = pd.DataFrame([x_econ_all_step for _, x_econ_all_step in rslt], columns=labels,
+                           index=pd.Index(agents, name='Individual'))
+    df_rslt['Criterion'] = [fval for fval, _ in rslt]
+    df_rslt['Observations'] = df_obs.groupby(level=0).size().loc[agents].tolist()
+
+    df_rslt.to_pickle('agents.trempy.pkl', protocol=2)
+
+    return df_rslt
+
+
+def _estimate_scratch(model_obj, df_obs, dirname, stop_event=None):
+    """Estimate the model in a separate directory and return the results."""
+    cwd = os.getcwd()
+    dirname = os.path.join('agents', dirname)
+    if not os.path.exists(dirname):
+        os.mkdir(dirname)
+
+    os.chdir(dirname)
+    try:
+        rslt = estimate_model(model_obj, df_obs, stop_event=stop_event)
+    finally:
+        os.chdir(cwd)
+
+    return rslt
@@ -3,132 +3,248 @@ import shutil
 import copy
 import os
 
-from statsmodels.tools.eval_measures import rmse as get_rmse
-from scipy.optimize import minimize
+from scipy.optimize import least_squares
 import pandas as pd
 import numpy as np
 
 from trempy.shared.shared_auxiliary import get_optimal_compensations
+from trempy.interface.clsUtilityModel import UtilityModelCls
 from trempy.shared.shared_auxiliary import dist_class_attributes
 from trempy.shared.shared_auxiliary import char_floats
+from trempy.process.process_auxiliary import get_dataset_fname
+from trempy.process.process_auxiliary import read_dataset
 from trempy.config_trempy import PREFERENCE_PARAMETERS
 from trempy.config_trempy import NEVER_SWITCHERS
-from trempy.custom_exceptions import MaxfunError
+from trempy.config_trempy import XTOL_FD_SHARE
+from trempy.config_trempy import XTOL_SCHEDULE
 from trempy.simulate.simulate import simulate
+from trempy.shared.clsExecutor import ExecutorCls
+from trempy.config_trempy import PRESEARCH_SEED
+from trempy.config_trempy import PRESEARCH_BEST
+from trempy.config_trempy import START_FD_STEP
 from trempy.config_trempy import SMALL_FLOAT
 from trempy.config_trempy import HUGE_FLOAT
 from trempy.shared.clsBase import BaseCls
 
 
 class StartClass(BaseCls):
-    """This class manages all issues about the model estimation."""
-
-    def __init__(self, questions, m_optimal_obs, start_fixed,
-                 start_utility_paras, version, **version_specific):
+    """This class manages the determination of the automatic starting values.
+
+    We match the observed average compensations by the optimal compensations of the model in a
+    nonlinear least-squares problem. The preference parameters are handled as a plain vector, so
+    the container for the parameters is never copied. The Jacobian is approximated by forward
+    differences, where the perturbed parameter values are solved in a single batch that starts
+    the root-finding from the unperturbed solution. A space-filling pre-search across the bounds
+    provides additional starting points for the local search.
+    """
+
+    def __init__(self, questions, m_optimal_obs, paras_obj, executor_obj=None,
+                 **version_specific):
         """Init class."""
-        self.attr = dict()
-        self.attr['version'] = version
-
-        # Handle version-specific objects
-        if version in ['scaled_archimedean']:
-            # assert all(x in version_specific.keys() for x in ['marginals', 'upper'])
-            self.attr['marginals'] = version_specific['marginals']
-            self.attr['upper'] = version_specific['upper']
-        elif version in ['nonstationary']:
-            pass
+        version = paras_obj.attr['version']
+
+        if executor_obj is None:
+            executor_obj = ExecutorCls()
+
+        start_paras, start_bounds, is_free = [], [], []
+        for label in PREFERENCE_PARAMETERS[version]:
+            value, is_fixed, bounds = paras_obj.get_para(label)
+            start_paras += [value]
+            start_bounds += [bounds]
+            is_free += [not is_fixed]
 
         # Initialization attributes
-        self.attr['start_utility_paras'] = start_utility_paras
-        self.attr['m_optimal_obs'] = m_optimal_obs
-        self.attr['start_fixed'] = start_fixed
+        self.attr = dict()
+        self.attr['settings'] = UtilityModelCls(paras_obj, questions,
+                                                **version_specific).get_settings()
+        self.attr['m_optimal_obs'] = np.array(m_optimal_obs, dtype=np.float64)
+        self.attr['start_bounds'] = start_bounds
+        self.attr['executor_obj'] = executor_obj
+        self.attr['start_paras'] = start_paras
         self.attr['questions'] = questions
+        self.attr['is_free'] = is_free
 
         # Housekeeping attributes
         self.attr['f_current'] = HUGE_FLOAT
         self.attr['f_start'] = HUGE_FLOAT
         self.attr['f_step'] = HUGE_FLOAT
 
+        self.attr['x_vals_start'] = None
+        self.attr['x_vals_step'] = None
+
+        self.attr['m_optimal_current'] = None
+        self.attr['x_vals_current'] = None
+
         self.attr['num_eval'] = 0
 
-    def evaluate(self, x_vals):
-        """Evalute. This will be the criterion function."""
-        if self.attr['num_eval'] > 10:
-            return HUGE_FLOAT
+    def get_free(self):
+        """Return the values and bounds of the free preference parameters."""
+        x_vals, bounds = [], []
+        for i, is_free in enumerate(self.attr['is_free']):
+            if is_free:
+                x_vals += [self.attr['start_paras'][i]]
+                bounds += [self.attr['start_bounds'][i]]
 
-        version = self.attr['version']
+        return np.array(x_vals, dtype=np.float64), np.array(bounds, dtype=np.float64)
 
-        if version in ['scaled_archimedean']:
-            marginals = self.attr['marginals']
-            upper = self.attr['upper']
-            version_specific = {'upper': upper, 'marginals': marginals}
-        elif version in ['nonstationary']:
-            version_specific = dict()
+    def get_paras(self, x_vals):
+        """Construct all preference parameters from the values of the free ones."""
+        paras, x_vals = list(self.attr['start_paras']), list(x_vals)
+        for i, is_free in enumerate(self.attr['is_free']):
+            if is_free:
+                paras[i] = x_vals.pop(0)
 
-        start_utility_paras = self.attr['start_utility_paras']
-        m_optimal_obs = self.attr['m_optimal_obs']
-        start_fixed = self.attr['start_fixed']
+        return tuple(paras)
+
+    def solve(self, x_vals_batch, m_start=None):
+        """Determine the optimal compensations for a batch of values of the free parameters."""
         questions = self.attr['questions']
 
-        # Override non-fixed values in the para_obj with the xvals.
-        utility_cand = copy.deepcopy(start_utility_paras)
-        para_obj = utility_cand.attr['para_objs']
-        j = 0
-        nparas_econ = start_utility_paras.attr['nparas_econ']
+        paras_batch = [self.get_paras(x_vals) for x_vals in x_vals_batch]
+        rslt = self.attr['executor_obj'].solve_batch(self.attr['settings'], paras_batch,
+                                                     questions, m_start)
 
-        for i in range(nparas_econ):
-            if start_fixed[i]:
-                continue
-            else:
-                para_obj[i].attr['value'] = x_vals[j]
-                j += 1
+        return [np.array([m_optimal[q] for q in questions]) for m_optimal in rslt]
 
-        # Update para_obj in utility candidate
-        utility_cand.attr['para_objs'] = para_obj
+    def residuals(self, x_vals):
+        """Calculate the distance between the observed and the optimal compensations."""
+        m_optimal_obs = self.attr['m_optimal_obs']
 
-        m_optimal_cand = get_optimal_compensations(
-            version=version, paras_obj=utility_cand,
-            questions=questions, **version_specific)
-        m_optimal_cand = np.array([m_optimal_cand[q] for q in questions])
+        m_optimal_cand = self.solve([x_vals])[0]
 
-        # We need to ensure that we only compare values if the mean is not missing.
-        np_stats = np.tile(np.nan, (len(questions), 2))
-        for i, _ in enumerate(questions):
-            np_stats[i, :] = [m_optimal_obs[i], m_optimal_cand[i]]
-        np_stats = np_stats[~np.isnan(np_stats).any(axis=1)]
+        # We can only compare those questions where the observed average is available.
+        is_observed = ~np.isnan(m_optimal_obs)
+        stat = m_optimal_cand[is_observed] - m_optimal_obs[is_observed]
 
-        fval = np.mean((np_stats[:, 0] - np_stats[:, 1]) ** 2)
+        self.attr['m_optimal_current'] = m_optimal_cand
+        self.attr['x_vals_current'] = np.array(x_vals, copy=True)
 
-        # Update class attributes
-        self.attr['num_eval'] += 1
+        # The squared distance can exceed the range of floats for implausible parameter values.
+        with np.errstate(over='ignore'):
+            fval = np.mean(stat ** 2)
 
         self._update_evaluation(fval, x_vals)
 
-        return fval
+        return stat
+
+    def jacobian(self, x_vals):
+        """Approximate the Jacobian of the residuals by forward differences."""
+        m_optimal_obs = self.attr['m_optimal_obs']
+        questions = self.attr['questions']
+        _, bounds = self.get_free()
+
+        # We usually evaluate the Jacobian at the point of the most recent evaluation.
+        if not np.array_equal(x_vals, self.attr['x_vals_current']):
+            self.residuals(x_vals)
+        m_optimal_base = self.attr['m_optimal_current']
+
+        # The steps point away from a binding upper bound.
+        steps = START_FD_STEP * np.maximum(np.abs(x_vals), 1.0)
+        steps[x_vals + steps > bounds[:, 1]] *= -1.0
+
+        x_vals_batch = [x_vals + np.identity(len(x_vals))[i] * steps[i]
+                        for i in range(len(x_vals))]
+        m_optimal_batch = self.solve(x_vals_batch, dict(zip(questions, m_optimal_base)))
+
+        is_observed = ~np.isnan(m_optimal_obs)
+
+        jac = np.tile(np.nan, (is_observed.sum(), len(x_vals)))
+        for i, m_optimal_cand in enumerate(m_optimal_batch):
+            jac[:, i] = (m_optimal_cand[is_observed] - m_optimal_base[is_observed]) / steps[i]
+
+        return jac
+
+    def presearch(self, num_points):
+        """Evaluate the distance on a Latin hypercube design and return the best points.
+
+        All points of the design are solved in a single batch. The points are sorted by their
+        distance, while points where the distance is not available are dropped.
+        """
+        m_optimal_obs = self.attr['m_optimal_obs']
+        _, bounds = self.get_free()
+
+        x_vals_batch = get_latin_hypercube(num_points, bounds)
+        m_optimal_batch = np.array(self.solve(x_vals_batch))
+
+        is_observed = ~np.isnan(m_optimal_obs)
+        with np.errstate(over='ignore', invalid='ignore'):
+            stat = m_optimal_batch[:, is_observed] - m_optimal_obs[is_observed]
+            fvals = np.mean(stat ** 2, axis=1)
+
+        for x_vals, fval in zip(x_vals_batch, fvals):
+            self._update_evaluation(fval, x_vals)
+
+        idx = np.argsort(fvals, kind='stable')
+        idx = idx[~np.isnan(fvals[idx])]
+
+        return x_vals_batch[idx]
+
+    def optimize(self, num_presearch=0):
+        """Solve the least-squares problem and return the best values of the free parameters.
+
+        With a pre-search, the local search also starts from the best points of the design.
+        """
+        x_vals_start, bounds = self.get_free()
+
+        # The solver requires a starting point in the interior of the bounds.
+        x_vals_start = np.clip(x_vals_start, bounds[:, 0] + 2 * SMALL_FLOAT,
+                               bounds[:, 1] - 2 * SMALL_FLOAT)
+
+        x_vals_starts = []
+        if np.all(np.isfinite(self.residuals(x_vals_start))):
+            x_vals_starts += [x_vals_start]
+
+        if num_presearch > 0:
+            x_vals_starts += list(self.presearch(num_presearch)[:PRESEARCH_BEST])
+
+        # We only start the local search from points where the model can be evaluated.
+        for x_vals in x_vals_starts:
+            least_squares(self.residuals, x_vals, jac=self.jacobian,
+                          bounds=(bounds[:, 0], bounds[:, 1]), method='trf')
+
+        return self.attr['x_vals_step']
 
     def _update_evaluation(self, fval, x_vals):
-        """Update all attributes based on the new evaluation and write some information to files."""
+        """Update all attributes based on the new evaluation."""
         self.attr['f_current'] = fval
         self.attr['num_eval'] += 1
 
-        # Determine special events
+        # Determine special events. The starting values always serve as the first step, even if the
+        # distance is huge or not available at all.
         is_start = self.attr['num_eval'] == 1
-        is_step = fval < self.attr['f_step']
+        is_step = is_start or fval < self.attr['f_step'] or np.isnan(self.attr['f_step'])
 
         # Record information at start
         if is_start:
-            self.attr['x_vals_start'] = x_vals
+            self.attr['x_vals_start'] = np.array(x_vals, copy=True)
             self.attr['f_start'] = fval
 
         # Record information at step
         if is_step:
-            self.attr['x_vals_step'] = x_vals
+            self.attr['x_vals_step'] = np.array(x_vals, copy=True)
             self.attr['f_step'] = fval
 
-        if self.attr['num_eval'] == 100:
-            raise MaxfunError
 
+def get_latin_hypercube(num_points, bounds):
+    """Construct a Latin hypercube design in the interior of the bounds.
+
+    The design is reproducible and does not interfere with the global random state.
+    """
+    random_state = np.random.RandomState(PRESEARCH_SEED)
+    num_paras = bounds.shape[0]
+
+    design = np.tile(np.nan, (num_points, num_paras))
+    for j in range(num_paras):
+        strata = random_state.permutation(num_points) + random_state.uniform(size=num_points)
+        design[:, j] = strata / num_points
+
+    lower, upper = bounds[:, 0] + 2 * SMALL_FLOAT, bounds[:, 1] - 2 * SMALL_FLOAT
+
+    return lower + design * (upper - lower)
 
-def get_automatic_starting_values(paras_obj, df_obs, questions, version, **version_specific):
+
+def get_automatic_starting_values(paras_obj, df_obs, questions, version, executor_obj=None,
+                                  num_presearch=0, **version_specific):
     """Update the container for the parameters with the automatic starting values."""
     def _adjust_bounds(value, bounds):
         """Adjust the starting values to meet the requirements of the bounds."""
@@ -151,36 +267,16 @@ def get_automatic_starting_values(paras_obj, df_obs, questions, version, **versi
     if df_mask.isnull().all():
         return paras_obj
 
-    # We first get the observed average compensation from the data.
-    m_optimal_obs = [df_mask.loc[slice(None), q].mean() for q in questions]
-    m_optimal_obs = np.array(m_optimal_obs)
-
-    # Now we gather information about the utility parameters and prepare for the interface to the
-    # optimization algorithm.
-
-    # start_utility_paras = paras_obj.get_values('econ', 'all')[:5
-    start_paras, start_bounds, start_fixed = [], [], []
-    for label in PREFERENCE_PARAMETERS[version]:
-        value, is_fixed, bounds = paras_obj.get_para(label)
-        start_fixed += [is_fixed]
-
-        # Get list of labels that are not fixed
-        if is_fixed:
-            continue
-        start_paras += [value]
-        start_bounds += [bounds]
+    # We first get the observed average and standard deviation of the compensation from the data.
+    df_grouped = df_mask.groupby(level='Question')
+    m_optimal_obs = df_grouped.mean().reindex(questions).values
+    sds_obs = df_grouped.std().reindex(questions)
 
     # We minimize the squared distance between the observed and theoretical average
     # compensations. This is only a valid request if there are any free preference parameters.
-    if len(start_paras) > 0:
-        args = [questions, m_optimal_obs, start_fixed, copy.deepcopy(paras_obj), version]
-        start_obj = StartClass(*args, **version_specific)
-
-        try:
-            minimize(start_obj.evaluate, start_paras, method='L-BFGS-B', bounds=start_bounds)
-        except MaxfunError:
-            pass
-        start_utility = start_obj.get_attr('x_vals_step').tolist()
+    start_obj = StartClass(questions, m_optimal_obs, paras_obj, executor_obj, **version_specific)
+    if any(start_obj.get_attr('is_free')):
+        start_utility = start_obj.optimize(num_presearch).tolist()
 
     # We construct the relevant set of free economic starting values.
     x_econ_free_start = []
@@ -193,8 +289,7 @@ def get_automatic_starting_values(paras_obj, df_obs, questions, version, **versi
             if label in PREFERENCE_PARAMETERS[version]:
                 x_econ_free_start += [_adjust_bounds(start_utility.pop(0), bounds)]
             else:
-                cond = df_obs['Compensation'].isin([NEVER_SWITCHERS])
-                value = df_obs['Compensation'].mask(cond).loc[slice(None), label].std()
+                value = sds_obs.loc[label]
                 # If there are no individuals observed without truncation for a particular
                 # question, we start with 0.1.
                 if pd.isnull(value):
@@ -207,6 +302,25 @@ def get_automatic_starting_values(paras_obj, df_obs, questions, version, **versi
     return paras_obj
 
 
+def get_xtol_schedule(optimizer, opt_options):
+    """Return the schedule of tolerances for the root-finding during an estimation.
+
+    The gradient-based optimizers approximate the gradient by finite differences. We only use
+    tolerances that are small relative to their step size as the approximation is otherwise
+    dominated by the error of the root-finding.
+    """
+    xtol_schedule = XTOL_SCHEDULE[:]
+    if optimizer in ['SCIPY-BFGS', 'SCIPY-L-BFGS-B', 'BHHH']:
+        threshold = opt_options[optimizer]['eps'] * XTOL_FD_SHARE
+        xtol_schedule = [xtol for xtol in xtol_schedule if xtol <= threshold]
+
+    # The last tolerance is always the default one.
+    if len(xtol_schedule) == 0:
+        xtol_schedule = XTOL_SCHEDULE[-1:]
+
+    return xtol_schedule
+
+
 def estimate_cleanup():
     """Ensure that we start the estimation with a clean slate."""
     # We remove the directories that contain the simulated choice menus at the start.
@@ -215,7 +329,7 @@ def estimate_cleanup():
             shutil.rmtree(dirname)
 
     # We remove the information from earlier estimation runs.
-    for fname in ['est.trempy.info', 'est.trempy.log', '.stop.trempy.scratch']:
+    for fname in ['est.trempy.info', 'est.trempy.log', 'est.trempy.json', '.stop.trempy.scratch']:
         if os.path.exists(fname):
             os.remove(fname)
 
@@ -243,14 +357,15 @@ def estimate_simulate(which, points, model_obj, df_obs):
     sim_model.write_out(which + '.trempy.ini')
     simulate(which + '.trempy.ini')
 
-    compare_datasets(which, df_obs, questions, m_optimal)
+    sim_format = sim_model.get_attr('sim_format')
+    compare_datasets(get_dataset_fname(which, sim_format), df_obs, questions, m_optimal)
 
     os.chdir('../')
 
 
-def compare_datasets(which, df_obs, questions, m_optimal):
+def compare_datasets(sim_file, df_obs, questions, m_optimal):
     """Compare the estimation dataset with a simulated one using the estimated parameter vector."""
-    df_sim = pd.read_pickle(which + '.trempy.pkl')
+    df_sim = read_dataset(sim_file)
 
     df_sim_masked = df_sim['Compensation'].mask(df_sim['Compensation'].isin([NEVER_SWITCHERS]))
     df_obs_masked = df_obs['Compensation'].mask(df_obs['Compensation'].isin([NEVER_SWITCHERS]))
@@ -319,7 +434,7 @@ def compare_datasets(which, df_obs, questions, m_optimal):
         if np_stats.size == 0:
             rmse = '---'
         else:
-            rmse = '{:15.5f}\n'.format(get_rmse(*np_stats.T))
+            rmse = '{:15.5f}\n'.format(np.sqrt(np.mean((np_stats[:, 0] - np_stats[:, 1]) ** 2)))
 
         line = '{:>15}'.format('RMSE') + '{:>15}\n'.format(rmse)
         outfile.write(line)
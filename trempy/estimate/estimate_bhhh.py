@@ -0,0 +1,105 @@
+"""This module contains the BHHH optimizer for the maximum likelihood estimation."""
+import copy
+
+import numpy as np
+
+from trempy.estimate.estimate_inference import get_contributions_batch
+from trempy.config_trempy import BHHH_MAX_HALVING
+
+
+def minimize_bhhh(estimate_obj, x_optim_free_start, gtol, eps):
+    """Minimize the criterion function by the method of Berndt, Hall, Hall and Hausman.
+
+    The outer product of the gradients of the log-likelihood contributions of each observation
+    approximates the Hessian. The gradients are approximated by central differences for the
+    parameters in the optimizer's parametrization and the optimal compensations are determined
+    only once for each distinct set of preference parameters. Only the trial points of the line
+    search are evaluated through the criterion function. The optimizer stops once the decrement
+    of the criterion function predicted by the direction falls below the tolerance.
+    """
+    args = [estimate_obj.get_attr(label) for label in ['utility_obj', 'likelihood_obj',
+                                                       'paras_obj']]
+    utility_obj, likelihood_obj, paras_obj = args
+
+    # We use a separate copy of the parameters to transform the perturbed points.
+    paras_copy = copy.deepcopy(paras_obj)
+
+    x_optim_free_current = np.array(x_optim_free_start, dtype=np.float64)
+    fval = estimate_obj.evaluate(x_optim_free_current)
+
+    opt = dict()
+    opt['success'] = False
+    opt['nit'] = 0
+
+    while True:
+        # The most recent evaluation is always at the current point.
+        m_optimal = estimate_obj.get_attr('m_optimal_current')
+        scores = _get_scores_optim(utility_obj, likelihood_obj, paras_copy, x_optim_free_current,
+                                   m_optimal, eps)
+        num_obs = scores.shape[0]
+
+        gradient = np.sum(scores, axis=0)
+        outer = np.dot(scores.T, scores)
+
+        direction = np.linalg.lstsq(outer, gradient, rcond=None)[0]
+        decrement = np.dot(gradient, direction) / num_obs
+
+        if not np.isfinite(decrement):
+            opt['message'] = 'Gradient of the criterion function is not well-behaved.'
+            break
+
+        if decrement < gtol:
+            opt['message'] = 'Optimization terminated successfully.'
+            opt['success'] = True
+            break
+
+        # We halve the step until the criterion function improves.
+        step, is_improvement = 1.0, False
+        for _ in range(BHHH_MAX_HALVING + 1):
+            x_optim_free_candidate = x_optim_free_current + step * direction
+            fval_candidate = estimate_obj.evaluate(x_optim_free_candidate)
+            if fval_candidate < fval:
+                is_improvement = True
+                break
+            step = step / 2.0
+
+        if not is_improvement:
+            opt['message'] = 'Line search did not improve the criterion function.'
+            break
+
+        x_optim_free_current, fval = x_optim_free_candidate, fval_candidate
+        opt['nit'] += 1
+
+    opt['x'] = x_optim_free_current
+    opt['fun'] = fval
+
+    return opt
+
+
+def _get_scores_optim(utility_obj, likelihood_obj, paras_obj, x_optim_free, m_optimal, eps):
+    """Approximate the gradients of the log-likelihood contributions of each observation.
+
+    The gradients refer to the free parameters in the optimizer's parametrization.
+    """
+    paras_obj.set_values('optim', 'free', x_optim_free)
+    x_econ_all = paras_obj.get_values('econ', 'all')
+
+    steps = eps * np.maximum(np.abs(x_optim_free), 1.0)
+    num_free = len(x_optim_free)
+
+    points = []
+    for sign in [1.0, -1.0]:
+        for i in range(num_free):
+            x_optim_shifted = np.array(x_optim_free, dtype=np.float64)
+            x_optim_shifted[i] += sign * steps[i]
+            paras_obj.set_values('optim', 'free', x_optim_shifted)
+            points += [tuple(paras_obj.get_values('econ', 'all'))]
+
+    paras_obj.set_values('optim', 'free', x_optim_free)
+
+    contribs = get_contributions_batch(utility_obj, likelihood_obj, paras_obj, x_econ_all, points,
+                                       m_optimal)
+
+    scores = np.array(contribs[:num_free]).T - np.array(contribs[num_free:]).T
+
+    return scores / (2.0 * steps)
@@ -0,0 +1,126 @@
+"""This module contains the capabilities for the nonparametric bootstrap over agents."""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+import pandas as pd
+import numpy as np
+
+from trempy.shared.shared_auxiliary import dist_class_attributes
+from trempy.shared.shared_auxiliary import floating_point_policy
+from trempy.config_trempy import PREFERENCE_PARAMETERS
+from trempy.shared.clsLikelihood import get_agent_arrays
+from trempy.estimate.estimate import estimate_model
+from trempy.shared.clsLikelihood import LikelihoodCls
+from trempy.custom_exceptions import TrempyError
+from trempy.process.process import process
+
+# Each worker process holds the views on the observed arrays in shared memory.
+_WORKER_CACHE = dict()
+
+
+@floating_point_policy
+def bootstrap(model_obj, df_obs=None, num_boots=100, workers=None, seed=None, is_full=True):
+    """Estimate the model on samples of agents that are drawn with replacement.
+
+    The observed dataset is processed based on the specification, unless it is provided directly.
+    Each replicate only receives the number of times each agent is drawn, while the observed
+    arrays are shared with all worker processes. All replicates start at the estimate for the
+    full sample, which is determined first unless the current parameters of the model are used
+    instead. Each estimation runs in its own directory, i.e. bootstrap/full and
+    bootstrap/<replicate>. The estimates for all replicates are collected in a single table and
+    also stored in bootstrap.trempy.pkl.
+    """
+    args = [model_obj, 'version', 'est_file', 'questions', 'num_skip', 'est_agents', 'cutoffs',
+            'fingerprint']
+    version, est_file, questions, num_skip, est_agents, cutoffs, fingerprint = \
+        dist_class_attributes(*args)
+
+    if num_boots < 1:
+        raise TrempyError('at least one replicate required')
+
+    if df_obs is None:
+        df_obs = process(est_file, questions, num_skip, est_agents, cutoffs, fingerprint)
+
+    # We do not want to simulate samples at the beginning and end of each estimation, nor
+    # conduct the inference for each replicate.
+    model_obj.set_attr('est_detailed', False)
+    model_obj.set_attr('inference', 'none')
+
+    if not os.path.exists('bootstrap'):
+        os.mkdir('bootstrap')
+
+    if is_full:
+        _, x_econ_all_step = _estimate_scratch(model_obj, 'full', df_obs)
+        model_obj.update('econ', 'all', x_econ_all_step)
+    model_obj.set_attr('start', 'init')
+
+    arrays = get_agent_arrays(df_obs, questions)
+    num_agents = df_obs.index.get_level_values(0).nunique()
+
+    # We draw the number of times each agent enters each replicate.
+    probs = np.tile(1.0 / num_agents, num_agents)
+    weights = np.random.RandomState(seed).multinomial(num_agents, probs, size=num_boots)
+
+    # The observed arrays are copied to shared memory only once.
+    memories, specs = [], []
+    try:
+        for label, array in zip(['compensation', 'pos', 'agent_codes'], arrays):
+            memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=memory.buf)[:] = array
+            specs += [(label, memory.name, array.shape, array.dtype.str)]
+            memories += [memory]
+
+        args = [[model_obj] * num_boots, [str(i) for i in range(num_boots)], list(weights)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker,
+                                 initargs=(specs,)) as executor:
+            rslt = list(executor.map(_estimate_replicate, *args))
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+    # We collect the results for all replicates in a single table.
+    labels = PREFERENCE_PARAMETERS[version] + questions
+
+    df_rslt = pd.DataFrame([x_econ_all_step for _, x_econ_all_step in rslt], columns=labels,
+                           index=pd.Index(range(num_boots), name='Replicate'))
+    df_rslt['Criterion'] = [fval for fval, _ in rslt]
+
+    df_rslt.to_pickle('bootstrap.trempy.pkl', protocol=2)
+
+    return df_rslt
+
+
+def _initialize_worker(specs):
+    """Attach each worker process to the observed arrays in shared memory."""
+    for label, name, shape, dtype in specs:
+        memory = shared_memory.SharedMemory(name=name)
+        _WORKER_CACHE[label] = np.ndarray(shape, dtype, buffer=memory.buf)
+        _WORKER_CACHE[label + '_memory'] = memory
+
+
+def _estimate_replicate(model_obj, dirname, weights):
+    """Estimate the model for a single replicate based on the shared observed arrays."""
+    questions, cutoffs = dist_class_attributes(model_obj, 'questions', 'cutoffs')
+
+    arrays = [_WORKER_CACHE[label] for label in ['compensation', 'pos', 'agent_codes']]
+    likelihood_obj = LikelihoodCls(None, questions, cutoffs, weights=weights, arrays=arrays)
+
+    return _estimate_scratch(model_obj, dirname, likelihood_obj=likelihood_obj)
+
+
+def _estimate_scratch(model_obj, dirname, df_obs=None, likelihood_obj=None):
+    """Estimate the model in a separate directory and return the results."""
+    cwd = os.getcwd()
+    dirname = os.path.join('bootstrap', dirname)
+    if not os.path.exists(dirname):
+        os.mkdir(dirname)
+
+    os.chdir(dirname)
+    try:
+        rslt = estimate_model(model_obj, df_obs, likelihood_obj=likelihood_obj)
+    finally:
+        os.chdir(cwd)
+
+    return rslt
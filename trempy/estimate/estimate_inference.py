@@ -0,0 +1,231 @@
+"""This module contains the capabilities for the inference at the estimate."""
+import numpy as np
+
+from trempy.config_trempy import PREFERENCE_PARAMETERS
+from trempy.config_trempy import INFERENCE_STEP
+from trempy.estimate.clsResults import ResultsCls
+from trempy.shared.clsExecutor import ExecutorCls
+from trempy.custom_exceptions import TrempyError
+
+
+def get_free_positions(paras_obj, questions):
+    """Return the position of the free parameters in the economic parametrization."""
+    labels = PREFERENCE_PARAMETERS[paras_obj.attr['version']] + questions
+
+    return [i for i, label in enumerate(labels) if not paras_obj.get_para(label)[1]]
+
+
+def get_inference_steps(paras_obj, questions, x_econ_all):
+    """Determine the steps of the finite differences for the free parameters.
+
+    The steps are relative to the magnitude of each parameter and shrink close to the bounds so
+    that all perturbed values remain admissible.
+    """
+    bounds = paras_obj.get_bounds('all')
+
+    steps = []
+    for i in get_free_positions(paras_obj, questions):
+        lower, upper = bounds[i]
+        step = INFERENCE_STEP * max(abs(x_econ_all[i]), 1.0)
+        steps += [min(step, (x_econ_all[i] - lower) / 4.0, (upper - x_econ_all[i]) / 4.0)]
+
+    return np.array(steps)
+
+
+def get_optimal_compensations_batch(utility_obj, paras_obj, x_econ_all, points, m_optimal):
+    """Determine the optimal compensations at several economic parameter vectors.
+
+    The optimal compensations only depend on the preference parameters, so we determine them
+    only once for each distinct set of preference parameters. All points that share the
+    preference parameters of the base vector reuse its optimal compensations. The root-finding
+    for the remaining sets is distributed by the executor of the utility model and starts from
+    the optimal compensations of the base vector.
+    """
+    questions = utility_obj.get_attr('questions')
+    nparas_econ = paras_obj.attr['nparas_econ']
+
+    executor_obj = utility_obj.get_attr('executor_obj')
+    if executor_obj is None:
+        executor_obj = ExecutorCls()
+
+    paras_base = tuple(x_econ_all[:nparas_econ])
+    paras_all = dict()
+    for point in points:
+        if tuple(point[:nparas_econ]) != paras_base:
+            paras_all[tuple(point[:nparas_econ])] = None
+    paras_all = list(paras_all.keys())
+
+    rslt = executor_obj.solve_batch(utility_obj.get_settings(), paras_all, questions, m_optimal)
+    m_optimals = dict(zip(paras_all, rslt))
+    m_optimals[paras_base] = m_optimal
+
+    return m_optimals
+
+
+def get_hessian(utility_obj, likelihood_obj, paras_obj, x_econ_all, m_optimal=None):
+    """Approximate the Hessian of the criterion function by central differences.
+
+    The Hessian refers to the free economic parameters. All perturbations of only the standard
+    deviations reuse the optimal compensations at the estimate.
+    """
+    questions = utility_obj.get_attr('questions')
+    nparas_econ = paras_obj.attr['nparas_econ']
+
+    positions = get_free_positions(paras_obj, questions)
+    steps = get_inference_steps(paras_obj, questions, x_econ_all)
+    num_free = len(positions)
+
+    def _shift(moves):
+        """Perturb the estimate for a number of parameters at once."""
+        x_econ_shifted = list(x_econ_all)
+        for i, step in moves:
+            x_econ_shifted[positions[i]] += step
+        return tuple(x_econ_shifted)
+
+    # We collect all points of the stencil first.
+    stencils = dict()
+    for i in range(num_free):
+        for j in range(i + 1):
+            if i == j:
+                points = [_shift([(i, 2 * steps[i])]), _shift([(i, -2 * steps[i])])]
+                points += [tuple(x_econ_all)] * 2
+                signs = [1.0, 1.0, -1.0, -1.0]
+            else:
+                points = []
+                for sign_i, sign_j in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
+                    points += [_shift([(i, sign_i * steps[i]), (j, sign_j * steps[j])])]
+                signs = [1.0, -1.0, -1.0, 1.0]
+            stencils[(i, j)] = (points, signs)
+
+    if m_optimal is None:
+        m_optimal = utility_obj.get_optimal_compensations(paras_obj)
+
+    points = [point for points, _ in stencils.values() for point in points]
+    m_optimals = get_optimal_compensations_batch(utility_obj, paras_obj, x_econ_all, points,
+                                                 m_optimal)
+
+    # The evaluation of the likelihood is cheap compared to the root-finding.
+    fvals = dict()
+    for points, _ in stencils.values():
+        for point in points:
+            if point not in fvals.keys():
+                sds = list(point[nparas_econ:])
+                fvals[point] = likelihood_obj.evaluate(paras_obj, sds,
+                                                       m_optimals[point[:nparas_econ]])
+
+    # A parameter at its bounds results in a missing entry.
+    hessian = np.tile(np.nan, (num_free, num_free))
+    for (i, j), (points, signs) in stencils.items():
+        stat = sum(sign * fvals[point] for point, sign in zip(points, signs))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            hessian[i, j] = hessian[j, i] = stat / (4.0 * steps[i] * steps[j])
+
+    return hessian
+
+
+def get_contributions_batch(utility_obj, likelihood_obj, paras_obj, x_econ_all, points,
+                            m_optimal, by_agent=False):
+    """Calculate the log-likelihood contributions at several economic parameter vectors.
+
+    The optimal compensations at the base vector are provided and reused where possible.
+    """
+    nparas_econ = paras_obj.attr['nparas_econ']
+
+    m_optimals = get_optimal_compensations_batch(utility_obj, paras_obj, x_econ_all, points,
+                                                 m_optimal)
+
+    contribs = []
+    for point in points:
+        args = [paras_obj, list(point[nparas_econ:]), m_optimals[tuple(point[:nparas_econ])]]
+        contribs += [likelihood_obj.get_contributions(*args, by_agent=by_agent)]
+
+    return contribs
+
+
+def get_scores(utility_obj, likelihood_obj, paras_obj, x_econ_all, m_optimal=None,
+               by_agent=False):
+    """Approximate the gradients of the log-likelihood contributions by central differences.
+
+    The gradients refer to the free economic parameters, there is one row for each observation
+    or, if requested, for each agent.
+    """
+    questions = utility_obj.get_attr('questions')
+
+    positions = get_free_positions(paras_obj, questions)
+    steps = get_inference_steps(paras_obj, questions, x_econ_all)
+    num_free = len(positions)
+
+    if m_optimal is None:
+        m_optimal = utility_obj.get_optimal_compensations(paras_obj)
+
+    points = []
+    for sign in [1.0, -1.0]:
+        for i, pos in enumerate(positions):
+            x_econ_shifted = list(x_econ_all)
+            x_econ_shifted[pos] += sign * steps[i]
+            points += [tuple(x_econ_shifted)]
+
+    contribs = get_contributions_batch(utility_obj, likelihood_obj, paras_obj, x_econ_all, points,
+                                       m_optimal, by_agent)
+
+    scores = np.array(contribs[:num_free]).T - np.array(contribs[num_free:]).T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = scores / (2.0 * steps)
+
+    return scores
+
+
+def get_inference(utility_obj, likelihood_obj, paras_obj, x_econ_all, method='hessian'):
+    """Calculate the covariance matrix of the free economic parameters.
+
+    The criterion function is the average negative log-likelihood, so we scale the inverse of its
+    Hessian by the number of observations. The outer product of the gradients is based on the
+    contributions of each observation, while the sandwich estimator clusters them by agent.
+    """
+    questions = utility_obj.get_attr('questions')
+    nparas_econ = paras_obj.attr['nparas_econ']
+
+    positions = get_free_positions(paras_obj, questions)
+    labels = PREFERENCE_PARAMETERS[paras_obj.attr['version']] + questions
+
+    paras_obj.set_values('econ', 'all', x_econ_all)
+    m_optimal = utility_obj.get_optimal_compensations(paras_obj)
+
+    fval = likelihood_obj.evaluate(paras_obj, list(x_econ_all[nparas_econ:]), m_optimal)
+    num_obs = likelihood_obj.get_attr('num_obs')
+
+    info = dict()
+    if method in ['hessian', 'sandwich']:
+        info['hessian'] = get_hessian(utility_obj, likelihood_obj, paras_obj, x_econ_all,
+                                      m_optimal)
+    if method in ['opg', 'sandwich']:
+        scores = get_scores(utility_obj, likelihood_obj, paras_obj, x_econ_all, m_optimal,
+                            by_agent=(method in ['sandwich']))
+        info['outer'] = np.dot(scores.T, scores)
+
+    if method in ['hessian']:
+        cov = _invert(info['hessian']) / num_obs
+    elif method in ['opg']:
+        cov = _invert(info['outer'])
+    elif method in ['sandwich']:
+        bread = _invert(info['hessian'] * num_obs)
+        cov = np.dot(np.dot(bread, info['outer']), bread)
+    else:
+        raise TrempyError('inference not implemented')
+
+    args = [[labels[i] for i in positions], [x_econ_all[i] for i in positions], fval, num_obs,
+            cov, method]
+
+    return ResultsCls(*args, **info)
+
+
+def _invert(matrix):
+    """Invert a matrix and flag the result as missing if this is not possible."""
+    inverse = np.tile(np.nan, matrix.shape)
+    if np.all(np.isfinite(matrix)):
+        try:
+            inverse = np.linalg.inv(matrix)
+        except np.linalg.LinAlgError:
+            pass
+
+    return inverse
@@ -0,0 +1,124 @@
+"""This module contains the class to manage the utility copula across evaluations."""
+import numpy as np
+
+from trempy.interface.interface_copulpy import get_copula_scaled_archimedean
+from trempy.interface.interface_copulpy import get_copula_nonstationary
+from trempy.shared.shared_auxiliary import solve_optimal_compensations
+from trempy.record.clsInstrument import instrument_obj
+from trempy.custom_exceptions import TrempyError
+from trempy.shared.clsBase import BaseCls
+
+
+class UtilityModelCls(BaseCls):
+    """This class manages the utility copula for a sequence of parameter values.
+
+    The specification of the model is only validated once. The copula is only rebuilt once the
+    preference parameters change and the optimal compensations are reused for repeated
+    evaluations at the same parameters.
+    """
+
+    def __init__(self, paras_obj, questions, executor_obj=None, **version_specific):
+        """Init class."""
+        version = paras_obj.attr['version']
+
+        self.attr = dict()
+        self.attr['executor_obj'] = executor_obj
+        self.attr['nparas_econ'] = paras_obj.attr['nparas_econ']
+        self.attr['questions'] = questions
+        self.attr['version'] = version
+
+        if version in ['scaled_archimedean']:
+            for question in questions:
+                if question <= 30 and not question == 13:
+                    raise TrempyError('Temporal decisions not implemented for scaled_archimedean.')
+            self.attr['marginals'] = version_specific['marginals']
+            self.attr['upper'] = version_specific['upper']
+        elif version in ['nonstationary']:
+            discounting = paras_obj.attr['discounting']
+            np.testing.assert_equal(discounting in [None, 'hyperbolic', 'exponential'], True)
+            self.attr['stationary_model'] = paras_obj.attr['stationary_model']
+            self.attr['df_other'] = paras_obj.attr['df_other']
+            self.attr['discounting'] = discounting
+        else:
+            raise TrempyError('version not implemented')
+
+        # Housekeeping attributes
+        self.attr['m_optimal_key'] = None
+        self.attr['is_rebuilt'] = False
+        self.attr['m_optimal'] = None
+        self.attr['copula'] = None
+        self.attr['paras'] = None
+
+    def get_settings(self):
+        """Collect the settings that determine the utility copula besides its parameters."""
+        settings = dict()
+        settings['version'] = self.attr['version']
+        if self.attr['version'] in ['scaled_archimedean']:
+            labels = ['upper', 'marginals']
+        elif self.attr['version'] in ['nonstationary']:
+            labels = ['discounting', 'stationary_model', 'df_other']
+        for label in labels:
+            settings[label] = self.attr[label]
+
+        return settings
+
+    def update(self, paras_obj):
+        """Update the preference parameters and rebuild the copula only if they changed."""
+        paras = tuple(paras_obj.get_values('econ', 'all')[:self.attr['nparas_econ']])
+
+        is_hit = paras == self.attr['paras']
+        instrument_obj.record_cache('copula', is_hit)
+        self.attr['is_rebuilt'] = False
+        if is_hit:
+            return
+
+        # The worker processes rebuild the copula themselves, so we do not need it here. The
+        # information on the fit of the copula then remains with the workers as well.
+        executor_obj = self.attr['executor_obj']
+        if executor_obj is not None and executor_obj.is_remote():
+            copula = None
+        else:
+            with instrument_obj.phase('copula'):
+                copula = build_copula(self.get_settings(), paras)
+            self.attr['is_rebuilt'] = True
+
+        self.attr['copula'] = copula
+        self.attr['paras'] = paras
+
+    def get_optimal_compensations(self, paras_obj, m_start=None, xtol=None, solver='brenth'):
+        """Return the optimal compensations for all questions at the current parameters."""
+        self.update(paras_obj)
+
+        key = (self.attr['paras'], xtol, solver)
+
+        is_hit = key == self.attr['m_optimal_key']
+        instrument_obj.record_cache('compensations', is_hit)
+        if not is_hit:
+            args = [self.attr['copula'], self.attr['questions'], m_start, xtol, solver]
+            if self.attr['executor_obj'] is None:
+                self.attr['m_optimal'] = solve_optimal_compensations(*args)
+            else:
+                args += [self.get_settings(), self.attr['paras']]
+                self.attr['m_optimal'] = self.attr['executor_obj'].solve(*args)
+            self.attr['m_optimal_key'] = key
+
+        return self.attr['m_optimal'].copy()
+
+
+def build_copula(settings, paras):
+    """Build the utility copula for the settings of the model and the preference parameters."""
+    version = settings['version']
+
+    if version in ['scaled_archimedean']:
+        copula = get_copula_scaled_archimedean(settings['upper'], settings['marginals'], *paras)
+    elif version in ['nonstationary']:
+        copula = get_copula_nonstationary(
+            *paras,
+            discounting=settings['discounting'],
+            stationary_model=settings['stationary_model'],
+            df_other=settings['df_other'],
+            is_checked=False)
+    else:
+        raise TrempyError('version not implemented')
+
+    return copula
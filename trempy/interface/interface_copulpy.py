@@ -2,6 +2,7 @@
 import numpy as np
 
 from trempy.custom_exceptions import TrempyError
+from trempy.config_trempy import DELAYS
 from copulpy import UtilityCopulaCls
 
 
@@ -29,6 +30,41 @@ def get_copula_scaled_archimedean(upper, marginals, r_self, r_other, delta, self
     return copula
 
 
+def get_delay_weights(y_scale, unrestricted_weights, stationary_model, df_other):
+    """Calculate the weights c_t in the CES function for all delays in a single operation.
+
+    The weights are ordered as the delays in DELAYS. There are no weights if they follow from
+    the parametric restrictions derived from theory.
+    """
+    if df_other in ['equal_univariate']:
+        # We use the parametric restrictions on c_t derived from theory.
+        weights = None
+    elif df_other in ['free']:
+        # The weight c_t in the CES function is free.
+        if None in unrestricted_weights:
+            raise TrempyError('discount function for other is set to free but contains None type')
+        weights = np.array(unrestricted_weights)
+    elif df_other in ['linear']:
+        # Impose a linear structure on c_t in the CES function.
+        weights = np.maximum(0, y_scale + DELAYS * unrestricted_weights[0])
+    elif df_other in ['exponential']:
+        # Impose an exponential structure on c_t in the CES function.
+        weights = y_scale * unrestricted_weights[0] ** DELAYS
+    else:
+        raise TrempyError('df_other not implemented')
+
+    # The model becomes stationary.
+    if stationary_model is True:
+        weights = np.tile(y_scale, DELAYS.shape[0])
+
+    return weights
+
+
+def get_delay_dict(values):
+    """Map values ordered as the delays in DELAYS to the dictionary expected by copulpy."""
+    return dict(zip(DELAYS.tolist(), np.array(values).tolist()))
+
+
 def get_copula_nonstationary(alpha, beta, gamma, y_scale,
                              discount_factors_0, discount_factors_1, discount_factors_3,
                              discount_factors_6, discount_factors_12, discount_factors_24,
@@ -37,11 +73,13 @@ def get_copula_nonstationary(alpha, beta, gamma, y_scale,
                              unrestricted_weights_12, unrestricted_weights_24,
                              discounting=None,
                              stationary_model=False,
-                             df_other='equal_univariate'
+                             df_other='equal_univariate',
+                             is_checked=True
                              ):
     """Access the nonstationary utility copula."""
-    # Anti-bugging.
-    np.testing.assert_equal(discounting in [None, 'hyperbolic', 'exponential'], True)
+    # Anti-bugging, which can be skipped if the specification is already validated.
+    if is_checked:
+        np.testing.assert_equal(discounting in [None, 'hyperbolic', 'exponential'], True)
 
     version = 'nonstationary'
     copula_spec = {'version': version}
@@ -55,43 +93,18 @@ def get_copula_nonstationary(alpha, beta, gamma, y_scale,
     }
 
     # "Nonparametric" discount factors D_t for t in 0,1,3,6,12,24.
-    dfx = {
-        0: discount_factors_0,
-        1: discount_factors_1,
-        3: discount_factors_3,
-        6: discount_factors_6,
-        12: discount_factors_12,
-        24: discount_factors_24,
-    }
-    copula_spec[version]['discount_factors'] = dfx
-
-    if df_other in ['equal_univariate']:
-        # We use the parametric restrictions on c_t derived from theory.
-        dict_unrestricted = None
-    elif df_other in ['free']:
-        # The weight c_t in the CES function is free.
-        dict_unrestricted = {
-            0: unrestricted_weights_0,
-            1: unrestricted_weights_1,
-            3: unrestricted_weights_3,
-            6: unrestricted_weights_6,
-            12: unrestricted_weights_12,
-            24: unrestricted_weights_24,
-        }
-        if None in dict_unrestricted.values():
-            raise TrempyError('discount function for other is set to free but contains None type')
-    elif df_other in ['linear']:
-        # Impose a linear structure on c_t in the CES function.
-        dict_unrestricted = {
-            t: max(0, y_scale + t * unrestricted_weights_0) for t in [0, 1, 3, 6, 12, 24]
-        }
-    elif df_other in ['exponential']:
-        # Impose an exponential structure on c_t in the CES function.
-        dict_unrestricted = {t: y_scale * unrestricted_weights_0 ** t for t in [0, 1, 3, 6, 12, 24]}
-
-    # The model becomes stationary.
-    if stationary_model is True:
-        dict_unrestricted = {key: y_scale for key in [0, 1, 3, 6, 12, 24]}
+    discount_factors = [discount_factors_0, discount_factors_1, discount_factors_3,
+                        discount_factors_6, discount_factors_12, discount_factors_24]
+    copula_spec[version]['discount_factors'] = get_delay_dict(discount_factors)
+
+    unrestricted_weights = [unrestricted_weights_0, unrestricted_weights_1,
+                            unrestricted_weights_3, unrestricted_weights_6,
+                            unrestricted_weights_12, unrestricted_weights_24]
+    weights = get_delay_weights(y_scale, unrestricted_weights, stationary_model, df_other)
+
+    dict_unrestricted = None
+    if weights is not None:
+        dict_unrestricted = get_delay_dict(weights)
 
     copula_spec[version]['unrestricted_weights'] = dict_unrestricted
 
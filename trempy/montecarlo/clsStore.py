@@ -0,0 +1,81 @@
+"""This module contains the class to store the results of a Monte Carlo study."""
+import sqlite3
+import json
+
+import pandas as pd
+
+from trempy.custom_exceptions import TrempyError
+from trempy.shared.clsBase import BaseCls
+
+# The layout of the tables in the store. The grid of a study might grow between runs, but its
+# settings need to remain the same.
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS study (key TEXT PRIMARY KEY, value TEXT)',
+    'CREATE TABLE IF NOT EXISTS jobs (job TEXT PRIMARY KEY, version TEXT, num_agents INTEGER, '
+    'perturbation REAL, seed INTEGER, status TEXT, fval_truth REAL, fval REAL, elapsed REAL, '
+    'message TEXT)',
+    'CREATE TABLE IF NOT EXISTS results (job TEXT, label TEXT, truth REAL, start REAL, '
+    'estimate REAL, PRIMARY KEY (job, label))',
+]
+
+
+class StoreCls(BaseCls):
+    """This class manages the local store for the results of a Monte Carlo study.
+
+    Each job is written in a single transaction as soon as it is finished, so an interrupted study
+    loses at most the jobs that were running at the time. Only finished jobs are skipped once the
+    study is resumed, failed jobs are attempted again.
+    """
+
+    def __init__(self, fname, settings):
+        """Init class."""
+        self.attr = dict()
+        self.attr['settings'] = settings
+        self.attr['fname'] = fname
+
+        self.attr['conn'] = sqlite3.connect(fname)
+        with self.attr['conn'] as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+        self._check_settings()
+
+    def get_finished(self):
+        """Return the identifiers of all finished jobs."""
+        rslt = self.attr['conn'].execute("SELECT job FROM jobs WHERE status = 'finished'")
+        return set(job for job, in rslt.fetchall())
+
+    def write_job(self, job, rslt):
+        """Write the results of a single job to the store."""
+        with self.attr['conn'] as conn:
+            line = [job['job'], job['version'], job['num_agents'], job['perturbation'],
+                    job['seed'], rslt['status'], rslt['fval_truth'], rslt['fval'],
+                    rslt['elapsed'], rslt['message']]
+            conn.execute('INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', line)
+
+            conn.execute('DELETE FROM results WHERE job = ?', (job['job'],))
+            lines = [[job['job']] + line for line in rslt['results']]
+            conn.executemany('INSERT INTO results VALUES (?, ?, ?, ?, ?)', lines)
+
+    def get_results(self):
+        """Collect the results of all finished jobs in a single table."""
+        query = 'SELECT jobs.job, version, num_agents, perturbation, seed, fval_truth, fval, ' \
+                'label, truth, start, estimate FROM jobs JOIN results ON jobs.job = results.job ' \
+                "WHERE status = 'finished' ORDER BY jobs.job, label"
+
+        return pd.read_sql_query(query, self.attr['conn'])
+
+    def close(self):
+        """Close the connection to the store."""
+        self.attr['conn'].close()
+
+    def _check_settings(self):
+        """Ensure that a study is only resumed with the same settings."""
+        value = json.dumps(self.attr['settings'], sort_keys=True)
+
+        with self.attr['conn'] as conn:
+            rslt = conn.execute("SELECT value FROM study WHERE key = 'settings'").fetchone()
+            if rslt is None:
+                conn.execute("INSERT INTO study VALUES ('settings', ?)", (value,))
+            elif rslt[0] != value:
+                raise TrempyError('store belongs to a study with different settings')
@@ -0,0 +1,86 @@
+"""This module contains the capabilities to run Monte Carlo studies."""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+import itertools
+
+from trempy.montecarlo.montecarlo_auxiliary import run_job
+from trempy.custom_exceptions import TrempyError
+from trempy.montecarlo.clsStore import StoreCls
+
+# A study is defined by the grid of its jobs and some settings that are shared by all jobs.
+GRID_LABELS = ['versions', 'num_agents', 'perturbations', 'seeds']
+
+DEFAULT_SETTINGS = dict()
+DEFAULT_SETTINGS['optimizer'] = 'SCIPY-L-BFGS-B'
+DEFAULT_SETTINGS['no_temporal_choices'] = True
+DEFAULT_SETTINGS['maxfun'] = 1000
+DEFAULT_SETTINGS['solver'] = 'brenth'
+DEFAULT_SETTINGS['warm_start'] = False
+DEFAULT_SETTINGS['adaptive'] = False
+
+
+def run_study(study, fname='montecarlo.trempy.db', workers=None):
+    """Run all jobs of a Monte Carlo study that are not yet in the store.
+
+    The study is a dictionary with the lists of versions, sample sizes, perturbations and seeds
+    that span the grid of jobs. A perturbation is the maximum distance of the starting values
+    from the truth, None draws them from the default bounds. The settings of the estimator, i.e.
+    the optimizer, the maximum number of evaluations, the root-finding and whether to keep the
+    discount factors at the truth, are shared by all jobs and stored with the results. The
+    jobs run in a process pool and their results are written to the store as soon as they finish.
+    Running the study again resumes it, also after extending its grid. The results of all finished
+    jobs are returned in a single table.
+    """
+    jobs, settings = get_jobs(study)
+
+    store_obj = StoreCls(fname, settings)
+    try:
+        finished = store_obj.get_finished()
+        jobs = [job for job in jobs if job['job'] not in finished]
+
+        if len(jobs) > 0:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = dict()
+                for job in jobs:
+                    futures[executor.submit(run_job, job, settings)] = job
+
+                for future in as_completed(futures):
+                    store_obj.write_job(futures[future], future.result())
+
+        df_rslt = store_obj.get_results()
+    finally:
+        store_obj.close()
+
+    return df_rslt
+
+
+def get_jobs(study):
+    """Construct the grid of jobs and the shared settings for a study."""
+    for label in GRID_LABELS:
+        if label not in study.keys():
+            raise TrempyError('study requires a grid of {:}'.format(label))
+
+    settings = dict()
+    for label, value in DEFAULT_SETTINGS.items():
+        settings[label] = study.get(label, value)
+
+    # The settings are stored alongside the results, so we only allow for basic types.
+    settings['no_temporal_choices'] = bool(settings['no_temporal_choices'])
+    settings['warm_start'] = bool(settings['warm_start'])
+    settings['adaptive'] = bool(settings['adaptive'])
+    settings['solver'] = str(settings['solver'])
+    settings['optimizer'] = str(settings['optimizer'])
+    settings['maxfun'] = int(settings['maxfun'])
+
+    jobs = []
+    for version, num_agents, perturbation, seed in itertools.product(
+            *[study[label] for label in GRID_LABELS]):
+        job = dict()
+        job['job'] = '{:}-{:}-{:}-{:}'.format(version, num_agents, perturbation, seed)
+        job['perturbation'] = None if perturbation is None else float(perturbation)
+        job['num_agents'] = int(num_agents)
+        job['version'] = str(version)
+        job['seed'] = int(seed)
+        jobs += [job]
+
+    return jobs, settings
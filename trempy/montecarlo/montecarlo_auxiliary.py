@@ -0,0 +1,305 @@
+"""This module contains auxiliary functions for the Monte Carlo studies."""
+import tempfile
+import shutil
+import copy
+import time
+import os
+
+import numpy as np
+
+from trempy.estimate.estimate_inference import get_free_positions
+from trempy.shared.shared_auxiliary import print_init_dict
+from trempy.config_trempy import PREFERENCE_PARAMETERS
+from trempy.custom_exceptions import TrempyError
+from trempy.config_trempy import DEFAULT_BOUNDS
+from trempy.config_trempy import QUESTIONS_ALL
+from trempy.read.read import ESTIMATION_GROUP
+from trempy.estimate.estimate import estimate
+from trempy.simulate.simulate import simulate
+from trempy.config_trempy import SMALL_FLOAT
+from trempy.clsModel import ModelCls
+
+# The truth of the preference parameters is fixed for each version, as are the standard
+# deviations of the questions and the upper bounds of the marginal utility functions.
+TRUTH = dict()
+TRUTH['scaled_archimedean'] = {'r_self': 1.0, 'r_other': 0.5, 'delta': 0.7, 'self': 0.6,
+                               'other': 0.4}
+TRUTH['nonstationary'] = {'alpha': 1.0, 'beta': 1.0, 'gamma': 1.0, 'y_scale': 0.5}
+for delay, value in zip([0, 1, 3, 6, 12, 24], [1.0, 0.95, 0.9, 0.85, 0.8, 0.75]):
+    TRUTH['nonstationary']['discount_factors_{}'.format(delay)] = value
+    TRUTH['nonstationary']['unrestricted_weights_{}'.format(delay)] = None
+
+TRUTH_STD = 0.5
+TRUTH_UPPER = 600
+
+
+def run_job(job, settings):
+    """Run a single job of a Monte Carlo study in its own scratch directory.
+
+    A failed job does not end the study, its error message is reported instead.
+    """
+    rslt = dict()
+    rslt['status'] = 'failed'
+    rslt['fval_truth'] = None
+    rslt['results'] = []
+    rslt['message'] = ''
+    rslt['fval'] = None
+
+    cwd = os.getcwd()
+    dirname = tempfile.mkdtemp()
+    start = time.perf_counter()
+
+    os.chdir(dirname)
+    try:
+        rslt.update(simulate_estimate(job, settings))
+        rslt['status'] = 'finished'
+    except Exception as error:
+        rslt['message'] = repr(error)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(dirname, ignore_errors=True)
+
+    rslt['elapsed'] = time.perf_counter() - start
+
+    return rslt
+
+
+def simulate_estimate(job, settings):
+    """Simulate a sample at the truth and estimate the model starting from perturbed values.
+
+    The standard deviations are fixed at the truth. Without any perturbation, the estimation
+    starts at the truth.
+    """
+    np.random.seed(job['seed'])
+
+    init_dict = get_init_dict(job['version'], job['num_agents'], job['seed'], settings)
+
+    truth_dict, perturbed_dict = perturbate_econ(
+        init_dict, no_temporal_choices=settings['no_temporal_choices'],
+        max_dist=job['perturbation'])
+
+    print_init_dict(truth_dict, 'truth.trempy.ini')
+    print_init_dict(perturbed_dict, 'perturbed.trempy.ini')
+
+    _, fval_truth = simulate('truth.trempy.ini')
+    fval, x_econ_all_step = estimate('perturbed.trempy.ini')[:2]
+
+    # We collect the truth, the start, and the estimate for all free parameters.
+    model_obj = ModelCls('perturbed.trempy.ini')
+    paras_obj, questions = model_obj.get_attr('paras_obj'), model_obj.get_attr('questions')
+
+    x_econ_all_truth = ModelCls('truth.trempy.ini').get_attr('paras_obj').get_values('econ', 'all')
+    x_econ_all_start = paras_obj.get_values('econ', 'all')
+
+    labels = PREFERENCE_PARAMETERS[job['version']] + questions
+
+    results = []
+    for i in get_free_positions(paras_obj, questions):
+        results += [[str(labels[i]), x_econ_all_truth[i], x_econ_all_start[i],
+                     x_econ_all_step[i]]]
+
+    rslt = dict()
+    rslt['fval_truth'] = fval_truth
+    rslt['results'] = results
+    rslt['fval'] = fval
+
+    return rslt
+
+
+def get_init_dict(version, num_agents, seed, settings):
+    """Construct the specification of the truth for a single job of a Monte Carlo study.
+
+    All options are fixed, either here or by the settings of the study, so all jobs run the same
+    estimator. The standard deviations of all questions are fixed at the truth.
+    """
+    init_dict = dict()
+
+    init_dict['VERSION'] = dict()
+    init_dict['VERSION']['version'] = version
+    init_dict['VERSION']['heterogeneity'] = False
+    init_dict['VERSION']['discounting'] = None
+    init_dict['VERSION']['df_other'] = 'equal_univariate'
+
+    if version in ['scaled_archimedean']:
+        init_dict['VERSION']['stationary_model'] = True
+
+        for group in ['UNIATTRIBUTE SELF', 'UNIATTRIBUTE OTHER']:
+            init_dict[group] = dict()
+            init_dict[group]['max'] = TRUTH_UPPER
+            init_dict[group]['marginal'] = 'exponential'
+        init_dict['UNIATTRIBUTE SELF']['r'] = _get_coefficient('r_self', version)
+        init_dict['UNIATTRIBUTE OTHER']['r'] = _get_coefficient('r_other', version)
+
+        init_dict['MULTIATTRIBUTE COPULA'] = dict()
+        for label in ['delta', 'self', 'other']:
+            init_dict['MULTIATTRIBUTE COPULA'][label] = _get_coefficient(label, version)
+
+        # The scaled Archimedean copula only supports the atemporal questions.
+        questions = [13] + list(range(31, 46))
+
+    elif version in ['nonstationary']:
+        init_dict['VERSION']['stationary_model'] = False
+
+        init_dict['ATEMPORAL'], init_dict['DISCOUNTING'] = dict(), dict()
+        for label in PREFERENCE_PARAMETERS[version]:
+            if label in ['alpha', 'beta', 'gamma', 'y_scale']:
+                init_dict['ATEMPORAL'][label] = _get_coefficient(label, version)
+            else:
+                init_dict['DISCOUNTING'][label] = _get_coefficient(label, version)
+
+        questions = QUESTIONS_ALL
+
+    else:
+        raise TrempyError('version not implemented')
+
+    init_dict['QUESTIONS'] = dict()
+    for q in questions:
+        init_dict['QUESTIONS'][q] = [TRUTH_STD, True, list(DEFAULT_BOUNDS[q])]
+
+    init_dict['CUTOFFS'] = dict()
+
+    init_dict['SIMULATION'] = dict()
+    init_dict['SIMULATION']['agents'] = num_agents
+    init_dict['SIMULATION']['seed'] = seed
+    init_dict['SIMULATION']['file'] = 'truth'
+    init_dict['SIMULATION']['format'] = 'pickle'
+
+    # The settings of the study determine the estimator. The jobs already run in parallel, so
+    # each estimation is serial.
+    init_dict['ESTIMATION'] = dict()
+    init_dict['ESTIMATION']['optimizer'] = settings['optimizer']
+    init_dict['ESTIMATION']['maxfun'] = settings['maxfun']
+    init_dict['ESTIMATION']['solver'] = settings['solver']
+    init_dict['ESTIMATION']['warm_start'] = settings['warm_start']
+    init_dict['ESTIMATION']['adaptive'] = settings['adaptive']
+    init_dict['ESTIMATION']['agents'] = num_agents
+    init_dict['ESTIMATION']['skip'] = 0
+    init_dict['ESTIMATION']['file'] = 'truth.trempy.pkl'
+    init_dict['ESTIMATION']['start'] = 'init'
+    init_dict['ESTIMATION']['detailed'] = False
+    init_dict['ESTIMATION']['fingerprint'] = False
+    init_dict['ESTIMATION']['instrument'] = False
+    init_dict['ESTIMATION']['backend'] = 'serial'
+    init_dict['ESTIMATION']['workers'] = 1
+    init_dict['ESTIMATION']['shards'] = 1
+    init_dict['ESTIMATION']['chunk'] = None
+    init_dict['ESTIMATION']['presearch'] = 0
+    init_dict['ESTIMATION']['inference'] = 'none'
+    init_dict['ESTIMATION']['budget'] = None
+
+    # The options of the optimizers are the same for all studies.
+    init_dict['SCIPY-BFGS'] = {'gtol': 1e-08, 'eps': 1e-05}
+    init_dict['SCIPY-L-BFGS-B'] = {'gtol': 1e-08, 'ftol': 1e-08, 'eps': 1e-05}
+    init_dict['SCIPY-POWELL'] = {'xtol': 1e-08, 'ftol': 1e-08}
+    init_dict['BHHH'] = {'gtol': 1e-06, 'eps': 1e-04}
+
+    return init_dict
+
+
+def _get_coefficient(label, version):
+    """Return the truth for a preference parameter with its default bounds."""
+    value = TRUTH[version][label]
+    return [value, value is None, list(DEFAULT_BOUNDS[label])]
+
+
+def set_questions(init_dict, is_fixed, std=None):
+    """Manipulate questions."""
+    # Change free and fixed status
+    if is_fixed in ['fix_all']:
+        for q in init_dict['QUESTIONS'].keys():
+            init_dict['QUESTIONS'][q][1] = True
+    else:
+        np.testing.assert_equal(len(is_fixed), len(init_dict['QUESTIONS'].keys()))
+        for q, fix_value in enumerate(is_fixed):
+            init_dict['QUESTIONS'][q][1] = fix_value
+    # Change standard deviations
+    if std is not None:
+        np.testing.assert_equal(len(std), len(init_dict['QUESTIONS'].keys()))
+        for q, sd in enumerate(std):
+            init_dict['QUESTIONS'][q][0] = sd
+
+
+def remove_cutoffs(init_dict):
+    """Remove cutoffs."""
+    init_dict['CUTOFFS'] = dict()
+    return init_dict
+
+
+def perturbate_econ(init_dict, no_temporal_choices=True, max_dist=None):
+    """Perturbate all economic parameters and set bounds to default bounds."""
+    old_dict = copy.deepcopy(init_dict)
+
+    version = init_dict['VERSION']['version']
+
+    for group in ESTIMATION_GROUP[version]:
+        for label in PREFERENCE_PARAMETERS[version]:
+            if label in init_dict[group].keys():
+                # Distribute parameters
+                value, is_fixed, _ = init_dict[group][label]
+
+                # Handle optional or unused arguments.
+                if value is None:
+                    continue
+                lower, upper = DEFAULT_BOUNDS[label]
+
+                # Move the parameter by less than max_dist away.
+                if max_dist is not None:
+                    new_value = np.random.uniform(value - max_dist, value + max_dist)
+                    new_value = min(upper, new_value)
+                    new_value = max(lower, new_value)
+                else:
+                    # Get new value
+                    new_value = np.random.uniform(lower, upper)
+
+                if group in ['DISCOUNTING'] and no_temporal_choices is True:
+                    is_fixed = True
+                    new_value = value
+                else:
+                    is_fixed = False
+
+                # Update
+                old_dict[group][label] = [value, is_fixed, [lower, upper]]
+                init_dict[group][label] = [new_value, is_fixed, [lower, upper]]
+    return old_dict, init_dict
+
+
+def perturbate_single(init_dict, label, value=None):
+    """Perturbate a single parameter and fix all other parameters for estimation.
+
+    We also set the bounds for the perturbed parameter to its default bounds.
+    This increases the scope for perturbations.
+    """
+    old_dict = copy.deepcopy(init_dict)
+
+    version = init_dict['VERSION']['version']
+    if label not in PREFERENCE_PARAMETERS[version]:
+        raise TrempyError('Version {0} has no parameters {1}'.format(version, label))
+
+    # Fix variance for each question.
+    for q in init_dict['QUESTIONS'].keys():
+        init_dict['QUESTIONS'][q][1] = True
+
+    # Handle optional parameters
+    if label.startswith('unrestricted_weights'):
+        not_used = (None in init_dict['TEMPORAL'].values())
+        if not_used:
+            raise TrempyError('Cannot set value for unused argument: {}.'.format(label))
+
+    # Fix every parameter except for perturbed one. The perturbed one is "un-fixed".
+    for group in ESTIMATION_GROUP[version]:
+        for key in init_dict[group].keys():
+            current_value, _, bounds = init_dict[group][key]
+            if key == label:
+                # Reset bounds to default
+                lower, upper = DEFAULT_BOUNDS[label]
+                # If no value is specified, draw a random value.
+                if value is None:
+                    value = np.random.uniform(lower + SMALL_FLOAT, upper - SMALL_FLOAT)
+                init_dict[group][key] = [value, False, [lower, upper]]
+                # Also, override old bounds in old dict.
+                old_dict[group][key] = [current_value, False, [lower, upper]]
+            # Fix all other parameters.
+            else:
+                init_dict[group][key] = [current_value, True, bounds]
+
+    return old_dict, init_dict
@@ -1,27 +1,84 @@
 """This module contains all function related to the processing of the observed dataset."""
+import tempfile
+import hashlib
+import json
+import os
+
 import pandas as pd
 import numpy as np
-import functools
 
+from trempy.process.process_auxiliary import iterate_windows
+from trempy.process.process_auxiliary import COLUMNAR_FILES
+from trempy.process.process_auxiliary import is_columnar
+from trempy.process.process_auxiliary import read_window
+from trempy.record.clsInstrument import instrument_obj
+from trempy.custom_exceptions import TrempyError
+from trempy.config_trempy import FINGERPRINT_MAX
 from trempy.config_trempy import NEVER_SWITCHERS
 
 
-def process(est_file, questions, num_skip, est_agents, cutoffs):
+def process(est_file, questions, num_skip, est_agents, cutoffs, fingerprint=False):
     """Process the observed dataset."""
-    df = pd.read_pickle(est_file)
+    # We cut the dataset to only contain the information that is actually used. For the columnar
+    # format, this is done without ever loading the remaining individuals.
+    if is_columnar(est_file):
+        df = read_window(est_file, questions, num_skip, est_agents)
+    else:
+        df = pd.read_pickle(est_file)
+        df = df.loc[(slice(None), slice(None)), 'Compensation'].to_frame()
+        lower, upper = int(num_skip), int(num_skip + est_agents)
+        subset = df.index.get_level_values(0).unique()[lower:upper]
+        df = df.loc[(subset, questions), :]
 
-    # We cut the dataset to only contain the information that is actually used.
-    df = df.loc[(slice(None), slice(None)), 'Compensation'].to_frame()
-    lower, upper = int(num_skip), int(num_skip + est_agents)
-    subset = df.index.get_level_values(0).unique()[lower:upper]
-    df = df.loc[(subset, questions), :]
+    # We perform some tests on the dataset. These can be skipped if the very same request was
+    # already validated before.
+    if fingerprint:
+        key = get_fingerprint(est_file, questions, num_skip, est_agents, cutoffs)
+        is_hit = key in read_fingerprints(est_file)
+        instrument_obj.record_cache('fingerprint', is_hit)
+        if is_hit:
+            return df
 
-    # We perform some tests on the dataset.
     process_checks(df, est_agents, questions, cutoffs)
 
+    if fingerprint:
+        write_fingerprint(est_file, key)
+
     return df
 
 
+def process_chunked(est_file, questions, num_skip, est_agents, cutoffs, chunk,
+                    fingerprint=False):
+    """Check the observed dataset in chunks of individuals without ever loading it as a whole.
+
+    This requires the columnar format. The checks are the same as in process().
+    """
+    if not is_columnar(est_file):
+        raise TrempyError('chunked processing requires the columnar format')
+
+    if fingerprint:
+        key = get_fingerprint(est_file, questions, num_skip, est_agents, cutoffs)
+        is_hit = key in read_fingerprints(est_file)
+        instrument_obj.record_cache('fingerprint', is_hit)
+        if is_hit:
+            return
+
+    num_obs = 0
+    for individual, question, compensation in iterate_windows(est_file, questions, num_skip,
+                                                              est_agents, chunk):
+        index = pd.MultiIndex.from_arrays([individual, question], names=['Individual', 'Question'])
+        df = pd.DataFrame({'Compensation': compensation}, index=index)
+
+        num_chunk = np.unique(individual).shape[0]
+        process_checks(df, num_chunk, questions, cutoffs)
+        num_obs += num_chunk
+
+    np.testing.assert_equal(num_obs >= est_agents, True)
+
+    if fingerprint:
+        write_fingerprint(est_file, key)
+
+
 def process_checks(df, est_agents, questions, cutoffs):
     """Perform numerous checks on the observed dataset."""
     # We want the index properly set up to individual and questions.
@@ -31,19 +88,123 @@ def process_checks(df, est_agents, questions, cutoffs):
     np.testing.assert_equal('Compensation' in df.columns, True)
 
     # We need enough individuals to run the estimation on the number of individuals requested.
-    num_obs = df.index.get_level_values(0).nunique()
+    agent_codes, agents = pd.factorize(df.index.get_level_values(0))
+    num_obs = agents.shape[0]
     np.testing.assert_equal(num_obs >= est_agents, True)
 
-    # We want all individuals for all questions.
-    def _check_questions(questions, agent):
-        """Check whether all questions are defined for all individuals."""
-        idx = sorted(agent.index.get_level_values(1))
-        np.testing.assert_equal(idx, questions)
-    df.groupby('Individual').apply(functools.partial(_check_questions, questions))
+    # We want all individuals for all questions. We first locate each observation in the list of
+    # requested questions and then count the observations for each combination of individual and
+    # question. Each combination needs to occur exactly once.
+    questions = np.array(sorted(questions), dtype=np.int64)
+    num_questions = questions.shape[0]
+
+    question = np.array(df.index.get_level_values(1), dtype=np.int64)
+    pos = np.searchsorted(questions, question)
+    is_requested = pos < num_questions
+    is_requested[is_requested] = questions[pos[is_requested]] == question[is_requested]
+    np.testing.assert_equal(np.all(is_requested), True)
+
+    counts = np.bincount(agent_codes * num_questions + pos, minlength=num_obs * num_questions)
+    np.testing.assert_equal(np.all(counts == 1), True)
 
     # Check that compensation levels line up with cutoffs and the NEVER_SWITCHERS
-    for q, group in df.groupby(level=1):
-        lower, upper = cutoffs[q]
-        cond = group['Compensation'].between(lower, upper, inclusive=True)
-        cond = cond | group['Compensation'].isin([NEVER_SWITCHERS])
-        np.testing.assert_equal(np.all(cond), True)
+    lower = np.array([cutoffs[q][0] for q in questions])[pos]
+    upper = np.array([cutoffs[q][1] for q in questions])[pos]
+    compensation = np.array(df['Compensation'], dtype=np.float64)
+
+    cond = (lower <= compensation) & (compensation <= upper)
+    cond = cond | (compensation == NEVER_SWITCHERS)
+    np.testing.assert_equal(np.all(cond), True)
+
+
+def get_fingerprint(est_file, questions, num_skip, est_agents, cutoffs):
+    """Construct a fingerprint of the dataset and the request for its processing.
+
+    We rely on the size and modification time of the files instead of their content. This keeps
+    the fingerprint cheap even for very large datasets.
+    """
+    questions = [int(q) for q in sorted(questions)]
+    info = [get_dataset_stats(est_file), questions, int(num_skip), int(est_agents)]
+    info += [[float(cutoffs[q][0]), float(cutoffs[q][1])] for q in questions]
+
+    return get_hash(info)
+
+
+def get_dataset_stats(est_file):
+    """Collect the path, size and modification time of all files of the dataset."""
+    if is_columnar(est_file):
+        fnames = [os.path.join(est_file, label + '.npy') for label in COLUMNAR_FILES]
+    else:
+        fnames = [est_file]
+
+    stats = []
+    for fname in fnames:
+        stat = os.stat(fname)
+        stats += [[os.path.abspath(fname), stat.st_size, stat.st_mtime]]
+
+    return stats
+
+
+def get_hash(info):
+    """Hash some information that can be serialized to JSON."""
+    return hashlib.sha1(json.dumps(info).encode('utf-8')).hexdigest()
+
+
+def get_fingerprint_fname(est_file):
+    """Return the name of the file with the fingerprints of the validated requests."""
+    dirname = os.path.dirname(os.path.abspath(est_file))
+    return os.path.join(dirname, '.checks.trempy.cache')
+
+
+def read_fingerprint_entries(est_file):
+    """Read the entries of the cache, which consist of the dataset, its stats and the fingerprint.
+
+    Entries of an earlier layout of the cache are ignored.
+    """
+    fname = get_fingerprint_fname(est_file)
+    if not os.path.exists(fname):
+        return []
+
+    with open(fname) as infile:
+        entries = [line.split() for line in infile.readlines()]
+
+    return [entry for entry in entries if len(entry) == 3]
+
+
+def read_fingerprints(est_file):
+    """Read the fingerprints of the requests that were already validated."""
+    return [entry[2] for entry in read_fingerprint_entries(est_file)]
+
+
+def write_fingerprint(est_file, fingerprint):
+    """Record the fingerprint of a successfully validated request.
+
+    We drop the entries for earlier versions of the same dataset and only keep the most recent
+    entries overall. The cache is replaced as a whole, so a concurrent reader never sees a partial
+    file.
+    """
+    entry = [get_hash(os.path.abspath(est_file)), get_hash(get_dataset_stats(est_file)),
+             fingerprint]
+
+    entries = read_fingerprint_entries(est_file)
+    if entry in entries:
+        return
+
+    entries = [other for other in entries if other[0] != entry[0] or other[1] == entry[1]]
+    entries = (entries + [entry])[-FINGERPRINT_MAX:]
+
+    # We might not be allowed to write next to the dataset. Then we simply validate again during
+    # the next estimation.
+    fname = get_fingerprint_fname(est_file)
+    try:
+        fd, scratch = tempfile.mkstemp(dir=os.path.dirname(fname), suffix='.scratch')
+    except OSError:
+        return
+
+    try:
+        with os.fdopen(fd, 'w') as outfile:
+            for other in entries:
+                outfile.write(' '.join(other) + '\n')
+        os.replace(scratch, fname)
+    except OSError:
+        os.remove(scratch)
@@ -0,0 +1,140 @@
+"""This module contains the capabilities to store and load the datasets of the package."""
+import os
+
+import pandas as pd
+import numpy as np
+
+from trempy.custom_exceptions import TrempyError
+
+# We support two storage formats for the datasets. The pickle files are the original format,
+# while the columnar stores hold one memory-mappable array for each column.
+DATASET_SUFFIX = {
+    'pickle': '.trempy.pkl',
+    'columnar': '.trempy.col',
+}
+
+# The columnar store contains one array for each of the columns and the position of the first
+# row of each individual. The latter allows to select a subset of individuals without a pass
+# over the whole dataset.
+COLUMNAR_FILES = ['Individual', 'Question', 'Compensation', 'Offsets']
+
+
+def get_dataset_fname(fname, dataset_format):
+    """Return the name of the dataset based on its format."""
+    if dataset_format not in DATASET_SUFFIX.keys():
+        raise TrempyError('dataset format not implemented')
+
+    return fname + DATASET_SUFFIX[dataset_format]
+
+
+def is_columnar(fname):
+    """Check whether the dataset is stored in the columnar format."""
+    return os.path.isdir(fname)
+
+
+def write_dataset(df, fname, dataset_format):
+    """Write a dataset to disk and return the name of the stored dataset."""
+    fname = get_dataset_fname(fname, dataset_format)
+
+    if dataset_format in ['pickle']:
+        df.to_pickle(fname, protocol=2)
+    elif dataset_format in ['columnar']:
+        df = df.sort_index()
+
+        individual = np.array(df.index.get_level_values(0), dtype=np.int64)
+        question = np.array(df.index.get_level_values(1), dtype=np.int64)
+        compensation = np.array(df['Compensation'], dtype=np.float64)
+
+        # We record the first row of each individual and the total number of rows at the end.
+        is_first = np.concatenate(([True], individual[1:] != individual[:-1]))
+        offsets = np.append(np.flatnonzero(is_first), individual.shape[0])
+        if individual.shape[0] == 0:
+            offsets = np.array([0], dtype=np.int64)
+
+        if not os.path.exists(fname):
+            os.mkdir(fname)
+
+        columns = [individual, question, compensation, offsets.astype(np.int64)]
+        for label, column in zip(COLUMNAR_FILES, columns):
+            np.save(os.path.join(fname, label + '.npy'), column)
+    else:
+        raise TrempyError('dataset format not implemented')
+
+    return fname
+
+
+def read_dataset(fname, mmap=True):
+    """Read a complete dataset from disk irrespective of its format."""
+    if not is_columnar(fname):
+        return pd.read_pickle(fname)
+
+    individual, question, compensation, _ = read_columns(fname, mmap)
+
+    df = pd.DataFrame()
+    df['Individual'] = np.array(individual)
+    df['Question'] = np.array(question)
+    df['Compensation'] = np.array(compensation)
+    df.set_index(['Individual', 'Question'], inplace=True, drop=False)
+
+    return df
+
+
+def read_columns(fname, mmap=True):
+    """Access the columns of a columnar store.
+
+    With memory-mapping, the data is only read from disk once it is actually accessed. This also
+    allows several worker processes to share the same pages of the dataset.
+    """
+    mmap_mode = None
+    if mmap:
+        mmap_mode = 'r'
+
+    columns = []
+    for label in COLUMNAR_FILES:
+        columns += [np.load(os.path.join(fname, label + '.npy'), mmap_mode=mmap_mode)]
+
+    return columns
+
+
+def read_window(fname, questions, num_skip, est_agents):
+    """Read the observations of a window of individuals for the requested questions only.
+
+    Only the rows of the requested individuals are materialized in memory.
+    """
+    individual, question, compensation = read_window_arrays(fname, questions, num_skip, est_agents)
+
+    index = pd.MultiIndex.from_arrays([individual, question], names=['Individual', 'Question'])
+    df = pd.DataFrame({'Compensation': compensation}, index=index)
+
+    return df
+
+
+def read_window_arrays(fname, questions, num_skip, est_agents):
+    """Read the columns of a window of individuals for the requested questions only."""
+    individual, question, compensation, offsets = read_columns(fname, mmap=True)
+
+    num_agents = offsets.shape[0] - 1
+    lower, upper = min(int(num_skip), num_agents), min(int(num_skip + est_agents), num_agents)
+    start, stop = int(offsets[lower]), int(offsets[upper])
+
+    individual = np.array(individual[start:stop])
+    question = np.array(question[start:stop])
+    compensation = np.array(compensation[start:stop])
+
+    is_requested = np.in1d(question, questions)
+
+    return individual[is_requested], question[is_requested], compensation[is_requested]
+
+
+def iterate_windows(fname, questions, num_skip, est_agents, chunk):
+    """Iterate over the columns of a window of individuals in chunks of individuals.
+
+    At most the rows of a single chunk are materialized in memory at the same time.
+    """
+    offsets = read_columns(fname, mmap=True)[-1]
+
+    num_agents = offsets.shape[0] - 1
+    upper = min(int(num_skip + est_agents), num_agents)
+
+    for lower in range(min(int(num_skip), num_agents), upper, chunk):
+        yield read_window_arrays(fname, questions, lower, min(chunk, upper - lower))
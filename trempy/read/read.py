@@ -12,7 +12,7 @@ from trempy.config_trempy import HUGE_FLOAT
 # Blocks that should be processed all the time.
 BASIC_GROUPS = [
     'VERSION', 'SIMULATION', 'ESTIMATION', 'SCIPY-BFGS', 'SCIPY-POWELL', 'SCIPY-L-BFGS-B',
-    'CUTOFFS', 'QUESTIONS',
+    'BHHH', 'CUTOFFS', 'QUESTIONS',
 ]
 
 # Blocks that are specific to the 'version' of the utility function.
@@ -209,14 +209,26 @@ def process_cases(list_):
 def type_conversions(flag, value):
     """Type conversions."""
     # Handle ESTIMATION, SIMULATION and VERSION
-    if flag in ['seed', 'agents', 'maxfun', 'skip']:
+    if flag in ['seed', 'agents', 'maxfun', 'skip', 'workers', 'shards', 'presearch']:
         value = int(value)
-    elif flag in ['version', 'file', 'optimizer', 'start']:
+    elif flag in ['version', 'file', 'optimizer', 'start', 'format', 'solver', 'backend',
+                  'inference']:
         value = str(value)
-    elif flag in ['detailed', 'stationary_model', 'heterogeneity']:
+    elif flag in ['budget']:
+        if value == 'None':
+            value = None
+        else:
+            value = float(value)
+    elif flag in ['chunk']:
+        if value == 'None':
+            value = None
+        else:
+            value = int(value)
+    elif flag in ['detailed', 'stationary_model', 'heterogeneity', 'fingerprint', 'instrument',
+                  'warm_start', 'adaptive']:
         np.testing.assert_equal(value.upper() in ['TRUE', 'FALSE'], True)
         value = (value.upper() == 'TRUE')
-    # Handle SCIPY-BFGS, SCIPY-L-BFGS-B and SCIPY-POWELL
+    # Handle SCIPY-BFGS, SCIPY-L-BFGS-B, SCIPY-POWELL and BHHH
     elif flag in ['eps', 'gtol', 'ftol', 'xtol']:
         value = float(value)
     # Empty flags
@@ -258,6 +270,76 @@ def type_conversions(flag, value):
 def check_optional_args(init_dict):
     """Enforce input requirements for the init_dict."""
     version = init_dict['VERSION']['version']
+
+    # We store simulated datasets as pickle files if no other format is requested.
+    if 'format' in init_dict['SIMULATION'].keys():
+        dataset_format = init_dict['SIMULATION']['format']
+        np.testing.assert_equal(dataset_format in ['pickle', 'columnar'], True)
+    else:
+        init_dict['SIMULATION']['format'] = 'pickle'
+
+    # We validate the estimation sample during each estimation unless requested otherwise.
+    if 'fingerprint' not in init_dict['ESTIMATION'].keys():
+        init_dict['ESTIMATION']['fingerprint'] = False
+
+    # The instrumentation of the estimation loop is switched off by default.
+    if 'instrument' not in init_dict['ESTIMATION'].keys():
+        init_dict['ESTIMATION']['instrument'] = False
+
+    # The root-finding uses brenth by default.
+    if 'solver' in init_dict['ESTIMATION'].keys():
+        solver = init_dict['ESTIMATION']['solver']
+        np.testing.assert_equal(solver in ['brenth', 'chebyshev'], True)
+    else:
+        init_dict['ESTIMATION']['solver'] = 'brenth'
+
+    # The optimal compensations are determined for one question after the other by default.
+    if 'backend' in init_dict['ESTIMATION'].keys():
+        backend = init_dict['ESTIMATION']['backend']
+        np.testing.assert_equal(backend in ['serial', 'threads', 'processes'], True)
+    else:
+        init_dict['ESTIMATION']['backend'] = 'serial'
+
+    if 'workers' not in init_dict['ESTIMATION'].keys():
+        init_dict['ESTIMATION']['workers'] = 1
+
+    # The likelihood is evaluated for all agents at once by default.
+    if 'shards' not in init_dict['ESTIMATION'].keys():
+        init_dict['ESTIMATION']['shards'] = 1
+
+    # The observed sample is held in memory as a whole by default.
+    if 'chunk' not in init_dict['ESTIMATION'].keys():
+        init_dict['ESTIMATION']['chunk'] = None
+
+    # The automatic starting values do not include a pre-search by default.
+    if 'presearch' not in init_dict['ESTIMATION'].keys():
+        init_dict['ESTIMATION']['presearch'] = 0
+
+    # There is no inference at the estimate by default.
+    if 'inference' in init_dict['ESTIMATION'].keys():
+        inference = init_dict['ESTIMATION']['inference']
+        np.testing.assert_equal(inference in ['none', 'hessian', 'opg', 'sandwich'], True)
+    else:
+        init_dict['ESTIMATION']['inference'] = 'none'
+
+    # The root-finding always starts from the full bracket by default.
+    if 'warm_start' not in init_dict['ESTIMATION'].keys():
+        init_dict['ESTIMATION']['warm_start'] = False
+
+    # The root-finding uses the same tolerance throughout the estimation by default.
+    if 'adaptive' not in init_dict['ESTIMATION'].keys():
+        init_dict['ESTIMATION']['adaptive'] = False
+
+    # There is no limit on the wall-clock time of an estimation by default.
+    if 'budget' not in init_dict['ESTIMATION'].keys():
+        init_dict['ESTIMATION']['budget'] = None
+
+    # The BHHH optimizer was added later, so older initialization files do not specify it.
+    if 'BHHH' not in init_dict.keys():
+        init_dict['BHHH'] = dict()
+        init_dict['BHHH']['gtol'] = 1e-06
+        init_dict['BHHH']['eps'] = 1e-04
+
     if version in ['scaled_archimedean']:
         pass
 
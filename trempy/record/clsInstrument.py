@@ -0,0 +1,178 @@
+"""This module contains the instrumentation of the estimation loop."""
+import json
+import time
+import os
+
+from trempy.shared.clsBase import BaseCls
+
+# We record the time spent in each of the phases of an evaluation of the criterion function.
+PHASES = ['copula', 'root-finding', 'likelihood', 'parameters', 'logging']
+
+
+class _PhaseCls(object):
+    """Accumulate the wall-time of a single phase."""
+
+    def __init__(self, timings, calls, label):
+        """Init class."""
+        self.timings = timings
+        self.calls = calls
+        self.label = label
+        self.start = None
+
+    def __enter__(self):
+        """Start the clock."""
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args):
+        """Stop the clock and record the duration."""
+        self.timings[self.label] += time.perf_counter() - self.start
+        self.calls[self.label] += 1
+
+
+class _NullPhaseCls(object):
+    """Replace the timing of a phase if the instrumentation is not active."""
+
+    def __enter__(self):
+        """Do nothing."""
+        pass
+
+    def __exit__(self, *args):
+        """Do nothing."""
+        pass
+
+
+class _CountingCopulaCls(object):
+    """Count the evaluations of the utility copula for a single question."""
+
+    def __init__(self, copula, counts, question):
+        """Init class."""
+        self.copula = copula
+        self.counts = counts
+        self.question = question
+
+    def evaluate(self, *args, **kwargs):
+        """Evaluate the copula and record the evaluation."""
+        self.counts[self.question] = self.counts.get(self.question, 0) + 1
+        return self.copula.evaluate(*args, **kwargs)
+
+
+class InstrumentCls(BaseCls):
+    """Manage the timing and counting of the events during an estimation."""
+
+    def __init__(self):
+        """Init class."""
+        self.attr = dict()
+        self.attr['is_active'] = os.getenv('TREMPY_INSTRUMENT') == 'TRUE'
+        self.attr['null_phase'] = _NullPhaseCls()
+        self.reset()
+
+    def reset(self):
+        """Reset all records."""
+        self.attr['timings'] = {label: 0.0 for label in PHASES}
+        self.attr['calls'] = {label: 0 for label in PHASES}
+        self.attr['copula_evaluations'] = dict()
+        self.attr['root_iterations'] = dict()
+        self.attr['caches'] = dict()
+
+    def activate(self, is_active=True):
+        """Switch the instrumentation on or off. The environment variable always switches it on."""
+        self.attr['is_active'] = is_active or os.getenv('TREMPY_INSTRUMENT') == 'TRUE'
+
+    def is_active(self):
+        """Check whether the instrumentation is active."""
+        return self.attr['is_active']
+
+    def phase(self, label):
+        """Return a context manager that records the time spent in a phase."""
+        if not self.attr['is_active']:
+            return self.attr['null_phase']
+        return _PhaseCls(self.attr['timings'], self.attr['calls'], label)
+
+    def get_counting_copula(self, copula, question):
+        """Return a copula that records the number of its evaluations."""
+        if not self.attr['is_active']:
+            return copula
+        return _CountingCopulaCls(copula, self.attr['copula_evaluations'], question)
+
+    def record_iterations(self, question, num_iterations):
+        """Record the iterations of the root-finding for a question."""
+        if not self.attr['is_active']:
+            return
+        counts = self.attr['root_iterations']
+        counts[question] = counts.get(question, 0) + num_iterations
+
+    def record_cache(self, label, is_hit):
+        """Record a lookup in a cache."""
+        if not self.attr['is_active']:
+            return
+        stats = self.attr['caches'].setdefault(label, [0, 0])
+        if is_hit:
+            stats[0] += 1
+        else:
+            stats[1] += 1
+
+    def get_summary(self):
+        """Collect all records in a dictionary that can be stored as JSON."""
+        questions = set(self.attr['copula_evaluations'].keys())
+        questions |= set(self.attr['root_iterations'].keys())
+
+        rslt = dict()
+        rslt['phases'] = dict()
+        for label in PHASES:
+            rslt['phases'][label] = dict()
+            rslt['phases'][label]['time'] = self.attr['timings'][label]
+            rslt['phases'][label]['calls'] = self.attr['calls'][label]
+
+        rslt['questions'] = dict()
+        for q in sorted(questions):
+            rslt['questions'][str(q)] = dict()
+            rslt['questions'][str(q)]['copula_evaluations'] = \
+                self.attr['copula_evaluations'].get(q, 0)
+            rslt['questions'][str(q)]['root_iterations'] = self.attr['root_iterations'].get(q, 0)
+
+        rslt['caches'] = dict()
+        for label, (hits, misses) in sorted(self.attr['caches'].items()):
+            rslt['caches'][label] = {'hits': hits, 'misses': misses}
+            rslt['caches'][label]['rate'] = hits / float(hits + misses)
+
+        return rslt
+
+    def write_info(self, outfile):
+        """Write a summary of all records to an information file."""
+        if not self.attr['is_active']:
+            return
+
+        summary = self.get_summary()
+
+        outfile.write('\n\n {:<25}\n\n'.format('Instrumentation'))
+        fmt_ = ' {:>20}    ' + '{:>25}    ' * 2
+        outfile.write(fmt_.format(*['Phase', 'Calls', 'Time']) + '\n\n')
+        for label in PHASES:
+            info = summary['phases'][label]
+            line = [label, info['calls'], '{:25.5f}'.format(info['time'])]
+            outfile.write(fmt_.format(*line) + '\n')
+
+        outfile.write('\n')
+        outfile.write(fmt_.format(*['Question', 'Copula', 'Root-Finding']) + '\n\n')
+        for q, info in sorted(summary['questions'].items(), key=lambda x: int(x[0])):
+            line = [q, info['copula_evaluations'], info['root_iterations']]
+            outfile.write(fmt_.format(*line) + '\n')
+
+        if summary['caches']:
+            fmt_ = ' {:>20}    ' + '{:>25}    ' * 3
+            outfile.write('\n')
+            outfile.write(fmt_.format(*['Cache', 'Hits', 'Misses', 'Rate']) + '\n\n')
+            for label, info in summary['caches'].items():
+                line = [label, info['hits'], info['misses'], '{:25.5f}'.format(info['rate'])]
+                outfile.write(fmt_.format(*line) + '\n')
+
+    def write_json(self, fname):
+        """Write all records to a JSON file."""
+        if not self.attr['is_active']:
+            return
+
+        with open(fname, 'w') as outfile:
+            json.dump(self.get_summary(), outfile, indent=4, sort_keys=True)
+
+
+instrument_obj = InstrumentCls()
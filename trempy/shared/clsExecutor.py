@@ -0,0 +1,164 @@
+"""This module contains the class to distribute the root-finding for all questions."""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.util import Finalize
+import tempfile
+import shutil
+import os
+
+from trempy.shared.shared_auxiliary import solve_optimal_compensations
+from trempy.shared.shared_auxiliary import floating_point_policy
+from trempy.interface.clsUtilityModel import build_copula
+from trempy.custom_exceptions import TrempyError
+from trempy.config_trempy import QUESTION_COSTS
+from trempy.shared.clsBase import BaseCls
+
+# Each worker process holds the copula for the most recent preference parameters.
+_WORKER_CACHE = dict()
+
+
+class ExecutorCls(BaseCls):
+    """This class manages the backend for the determination of the optimal compensations.
+
+    The pool of workers is started with the first request and then kept alive until it is closed.
+    The questions are distributed across the workers based on their expected cost.
+    """
+
+    def __init__(self, backend='serial', workers=1):
+        """Init class."""
+        if backend not in ['serial', 'threads', 'processes']:
+            raise TrempyError('backend not implemented')
+
+        self.attr = dict()
+        self.attr['backend'] = backend
+        self.attr['workers'] = workers
+
+        # Housekeeping attributes
+        self.attr['chunks'] = dict()
+        self.attr['pool'] = None
+
+    def get_chunks(self, questions):
+        """Distribute the questions across the workers.
+
+        We assign the most expensive questions first, each to the worker with the lowest load so
+        far. The assignment is the same for each request, so we only determine it once.
+        """
+        key = tuple(questions)
+        if key in self.attr['chunks'].keys():
+            return self.attr['chunks'][key]
+
+        num_chunks = min(self.attr['workers'], len(questions))
+
+        chunks, loads = [[] for _ in range(num_chunks)], [0] * num_chunks
+        for q in sorted(questions, key=lambda q: (-QUESTION_COSTS[q], q)):
+            idx = loads.index(min(loads))
+            chunks[idx] += [q]
+            loads[idx] += QUESTION_COSTS[q]
+
+        self.attr['chunks'][key] = chunks
+
+        return chunks
+
+    def is_remote(self):
+        """Check whether the copula is rebuilt in the worker processes for each request."""
+        return self.attr['backend'] in ['processes'] and self.attr['workers'] > 1
+
+    def solve(self, copula, questions, m_start, xtol, solver, settings, paras):
+        """Determine the optimal compensations for all questions.
+
+        The copula is shared with the threads directly, while the processes only receive the
+        settings and the parameters of the model and rebuild the copula once they change.
+        """
+        backend = self.attr['backend']
+
+        if backend in ['serial'] or self.attr['workers'] == 1:
+            return solve_optimal_compensations(copula, questions, m_start, xtol, solver)
+
+        chunks = self.get_chunks(questions)
+        num_chunks = len(chunks)
+        pool = self._get_pool()
+
+        args = [[m_start] * num_chunks, [xtol] * num_chunks, [solver] * num_chunks]
+        if backend in ['threads']:
+            rslt = pool.map(solve_optimal_compensations, [copula] * num_chunks, chunks, *args)
+        elif backend in ['processes']:
+            args = [[settings] * num_chunks, [paras] * num_chunks, chunks] + args
+            rslt = pool.map(_solve_chunk, *args)
+
+        m_optimal_chunks = dict()
+        for m_optimal_chunk in rslt:
+            m_optimal_chunks.update(m_optimal_chunk)
+
+        # We return the optimal compensations in the original order of the questions.
+        m_optimal = dict()
+        for q in questions:
+            m_optimal[q] = m_optimal_chunks[q]
+
+        return m_optimal
+
+    def solve_batch(self, settings, paras_batch, questions, m_start=None, xtol=None,
+                    solver='brenth'):
+        """Determine the optimal compensations for all questions at several parameter values.
+
+        Each worker handles all questions for one of the parameter values. Large batches are
+        sent to the worker processes in chunks.
+        """
+        num_points = len(paras_batch)
+
+        args = [[settings] * num_points, paras_batch, [questions] * num_points]
+        args += [[m_start] * num_points, [xtol] * num_points, [solver] * num_points]
+        if self.attr['backend'] in ['serial'] or self.attr['workers'] == 1:
+            return list(map(_solve_paras, *args))
+        elif self.attr['backend'] in ['threads']:
+            return list(self._get_pool().map(_solve_paras, *args))
+        elif self.attr['backend'] in ['processes']:
+            chunksize = max(num_points // (4 * self.attr['workers']), 1)
+            return list(self._get_pool().map(_solve_chunk, *args, chunksize=chunksize))
+
+    def close(self):
+        """Shut down the pool of workers."""
+        if self.attr['pool'] is not None:
+            self.attr['pool'].shutdown()
+            self.attr['pool'] = None
+
+    def _get_pool(self):
+        """Start the pool of workers, if it is not running already."""
+        if self.attr['pool'] is None:
+            workers = self.attr['workers']
+            if self.attr['backend'] in ['threads']:
+                self.attr['pool'] = ThreadPoolExecutor(max_workers=workers)
+            elif self.attr['backend'] in ['processes']:
+                self.attr['pool'] = ProcessPoolExecutor(max_workers=workers,
+                                                        initializer=_initialize_worker)
+
+        return self.attr['pool']
+
+
+def _initialize_worker():
+    """Move each worker process to its own directory.
+
+    The construction of some copulas writes files to the working directory, which must not
+    interfere with the ones of the main process.
+    """
+    dirname = tempfile.mkdtemp()
+    os.chdir(dirname)
+    Finalize(None, shutil.rmtree, args=(dirname,), kwargs={'ignore_errors': True},
+             exitpriority=0)
+
+
+@floating_point_policy
+def _solve_paras(settings, paras, questions, m_start, xtol, solver):
+    """Determine the optimal compensations for all questions at a single parameter value."""
+    copula = build_copula(settings, paras)
+    return solve_optimal_compensations(copula, questions, m_start, xtol, solver)
+
+
+@floating_point_policy
+def _solve_chunk(settings, paras, questions, m_start, xtol, solver):
+    """Determine the optimal compensations for a subset of the questions in a worker process."""
+    if _WORKER_CACHE.get('paras', None) != paras or _WORKER_CACHE['settings'] != settings:
+        _WORKER_CACHE['copula'] = build_copula(settings, paras)
+        _WORKER_CACHE['settings'] = settings
+        _WORKER_CACHE['paras'] = paras
+
+    return solve_optimal_compensations(_WORKER_CACHE['copula'], questions, m_start, xtol, solver)
@@ -0,0 +1,286 @@
+"""This module contains the classes to evaluate the likelihood for a fixed observed sample."""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import pandas as pd
+import numpy as np
+
+from trempy.shared.shared_auxiliary import get_log_likelihood_contributions
+from trempy.shared.shared_auxiliary import get_log_likelihood_partial
+from trempy.shared.shared_auxiliary import get_likelihood_parameters
+from trempy.shared.shared_auxiliary import get_question_positions
+from trempy.shared.shared_auxiliary import reduce_log_likelihood
+from trempy.shared.shared_auxiliary import floating_point_policy
+from trempy.process.process_auxiliary import iterate_windows
+from trempy.shared.shared_auxiliary import get_observed_arrays
+from trempy.process.process_auxiliary import read_columns
+from trempy.shared.shared_auxiliary import aggregate_by_agent
+from trempy.shared.shared_auxiliary import get_cutoff_arrays
+from trempy.custom_exceptions import TrempyError
+from trempy.shared.clsBase import BaseCls
+
+# Each worker process holds the views on the observed arrays in shared memory.
+_WORKER_CACHE = dict()
+
+
+class LikelihoodCls(BaseCls):
+    """This class manages the evaluation of the likelihood for a fixed observed sample.
+
+    The observed arrays are prepared only once. With several shards, they are placed in shared
+    memory and each worker process evaluates the contributions of a contiguous range of agents.
+    For each evaluation, the workers only receive the optimal compensations and standard
+    deviations for each question. As the partial sums are exact, the result does not depend on
+    the number of shards.
+
+    The integer weights of the agents, e.g. from resampling, count each agent several times
+    without copying its observations.
+    """
+
+    def __init__(self, df, questions, cutoffs, shards=1, weights=None, arrays=None):
+        """Init class.
+
+        The observed arrays are prepared by get_agent_arrays() unless they are provided directly,
+        e.g. as views on shared memory, in which case the dataset is not required.
+        """
+        if shards < 1:
+            raise TrempyError('at least one shard required')
+
+        if arrays is None:
+            arrays = get_agent_arrays(df, questions)
+        compensation, pos, agent_codes = arrays
+
+        lower, upper = get_cutoff_arrays(questions, cutoffs)
+
+        num_agents = 0
+        if agent_codes.shape[0] > 0:
+            num_agents = int(agent_codes[-1]) + 1
+
+        obs_weights = None
+        if weights is not None:
+            weights = np.array(weights, dtype=np.int64)
+            if weights.shape != (num_agents,) or np.any(weights < 0):
+                raise TrempyError('one non-negative weight for each agent required')
+            obs_weights = weights[agent_codes]
+
+        num_shards = max(min(shards, num_agents), 1)
+        sizes = [chunk.shape[0] for chunk in np.array_split(np.arange(num_agents), num_shards)]
+        bounds = np.searchsorted(agent_codes, np.cumsum([0] + sizes)).tolist()
+
+        self.attr = dict()
+        self.attr['questions'] = questions
+        self.attr['cutoffs'] = cutoffs
+        self.attr['shards'] = shards
+        self.attr['num_agents'] = num_agents
+        self.attr['num_obs'] = None
+
+        self.attr['compensation'] = compensation
+        self.attr['agent_codes'] = agent_codes
+        self.attr['obs_weights'] = obs_weights
+        self.attr['weights'] = weights
+        self.attr['lower'] = lower
+        self.attr['upper'] = upper
+        self.attr['pos'] = pos
+
+        # Housekeeping attributes
+        self.attr['ranges'] = list(zip(bounds[:-1], bounds[1:]))
+        self.attr['memory'] = []
+        self.attr['pool'] = None
+
+    def evaluate(self, paras_obj, sds, m_optimal):
+        """Calculate the average negative log-likelihood for given optimal compensations."""
+        questions, cutoffs = self.attr['questions'], self.attr['cutoffs']
+
+        m_optim, std = get_likelihood_parameters(questions, cutoffs, paras_obj, sds, m_optimal)
+
+        ranges = self.attr['ranges']
+        if len(ranges) == 1:
+            args = [self.attr[label] for label in ['compensation', 'pos', 'lower', 'upper']]
+            partials = [get_log_likelihood_partial(*args, m_optim, std, self.attr['obs_weights'])]
+        else:
+            num_shards = len(ranges)
+            starts, stops = zip(*ranges)
+            pool = self._get_pool()
+            partials = list(pool.map(_evaluate_shard, starts, stops, [m_optim] * num_shards,
+                                     [std] * num_shards))
+
+        self.attr['num_obs'] = sum(count for _, count in partials)
+
+        return reduce_log_likelihood(partials)
+
+    def get_contributions(self, paras_obj, sds, m_optimal, by_agent=False):
+        """Calculate the log-likelihood contribution of each observation or agent.
+
+        The observations are sorted by agent. The contributions are always determined in the
+        main process. With weights, each observation or agent is repeated accordingly.
+        """
+        questions, cutoffs = self.attr['questions'], self.attr['cutoffs']
+
+        m_optim, std = get_likelihood_parameters(questions, cutoffs, paras_obj, sds, m_optimal)
+
+        args = [self.attr[label] for label in ['compensation', 'pos', 'lower', 'upper']]
+        contribs = get_log_likelihood_contributions(*args, m_optim, std)[0]
+
+        if by_agent:
+            contribs = aggregate_by_agent(contribs, self.attr['agent_codes'],
+                                          self.attr['num_agents'])
+            if self.attr['weights'] is not None:
+                contribs = np.repeat(contribs, self.attr['weights'], axis=0)
+        elif self.attr['obs_weights'] is not None:
+            contribs = np.repeat(contribs, self.attr['obs_weights'], axis=0)
+
+        return contribs
+
+    def close(self):
+        """Shut down the pool of workers and release the shared memory."""
+        if self.attr['pool'] is not None:
+            self.attr['pool'].shutdown()
+            self.attr['pool'] = None
+
+        for memory in self.attr['memory']:
+            memory.close()
+            memory.unlink()
+        self.attr['memory'] = []
+
+    def _get_pool(self):
+        """Start the pool of workers, if it is not running already."""
+        if self.attr['pool'] is None:
+            # The observed arrays are copied to shared memory only once.
+            labels = ['compensation', 'pos']
+            if self.attr['obs_weights'] is not None:
+                labels += ['obs_weights']
+
+            specs = []
+            for label in labels:
+                array = self.attr[label]
+                memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                np.ndarray(array.shape, array.dtype, buffer=memory.buf)[:] = array
+                specs += [(label, memory.name, array.shape, array.dtype.str)]
+                self.attr['memory'] += [memory]
+
+            initargs = (specs, self.attr['lower'], self.attr['upper'])
+            self.attr['pool'] = ProcessPoolExecutor(max_workers=len(self.attr['ranges']),
+                                                    initializer=_initialize_worker,
+                                                    initargs=initargs)
+
+        return self.attr['pool']
+
+
+class ChunkedLikelihoodCls(BaseCls):
+    """This class manages the evaluation of the likelihood for a sample that is larger than memory.
+
+    The observed sample is read from the columnar store in chunks of agents during each
+    evaluation. The memory footprint is bounded by the size of a single chunk. As the partial sums
+    are exact, the result is the same as for the evaluation of the whole sample in memory.
+    """
+
+    def __init__(self, est_file, questions, num_skip, est_agents, cutoffs, chunk):
+        """Init class."""
+        if chunk < 1:
+            raise TrempyError('at least one agent per chunk required')
+
+        lower, upper = get_cutoff_arrays(questions, cutoffs)
+
+        offsets = read_columns(est_file, mmap=True)[-1]
+        num_agents = offsets.shape[0] - 1
+        num_agents = min(num_skip + est_agents, num_agents) - min(num_skip, num_agents)
+
+        self.attr = dict()
+        self.attr['questions'] = questions
+        self.attr['est_agents'] = est_agents
+        self.attr['num_skip'] = num_skip
+        self.attr['est_file'] = est_file
+        self.attr['cutoffs'] = cutoffs
+        self.attr['chunk'] = chunk
+        self.attr['num_agents'] = num_agents
+        self.attr['num_obs'] = None
+
+        self.attr['lower'] = lower
+        self.attr['upper'] = upper
+
+    def evaluate(self, paras_obj, sds, m_optimal):
+        """Calculate the average negative log-likelihood for given optimal compensations."""
+        args = [self.attr[label] for label in ['est_file', 'questions', 'num_skip', 'est_agents',
+                                               'cutoffs', 'chunk']]
+        est_file, questions, num_skip, est_agents, cutoffs, chunk = args
+
+        m_optim, std = get_likelihood_parameters(questions, cutoffs, paras_obj, sds, m_optimal)
+
+        partials = []
+        for _, question, compensation in iterate_windows(est_file, questions, num_skip,
+                                                         est_agents, chunk):
+            pos = get_question_positions(question, questions)
+            partials += [get_log_likelihood_partial(compensation, pos, self.attr['lower'],
+                                                    self.attr['upper'], m_optim, std)]
+
+        self.attr['num_obs'] = sum(count for _, count in partials)
+
+        return reduce_log_likelihood(partials)
+
+    def get_contributions(self, paras_obj, sds, m_optimal, by_agent=False):
+        """Calculate the log-likelihood contribution of each observation or agent.
+
+        Only the contributions of all observations are kept in memory, which is much smaller than
+        the observed sample itself.
+        """
+        args = [self.attr[label] for label in ['est_file', 'questions', 'num_skip', 'est_agents',
+                                               'cutoffs', 'chunk']]
+        est_file, questions, num_skip, est_agents, cutoffs, chunk = args
+
+        m_optim, std = get_likelihood_parameters(questions, cutoffs, paras_obj, sds, m_optimal)
+
+        contribs, individuals = [], []
+        for individual, question, compensation in iterate_windows(est_file, questions, num_skip,
+                                                                  est_agents, chunk):
+            pos = get_question_positions(question, questions)
+            contribs += [get_log_likelihood_contributions(compensation, pos, self.attr['lower'],
+                                                          self.attr['upper'], m_optim, std)[0]]
+            individuals += [individual]
+
+        contribs = np.concatenate(contribs)
+        if by_agent:
+            agent_codes = pd.factorize(np.concatenate(individuals))[0]
+            contribs = aggregate_by_agent(contribs, agent_codes, self.attr['num_agents'])
+
+        return contribs
+
+    def close(self):
+        """Nothing to release as the chunks are read anew for each evaluation."""
+        pass
+
+
+def get_agent_arrays(df, questions):
+    """Prepare the observed arrays sorted by agent.
+
+    The agents are numbered in the order of their first appearance in the dataset. As the
+    observations are sorted by agent, each range of agents is a contiguous block of memory.
+    """
+    compensation, pos = get_observed_arrays(df, questions)
+
+    agent_codes = pd.factorize(df.index.get_level_values(0))[0]
+    idx = np.argsort(agent_codes, kind='stable')
+
+    return compensation[idx], pos[idx], agent_codes[idx]
+
+
+def _initialize_worker(specs, lower, upper):
+    """Attach each worker process to the observed arrays in shared memory."""
+    for label, name, shape, dtype in specs:
+        memory = shared_memory.SharedMemory(name=name)
+        _WORKER_CACHE[label] = np.ndarray(shape, dtype, buffer=memory.buf)
+        _WORKER_CACHE[label + '_memory'] = memory
+
+    _WORKER_CACHE['lower'] = lower
+    _WORKER_CACHE['upper'] = upper
+
+
+@floating_point_policy
+def _evaluate_shard(start, stop, m_optim, std):
+    """Calculate the exact sum of the log-likelihood contributions for a range of observations."""
+    args = [_WORKER_CACHE[label][start:stop] for label in ['compensation', 'pos']]
+    args += [_WORKER_CACHE['lower'], _WORKER_CACHE['upper'], m_optim, std]
+
+    obs_weights = None
+    if 'obs_weights' in _WORKER_CACHE.keys():
+        obs_weights = _WORKER_CACHE['obs_weights'][start:stop]
+
+    return get_log_likelihood_partial(*args, obs_weights)
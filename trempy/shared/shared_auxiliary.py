@@ -1,38 +1,106 @@
 """This module contains functions that are used throughout the package."""
 from functools import partial
+from functools import wraps
+import fractions
 import string
 import copy
 
-from scipy.stats import norm
 from scipy import optimize
+from scipy import special
 import pandas as pd
 import numpy as np
 
 from trempy.interface.interface_copulpy import get_copula_nonstationary
 from trempy.interface.interface_copulpy import get_copula_scaled_archimedean
+from trempy.record.clsInstrument import instrument_obj
 from trempy.custom_exceptions import TrempyError
 from trempy.config_trempy import PREFERENCE_PARAMETERS
 from trempy.config_trempy import NEVER_SWITCHERS
+from trempy.config_trempy import FLOATING_POINT
 from trempy.config_trempy import DEFAULT_BOUNDS
+from trempy.config_trempy import CHEBYSHEV_DEGREE
+from trempy.config_trempy import CHEBYSHEV_POLISH
+from trempy.config_trempy import WARM_START_WIDTH
+from trempy.config_trempy import XTOL_SCHEDULE
 from trempy.config_trempy import LOTTERY_BOUNDS
+from trempy.config_trempy import EXACT_SCALE
 from trempy.config_trempy import TINY_FLOAT
 from trempy.config_trempy import HUGE_FLOAT
 
+# The normalizing constant of the density of the standard normal distribution.
+NORM_PDF_SCALE = np.sqrt(2 * np.pi)
 
-def criterion_function(df, questions, cutoffs, paras_obj, version, sds, **version_specific):
-    """Calculate the likelihood of the observed sample."""
-    m_optimal = get_optimal_compensations(version, paras_obj, questions, **version_specific)
-    heterogeneity = paras_obj.attr['heterogeneity']
-    data = copy.deepcopy(df)
 
-    # Add cutoffs
-    df_cutoff = pd.DataFrame.from_dict(cutoffs, orient='index', columns=['lower', 'upper'])
-    df_cutoff.index.name = 'Question'
-    data = data.join(df_cutoff, how='left')
+def floating_point_policy(func):
+    """Evaluate a function with the strict handling of floating-point errors of the package."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with np.errstate(**FLOATING_POINT):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def criterion_function(df, questions, cutoffs, paras_obj, version, sds, m_start=None,
+                       xtol=None, solver='brenth', utility_obj=None, likelihood_obj=None,
+                       **version_specific):
+    """Calculate the likelihood of the observed sample.
+
+    The optimal compensations from a previous evaluation can be passed as m_start to warm-start
+    the root-finding. The tolerance of the root-finding defaults to the one of brenth. A
+    persistent utility model reuses the copula and the optimal compensations across evaluations,
+    while a persistent likelihood object reuses the prepared observed sample.
+    """
+    if utility_obj is None:
+        m_optimal = get_optimal_compensations(version, paras_obj, questions, m_start, xtol,
+                                              solver, **version_specific)
+    else:
+        m_optimal = utility_obj.get_optimal_compensations(paras_obj, m_start, xtol, solver)
+
+    with instrument_obj.phase('likelihood'):
+        if likelihood_obj is None:
+            rslt = get_likelihood(df, questions, cutoffs, paras_obj, sds, m_optimal)
+        else:
+            rslt = likelihood_obj.evaluate(paras_obj, sds, m_optimal)
+
+    return rslt, m_optimal
+
+
+def get_likelihood(df, questions, cutoffs, paras_obj, sds, m_optimal):
+    """Calculate the average negative log-likelihood for given optimal compensations."""
+    compensation, pos = get_observed_arrays(df, questions)
+    lower, upper = get_cutoff_arrays(questions, cutoffs)
+    m_optim, std = get_likelihood_parameters(questions, cutoffs, paras_obj, sds, m_optimal)
+
+    partial_sum = get_log_likelihood_partial(compensation, pos, lower, upper, m_optim, std)
 
-    df_m_optimal = pd.DataFrame.from_dict(m_optimal, orient='index', columns=['m_optim'])
-    df_m_optimal.index.name = 'Question'
-    data = data.join(df_m_optimal, how='left')
+    return reduce_log_likelihood([partial_sum])
+
+
+def get_observed_arrays(df, questions):
+    """Extract the observed compensations and the position of their question in the list."""
+    compensation = np.array(df['Compensation'], dtype=np.float64)
+    question = np.array(df.index.get_level_values('Question'), dtype=np.int64)
+
+    return compensation, get_question_positions(question, questions)
+
+
+def get_question_positions(question, questions):
+    """Locate the question of each observation in the list of questions."""
+    return pd.Index(questions).get_indexer(question).astype(np.int64)
+
+
+def get_cutoff_arrays(questions, cutoffs):
+    """Collect the lower and upper cutoffs in the order of the questions."""
+    lower = np.array([cutoffs[q][0] for q in questions], dtype=np.float64)
+    upper = np.array([cutoffs[q][1] for q in questions], dtype=np.float64)
+
+    return lower, upper
+
+
+def get_likelihood_parameters(questions, cutoffs, paras_obj, sds, m_optimal):
+    """Collect the optimal compensations and standard deviations in the order of the questions."""
+    heterogeneity = paras_obj.attr['heterogeneity']
 
     sds_dict = dict(zip(questions, sds))
     if heterogeneity:
@@ -44,54 +112,149 @@ def criterion_function(df, questions, cutoffs, paras_obj, version, sds, **versio
             for q in sds_dict.keys()
         }
 
-    df_sds = pd.DataFrame.from_dict(sds_dict, orient='index', columns=['std'])
-    df_sds.index.name = 'Question'
-    data = data.join(df_sds, how='left')
+    m_optim = np.array([m_optimal[q] for q in questions], dtype=np.float64)
+    std = np.array([sds_dict[q] for q in questions], dtype=np.float64)
+
+    return m_optim, std
+
+
+def get_log_likelihood_partial(compensation, pos, lower, upper, m_optim, std, weights=None):
+    """Calculate the exact sum of the log-likelihood contributions for some observations.
+
+    All arguments that vary by question are indexed by the position of each observation's
+    question. The partial sums of separate sets of observations are combined by
+    reduce_log_likelihood(). Integer weights count each observation several times, so the
+    result is the same as for a sample with the corresponding number of copies.
+    """
+    contribs, is_contributing = get_log_likelihood_contributions(compensation, pos, lower, upper,
+                                                                 m_optim, std)
+    contribs = contribs[is_contributing]
+
+    if weights is None:
+        return get_exact_sum(contribs), contribs.shape[0]
+
+    # We group the observations by their weight so that the exact sums are only multiplied.
+    weights = weights[is_contributing]
+
+    total = 0
+    for weight in np.unique(weights[weights > 0]):
+        total += int(weight) * get_exact_sum(contribs[weights == weight])
+
+    return total, int(np.sum(weights))
+
+
+def get_log_likelihood_contributions(compensation, pos, lower, upper, m_optim, std):
+    """Calculate the log-likelihood contribution of each observation.
+
+    The contributions are returned in the order of the observations. Observations that are
+    exactly at the upper cutoff do not enter the likelihood, their contribution is set to zero
+    and they are flagged separately.
+    """
+    lower, upper, m_optim, std = lower[pos], upper[pos], m_optim[pos], std[pos]
 
     # Subjects who selected both Option A and B at least once. This implies their valuation
     # is in the left-open interval (lower, upper], i.e. they initially prefered Option A at 'lower',
     # but chose option B when it offered 'upper'.
-    data['is_interior'] = (data.lower < data.Compensation) & (data.Compensation < data.upper)
+    is_interior = (lower < compensation) & (compensation < upper)
     # Subjects who always prefered option A, i.e. their value of option A is higher than 'upper'.
-    data['is_upper'] = ((data['Compensation'].isin([NEVER_SWITCHERS])) |
-                        (data.Compensation > data.upper))
+    is_upper = (compensation == NEVER_SWITCHERS) | (compensation > upper)
     # Subjects who always prefered option B. So their value of Option A is smaller than 'lower'
-    data['is_lower'] = (data.Compensation <= data.lower)
+    is_lower = (compensation <= lower)
 
-    # We only need the standard normal distribution for standardized choices.
-    data['choice_standardized'] = (data['Compensation'] - data['m_optim']) / data['std']
-    data['lower_standardized'] = (data['lower'] - data['m_optim']) / data['std']
-    data['upper_standardized'] = (data['upper'] - data['m_optim']) / data['std']
-    rv = norm(loc=0.0, scale=1.0)
+    # We only need the standard normal distribution for standardized choices. We evaluate it
+    # directly, as SCIPY.STATS is expensive to import.
+    contribs = np.ones(compensation.shape[0], dtype=np.float64)
 
     # Likelihood: pdf for interior choices
-    likl_interior = (rv.pdf(data['choice_standardized'].loc[data['is_interior']]) /
-                     data['std'].loc[data['is_interior']])
+    choice_standardized = (compensation[is_interior] - m_optim[is_interior]) / std[is_interior]
+    contribs[is_interior] = \
+        np.exp(-choice_standardized ** 2 / 2.0) / NORM_PDF_SCALE / std[is_interior]
 
     # Likelihood: cdf for indifference points that are outside our choice list.
-    likl_upper = 1.0 - rv.cdf(data['upper_standardized'].loc[data['is_upper']])
-    likl_lower = rv.cdf(data['lower_standardized'].loc[data['is_lower']])
+    upper_standardized = (upper[is_upper] - m_optim[is_upper]) / std[is_upper]
+    contribs[is_upper] = 1.0 - special.ndtr(upper_standardized)
+    lower_standardized = (lower[is_lower] - m_optim[is_lower]) / std[is_lower]
+    contribs[is_lower] = special.ndtr(lower_standardized)
 
-    # Average negative log-likelihood
-    contribs = np.concatenate([likl_interior, likl_lower, likl_upper], axis=0)
-    rslt = - np.mean(np.log(np.clip(np.sort(contribs), TINY_FLOAT, np.inf)))
+    is_contributing = is_interior | is_upper | is_lower
 
-    return rslt, m_optimal
+    return np.log(np.clip(contribs, TINY_FLOAT, np.inf)), is_contributing
+
+
+def aggregate_by_agent(values, agent_codes, num_agents):
+    """Sum up the values of all observations for each agent.
+
+    The agents are identified by their position, the values might have several columns.
+    """
+    values = np.asarray(values, dtype=np.float64)
+
+    rslt = np.zeros((num_agents,) + values.shape[1:], dtype=np.float64)
+    np.add.at(rslt, agent_codes, values)
+
+    return rslt
+
+
+def reduce_log_likelihood(partials):
+    """Combine the partial sums of the log-likelihood to the average negative log-likelihood."""
+    total, count = 0, 0
+    for partial_total, partial_count in partials:
+        total += partial_total
+        count += partial_count
+
+    # The exact sum is only rounded once at the very end, so the result does not depend on how
+    # the observations are split up.
+    if isinstance(total, int):
+        total = float(fractions.Fraction(total, EXACT_SCALE))
+
+    return - total / count
+
+
+def get_exact_sum(values):
+    """Calculate the exact sum of an array of floats.
+
+    Each float is represented by an integer mantissa and an exponent, and all mantissas with the
+    same exponent are added up as integers. The result is an integer in units of 2 ** -1127, which
+    covers all subnormal numbers. The sum of values that are not finite is returned as a float.
+    """
+    if not np.all(np.isfinite(values)):
+        return float(np.sum(values))
+
+    mantissa, exponent = np.frexp(values)
+    mantissa = (mantissa * 2.0 ** 53).astype(np.int64)
+
+    # We split the mantissas in two parts so that their sums cannot overflow.
+    mantissa_high, mantissa_low = mantissa >> 26, mantissa & (2 ** 26 - 1)
+
+    idx = np.argsort(exponent, kind='stable')
+    exponent, mantissa_high, mantissa_low = exponent[idx], mantissa_high[idx], mantissa_low[idx]
+    starts = np.flatnonzero(np.diff(exponent, prepend=exponent[:1] - 1))
+
+    total = 0
+    if starts.shape[0] == 0:
+        return total
+
+    sums_high = np.add.reduceat(mantissa_high, starts)
+    sums_low = np.add.reduceat(mantissa_low, starts)
+    for i, start in enumerate(starts):
+        mantissa = (int(sums_high[i]) << 26) + int(sums_low[i])
+        total += mantissa << int(exponent[start] + 1074)
+
+    return total
 
 
 def get_optimal_compensations_scaled_archimedean(questions, upper, marginals, r_self,
-                                                 r_other, delta, self, other):
+                                                 r_other, delta, self, other, m_start=None,
+                                                 xtol=None, solver='brenth'):
     """Return the optimal compensations for all questions."""
     for question in questions:
         if question <= 30 and not question == 13:
             raise TrempyError('Temporal decisions not implemented for scaled_archimedean.')
 
-    copula = get_copula_scaled_archimedean(upper, marginals, r_self, r_other, delta, self, other)
+    with instrument_obj.phase('copula'):
+        copula = get_copula_scaled_archimedean(
+            upper, marginals, r_self, r_other, delta, self, other)
 
-    m_optimal = dict()
-    for q in questions:
-        m_optimal[q] = determine_optimal_compensation(copula, q)
-    return m_optimal
+    return solve_optimal_compensations(copula, questions, m_start, xtol, solver)
 
 
 def get_optimal_compensations_nonstationary(
@@ -103,29 +266,41 @@ def get_optimal_compensations_nonstationary(
     unrestricted_weights_3, unrestricted_weights_6,
     unrestricted_weights_12, unrestricted_weights_24,
     # Optional arguments that determine the model type
-    discounting, stationary_model, df_other
+    discounting, stationary_model, df_other, m_start=None, xtol=None, solver='brenth'
 ):
     """Optimal compensation for the nonstationary utility function."""
-    copula = get_copula_nonstationary(
-        alpha, beta, gamma, y_scale,
-        discount_factors_0, discount_factors_1,
-        discount_factors_3, discount_factors_6,
-        discount_factors_12, discount_factors_24,
-        unrestricted_weights_0, unrestricted_weights_1,
-        unrestricted_weights_3, unrestricted_weights_6,
-        unrestricted_weights_12, unrestricted_weights_24,
-        discounting=discounting,
-        stationary_model=stationary_model,
-        df_other=df_other
-    )
-
+    with instrument_obj.phase('copula'):
+        copula = get_copula_nonstationary(
+            alpha, beta, gamma, y_scale,
+            discount_factors_0, discount_factors_1,
+            discount_factors_3, discount_factors_6,
+            discount_factors_12, discount_factors_24,
+            unrestricted_weights_0, unrestricted_weights_1,
+            unrestricted_weights_3, unrestricted_weights_6,
+            unrestricted_weights_12, unrestricted_weights_24,
+            discounting=discounting,
+            stationary_model=stationary_model,
+            df_other=df_other
+        )
+
+    return solve_optimal_compensations(copula, questions, m_start, xtol, solver)
+
+
+@floating_point_policy
+def solve_optimal_compensations(copula, questions, m_start=None, xtol=None, solver='brenth'):
+    """Determine the optimal compensations for all questions given the utility copula."""
     m_optimal = dict()
-    for q in questions:
-        m_optimal[q] = determine_optimal_compensation(copula, q)
+    with instrument_obj.phase('root-finding'):
+        eu_a = get_expected_utilities_a(copula, questions)
+        for q in questions:
+            m_start_q = get_start(m_start, q)
+            m_optimal[q] = determine_optimal_compensation(copula, q, m_start_q, xtol, eu_a[q],
+                                                          solver)
     return m_optimal
 
 
-def get_optimal_compensations(version, paras_obj, questions, **version_specific):
+def get_optimal_compensations(version, paras_obj, questions, m_start=None, xtol=None,
+                              solver='brenth', **version_specific):
     """Get optimal compensations based on a model_obj."""
     nparas_econ = paras_obj.attr['nparas_econ']
 
@@ -140,7 +315,8 @@ def get_optimal_compensations(version, paras_obj, questions, **version_specific)
         r_self, r_other, delta, self, other = paras_obj.get_values('econ', 'all')[:nparas_econ]
 
         # Optimal compensation
-        args = [questions, upper, marginals, r_self, r_other, delta, self, other]
+        args = [questions, upper, marginals, r_self, r_other, delta, self, other, m_start, xtol,
+                solver]
         m_optimal = get_optimal_compensations_scaled_archimedean(*args)
 
     elif version in ['nonstationary']:
@@ -166,7 +342,7 @@ def get_optimal_compensations(version, paras_obj, questions, **version_specific)
                 unrestricted_weights_0, unrestricted_weights_1, unrestricted_weights_3,
                 unrestricted_weights_6, unrestricted_weights_12, unrestricted_weights_24,
                 # Optional arguments:
-                discounting, stationary_model, df_other]
+                discounting, stationary_model, df_other, m_start, xtol, solver]
         m_optimal = get_optimal_compensations_nonstationary(*args)
     else:
         raise TrempyError('version not implemented')
@@ -179,7 +355,7 @@ def print_init_dict(dict_, fname='test.trempy.ini'):
     version = dict_['VERSION']['version']
 
     keys = ['VERSION', 'SIMULATION', 'ESTIMATION',
-            'SCIPY-BFGS', 'SCIPY-POWELL', 'SCIPY-L-BFGS-B',
+            'SCIPY-BFGS', 'SCIPY-POWELL', 'SCIPY-L-BFGS-B', 'BHHH',
             'CUTOFFS', 'QUESTIONS']
 
     # Add keys based on version of the utility function
@@ -195,6 +371,10 @@ def print_init_dict(dict_, fname='test.trempy.ini'):
 
     with open(fname, 'w') as outfile:
         for key_ in keys:
+            # Older initialization dictionaries do not include the block of the BHHH optimizer.
+            if key_ not in dict_.keys():
+                continue
+
             # We do not ned to print the CUTOFFS block if none are specified. So we first check
             # below if there is any need.
             if key_ not in ['CUTOFFS']:
@@ -229,9 +409,10 @@ def print_init_dict(dict_, fname='test.trempy.ini'):
                     str_ += ' {:>25}\n'
 
                 # Handle string output (e.g. "True" or "None")
-                if label in ['detailed', 'version', 'heterogeneity']:
+                if label in ['detailed', 'version', 'heterogeneity', 'fingerprint', 'instrument',
+                             'warm_start', 'adaptive']:
                     info = str(info)
-                if label in ['discounting', 'stationary_model']:
+                if label in ['discounting', 'stationary_model', 'budget', 'chunk']:
                     if info is None:
                         info = 'None'
                     else:
@@ -325,6 +506,40 @@ def format_coefficient_line(label_internal, info, str_):
     return line, str_
 
 
+class _MemoizedCopulaCls(object):
+    """Evaluate the utility copula only once for each point."""
+
+    def __init__(self, copula):
+        """Init class."""
+        self.copula = copula
+        self.points = dict()
+
+    def evaluate(self, x, y, t):
+        """Evaluate the copula unless the point was already evaluated."""
+        point = (x, y, t)
+        is_hit = point in self.points
+        if not is_hit:
+            self.points[point] = self.copula.evaluate(x, y, t=t)
+        instrument_obj.record_cache('utility-points', is_hit)
+        return self.points[point]
+
+
+def get_expected_utilities_a(copula, questions):
+    """Calculate the expected utility of lottery A for all questions.
+
+    The expected utility of lottery A does not depend on the compensation and many questions share
+    the same points of the utility function, e.g. (50, 0, 0) for questions 1-5, 13, and 19-23. We
+    evaluate each unique point only once.
+    """
+    copula = _MemoizedCopulaCls(copula)
+
+    eu_a = dict()
+    for q in questions:
+        eu_a[q] = expected_utility_a(copula, q)
+
+    return eu_a
+
+
 def expected_utility_a(copula, lottery):
     """Calculate the expected utility for lottery A."""
     # TEMPORAL DECISIONS
@@ -509,17 +724,50 @@ def expected_utility_b(copula, lottery, m):
     return rslt
 
 
-def determine_optimal_compensation(copula, lottery):
-    """Determine the optimal compensation that ensures the equality of the expected utilities."""
-    def comp_criterion_function(copula, lottery, m):
+def get_brenth_options(xtol):
+    """Return the options for brenth, where we use its default tolerance unless requested."""
+    if xtol is None:
+        return dict()
+    return {'xtol': xtol}
+
+
+def get_start(m_start, lottery):
+    """Return the starting value for the root-finding of a question, if available."""
+    if m_start is None:
+        return None
+    return m_start.get(lottery, None)
+
+
+def determine_optimal_compensation(copula, lottery, m_start=None, xtol=None, eu_a=None,
+                                   solver='brenth'):
+    """Determine the optimal compensation that ensures the equality of the expected utilities.
+
+    If a starting value is available, we first search in a narrow bracket around it. The expected
+    utility of lottery A does not depend on the compensation, so it is only calculated once or
+    passed in directly. The Chebyshev solver does not require a starting value.
+    """
+    def comp_criterion_function(copula, lottery, stat_a, m):
         """Criterion function for the root-finding function."""
-        stat_a = expected_utility_a(copula, lottery)
         stat_b = expected_utility_b(copula, lottery, m)
         stat = stat_a - stat_b
         return stat
 
     lower, upper = LOTTERY_BOUNDS[lottery]
-    crit_func = partial(comp_criterion_function, copula, lottery)
+    copula = instrument_obj.get_counting_copula(copula, lottery)
+    if eu_a is None:
+        eu_a = expected_utility_a(copula, lottery)
+    crit_func = partial(comp_criterion_function, copula, lottery, eu_a)
+
+    if solver in ['chebyshev']:
+        return determine_optimal_compensation_chebyshev(crit_func, lottery, xtol)
+    elif solver not in ['brenth']:
+        raise TrempyError('solver not implemented')
+
+    if m_start is not None:
+        m_opt = determine_optimal_compensation_warm(crit_func, lottery, m_start, xtol)
+        instrument_obj.record_cache('warm-start', m_opt is not None)
+        if m_opt is not None:
+            return m_opt
 
     # If the criterion function is positive even at the maximum compensation then the optimal
     # compensation is set to upper bound itself.
@@ -530,7 +778,155 @@ def determine_optimal_compensation(copula, lottery):
     elif np.sign(crit_func(lower)) == -1:
         m_opt = float(lower)
     else:
-        m_opt = optimize.brenth(crit_func, lower, upper)
+        m_opt, info = optimize.brenth(crit_func, lower, upper, full_output=True,
+                                      **get_brenth_options(xtol))
+        instrument_obj.record_iterations(lottery, info.iterations)
+
+    return m_opt
+
+
+def determine_optimal_compensation_warm(crit_func, lottery, m_start, xtol=None):
+    """Determine the optimal compensation starting from a narrow bracket around a previous solution.
+
+    The criterion function decreases in the compensation. We move the bracket in the direction of
+    the root and double its width until the sign test succeeds or we reach the bounds of the full
+    bracket. We return None if the sign test does not allow to locate the root at all.
+    """
+    lower, upper = LOTTERY_BOUNDS[lottery]
+    width = WARM_START_WIDTH * (upper - lower)
+
+    m_start = min(max(m_start, lower), upper)
+    left, right = max(lower, m_start - width), min(upper, m_start + width)
+    f_left, f_right = crit_func(left), crit_func(right)
+
+    num_expansions = 0
+    while True:
+        if np.sign(f_left) >= 0 and np.sign(f_right) <= 0:
+            break
+        # The root is above the bracket, so we move upwards.
+        elif np.sign(f_left) == 1 and np.sign(f_right) == 1:
+            if right == upper:
+                return float(upper)
+            width *= 2.0
+            left, f_left = right, f_right
+            right = min(upper, right + width)
+            f_right = crit_func(right)
+        # The root is below the bracket, so we move downwards.
+        elif np.sign(f_left) == -1 and np.sign(f_right) == -1:
+            if left == lower:
+                return float(lower)
+            width *= 2.0
+            right, f_right = left, f_left
+            left = max(lower, left - width)
+            f_left = crit_func(left)
+        # The criterion function is not decreasing over the bracket.
+        else:
+            return None
+        num_expansions += 1
+
+    instrument_obj.record_iterations(lottery, num_expansions)
+
+    # The root is located at one of the boundaries of the bracket.
+    if np.sign(f_right) == 0:
+        return float(right)
+    if np.sign(f_left) == 0:
+        return float(left)
+
+    m_opt, info = optimize.brenth(crit_func, left, right, full_output=True,
+                                  **get_brenth_options(xtol))
+    instrument_obj.record_iterations(lottery, info.iterations)
+
+    return m_opt
+
+
+def determine_optimal_compensation_chebyshev(crit_func, lottery, xtol=None):
+    """Determine the optimal compensation based on a Chebyshev interpolation of the criterion.
+
+    We evaluate the criterion at the Chebyshev-Lobatto nodes on the full bracket and locate the
+    root of the interpolating polynomial between the two nodes that bracket the root. We then
+    polish it with at most CHEBYSHEV_POLISH Newton steps on the true criterion, where the
+    derivative is the one of the interpolant, and fall back to brenth on the narrow bracket if
+    they do not converge.
+
+    The copula only evaluates scalars and each question calls it differently, so the nodes are
+    evaluated one by one and not batched within or across questions. The solver thus replaces
+    the iterations of brenth by CHEBYSHEV_DEGREE + 1 evaluations at fixed nodes and a few
+    polishing steps. It does not reduce the number of calls to the copula in general.
+    """
+    lower, upper = LOTTERY_BOUNDS[lottery]
+
+    # The nodes are ordered from the upper to the lower bound and the first and last node are
+    # exactly the bounds of the full bracket.
+    grid = np.cos(np.pi * np.arange(CHEBYSHEV_DEGREE + 1) / CHEBYSHEV_DEGREE)
+    nodes = lower + (grid + 1.0) * 0.5 * (upper - lower)
+    nodes[0], nodes[-1] = upper, lower
+
+    values = np.array([crit_func(node) for node in nodes], dtype=float)
+
+    # The handling of the bounds is the same as for the full bracket.
+    if np.sign(values[0]) == 1:
+        return float(upper)
+    elif np.sign(values[-1]) == -1:
+        return float(lower)
+    elif np.sign(values[0]) == 0:
+        return float(upper)
+
+    # The criterion is decreasing, so we look for the first node with a nonnegative value when
+    # moving downwards from the upper bound.
+    idx = np.argmax(values >= 0)
+    right, left = nodes[idx - 1], nodes[idx]
+    f_right, f_left = values[idx - 1], values[idx]
+
+    if np.sign(f_left) == 0:
+        return float(left)
+
+    poly = np.polynomial.chebyshev.Chebyshev.fit(nodes, values, CHEBYSHEV_DEGREE,
+                                                 domain=[lower, upper])
+    deriv = poly.deriv()
+
+    # We start from the root of the interpolant in the bracket, if there is one, and the linear
+    # interpolation of the two nodes otherwise.
+    m_opt = left - f_left * (right - left) / (f_right - f_left)
+    roots = poly.roots()
+    roots = roots[np.isreal(roots)].real
+    roots = roots[(roots >= left) & (roots <= right)]
+    if roots.shape[0] > 0:
+        m_opt = roots[0]
+
+    # The last tolerance of the schedule is the default of brenth.
+    if xtol is None:
+        xtol = XTOL_SCHEDULE[-1]
+
+    num_iterations = 0
+    for _ in range(CHEBYSHEV_POLISH):
+        num_iterations += 1
+
+        stat = crit_func(m_opt)
+        if stat == 0:
+            instrument_obj.record_iterations(lottery, num_iterations)
+            return float(m_opt)
+
+        # We keep track of the bracket to safeguard the Newton steps.
+        if np.sign(stat) == 1:
+            left, f_left = m_opt, stat
+        else:
+            right, f_right = m_opt, stat
+
+        slope = deriv(m_opt)
+        m_next = m_opt - stat / slope if slope != 0 else np.nan
+        if not (left <= m_next <= right):
+            break
+
+        if abs(m_next - m_opt) < xtol:
+            instrument_obj.record_iterations(lottery, num_iterations)
+            return float(m_next)
+        m_opt = m_next
+
+    instrument_obj.record_iterations(lottery, num_iterations)
+
+    m_opt, info = optimize.brenth(crit_func, left, right, full_output=True,
+                                  **get_brenth_options(xtol))
+    instrument_obj.record_iterations(lottery, info.iterations)
 
     return m_opt
 
@@ -5,28 +5,32 @@ import numpy as np
 
 from trempy.shared.shared_auxiliary import get_optimal_compensations
 from trempy.shared.shared_auxiliary import dist_class_attributes
+from trempy.shared.shared_auxiliary import floating_point_policy
 from trempy.shared.shared_auxiliary import criterion_function
+from trempy.process.process_auxiliary import write_dataset
 from trempy.config_trempy import PREFERENCE_PARAMETERS
 from trempy.config_trempy import NEVER_SWITCHERS
 from trempy.custom_exceptions import TrempyError
 from trempy.clsModel import ModelCls
 
 
+@floating_point_policy
 def simulate(fname):
     """Simulate the model based on the initialization file."""
     model_obj = ModelCls(fname)
     version = model_obj.attr['version']
 
     # Get fixed args that do not change during simulation.
-    args = [model_obj, 'sim_agents', 'questions', 'sim_seed', 'sim_file', 'paras_obj', 'cutoffs']
+    args = [model_obj, 'sim_agents', 'questions', 'sim_seed', 'sim_file', 'paras_obj', 'cutoffs',
+            'sim_format']
     if version in ['scaled_archimedean']:
         args += ['upper', 'marginals']
-        sim_agents, questions, sim_seed, sim_file, paras_obj, cutoffs, upper, marginals = \
-            dist_class_attributes(*args)
+        sim_agents, questions, sim_seed, sim_file, paras_obj, cutoffs, sim_format, upper, \
+            marginals = dist_class_attributes(*args)
 
         version_specific = {'upper': upper, 'marginals': marginals}
     elif version in ['nonstationary']:
-        sim_agents, questions, sim_seed, sim_file, paras_obj, cutoffs = \
+        sim_agents, questions, sim_seed, sim_file, paras_obj, cutoffs, sim_format = \
             dist_class_attributes(*args)
         version_specific = dict()
     else:
@@ -95,7 +99,7 @@ def simulate(fname):
     df.set_index(['Individual', 'Question'], inplace=True, drop=False)
     df.sort_index(inplace=True)
 
-    df.to_pickle(sim_file + '.trempy.pkl', protocol=2)
+    write_dataset(df, sim_file, sim_format)
 
     x_econ_all_current = paras_obj.get_values('econ', 'all')
 
@@ -5,6 +5,8 @@ import tempfile
 import pytest
 import os
 
+from trempy.config_trempy import FLOATING_POINT
+
 
 @pytest.fixture(scope="module", autouse=True)
 def set_seed():
@@ -16,3 +18,10 @@ def set_seed():
 def fresh_directory():
     """Each test is executed in a fresh directory."""
     os.chdir(tempfile.mkdtemp())
+
+
+@pytest.fixture(autouse=True)
+def floating_point_policy():
+    """Each test is executed with the strict handling of floating-point errors of the package."""
+    with np.errstate(**FLOATING_POINT):
+        yield
@@ -1,11 +1,12 @@
 """This module contains auxiliary functions for the test runs."""
 import shlex
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import copy
 
+from trempy.process.process_auxiliary import get_dataset_fname
+from trempy.shared.shared_auxiliary import dist_class_attributes
 from trempy.shared.shared_auxiliary import get_random_string
 from trempy.shared.shared_auxiliary import print_init_dict
 from trempy.config_trempy import PREFERENCE_PARAMETERS
@@ -30,6 +31,16 @@ def get_random_init(constr=None):
     return init_dict
 
 
+def get_version_specific(model_obj):
+    """Collect the version-specific arguments that are not part of the parameters."""
+    version_specific = dict()
+    if model_obj.get_attr('version') in ['scaled_archimedean']:
+        upper, marginals = dist_class_attributes(model_obj, 'upper', 'marginals')
+        version_specific = {'upper': upper, 'marginals': marginals}
+
+    return version_specific
+
+
 def random_dict(constr):
     """Create a random initialization file."""
     dict_ = dict()
@@ -174,6 +185,7 @@ def random_dict(constr):
     dict_['SIMULATION']['agents'] = sim_agents
     dict_['SIMULATION']['seed'] = np.random.randint(1, 1000)
     dict_['SIMULATION']['file'] = fname
+    dict_['SIMULATION']['format'] = np.random.choice(['pickle', 'columnar'], p=[0.8, 0.2])
 
     # We sample valid estimation requests.
     est_agents = np.random.randint(1, sim_agents)
@@ -181,13 +193,28 @@ def random_dict(constr):
 
     dict_['ESTIMATION'] = dict()
     dict_['ESTIMATION']['optimizer'] = np.random.choice(
-        ['SCIPY-BFGS', 'SCIPY-L-BFGS-B', 'SCIPY-POWELL'])
+        ['SCIPY-BFGS', 'SCIPY-L-BFGS-B', 'SCIPY-POWELL', 'BHHH'])
     dict_['ESTIMATION']['detailed'] = np.random.choice([True, False], p=[0.9, 0.1])
     dict_['ESTIMATION']['start'] = np.random.choice(['init', 'auto'])
+    dict_['ESTIMATION']['fingerprint'] = np.random.choice([True, False])
+    dict_['ESTIMATION']['instrument'] = np.random.choice([True, False])
+    dict_['ESTIMATION']['warm_start'] = np.random.choice([True, False])
+    dict_['ESTIMATION']['adaptive'] = np.random.choice([True, False])
+    dict_['ESTIMATION']['solver'] = np.random.choice(['brenth', 'chebyshev'])
+    dict_['ESTIMATION']['backend'] = np.random.choice(
+        ['serial', 'threads', 'processes'], p=[0.8, 0.1, 0.1])
+    dict_['ESTIMATION']['workers'] = np.random.randint(1, 4)
+    dict_['ESTIMATION']['shards'] = np.random.choice([1, 2], p=[0.8, 0.2])
+    dict_['ESTIMATION']['chunk'] = None
+    dict_['ESTIMATION']['presearch'] = np.random.choice([0, 10], p=[0.8, 0.2])
+    dict_['ESTIMATION']['inference'] = 'none'
+    dict_['ESTIMATION']['budget'] = None
+    if np.random.choice([True, False], p=[0.2, 0.8]):
+        dict_['ESTIMATION']['budget'] = float(np.random.randint(600, 3600))
     dict_['ESTIMATION']['agents'] = est_agents
     dict_['ESTIMATION']['skip'] = num_skip
     dict_['ESTIMATION']['maxfun'] = np.random.randint(1, 10)
-    dict_['ESTIMATION']['file'] = fname + '.trempy.pkl'
+    dict_['ESTIMATION']['file'] = get_dataset_fname(fname, dict_['SIMULATION']['format'])
 
     # We sample optimizer options.
     dict_['SCIPY-BFGS'] = dict()
@@ -203,6 +230,10 @@ def random_dict(constr):
     dict_['SCIPY-POWELL']['xtol'] = np.random.lognormal()
     dict_['SCIPY-POWELL']['ftol'] = np.random.lognormal()
 
+    dict_['BHHH'] = dict()
+    dict_['BHHH']['gtol'] = np.random.lognormal()
+    dict_['BHHH']['eps'] = np.random.lognormal()
+
     # Now we need to impose possible constraints.
     if constr is not None:
         if 'maxfun' in constr.keys():
@@ -367,6 +398,9 @@ def visualize_modelfit(df_simulated, df_estimated):
     df_temporal = df.filter(regex='(Estimated|Simulated): ([1-9]$)|(([1-2][0-9])|30)')
     df_risky = df.filter(regex='(Estimated|Simulated): ((3[1-9])|([4-5][0-9]))')
 
+    # The plots are the only use of MATPLOTLIB, which is expensive to import.
+    import matplotlib.pyplot as plt
+
     fig, axes = plt.subplots(nrows=1, ncols=2, figsize=(16, 10), sharex=False, sharey=False)
     for row, data in enumerate([df_risky, df_temporal]):
         # Prepare plot
@@ -1,12 +1,23 @@
 """This module contains some integration tests."""
 from subprocess import CalledProcessError
+import multiprocessing
 import subprocess
+import sqlite3
+import sys
 import os
 
+import pandas as pd
 import numpy as np
 
+from trempy.montecarlo.montecarlo import run_study
 from trempy.tests.test_auxiliary import get_random_init
+from trempy.config_trempy import PREFERENCE_PARAMETERS
+from trempy.distribute.distribute import run_worker
+from trempy.distribute.clsQueue import QueueCls
 from trempy.config_trempy import PACKAGE_DIR
+from trempy.clsModel import ModelCls
+from trempy import estimate_agents
+from trempy import bootstrap
 from trempy import simulate
 from trempy import estimate
 
@@ -39,3 +50,118 @@ def test_2():
     except CalledProcessError:
         os.chdir(cwd)
         raise CalledProcessError
+
+
+def test_3():
+    """Run the estimation for each agent separately."""
+    constr = dict()
+    constr['version'] = 'nonstationary'
+    constr['heterogeneity'] = True
+    constr['maxfun'] = np.random.randint(1, 5 + 1)
+    constr['start'] = 'init'
+
+    get_random_init(constr)
+    simulate('test.trempy.ini')
+    df_rslt = estimate_agents('test.trempy.ini', workers=2)
+
+    model_obj = ModelCls('test.trempy.ini')
+    np.testing.assert_equal(df_rslt.shape[0], model_obj.get_attr('est_agents'))
+
+
+def test_4():
+    """Run the bootstrap over agents."""
+    constr = dict()
+    constr['maxfun'] = np.random.randint(1, 5 + 1)
+    constr['start'] = 'init'
+
+    get_random_init(constr)
+    simulate('test.trempy.ini')
+
+    model_obj = ModelCls('test.trempy.ini')
+    num_boots = np.random.randint(1, 4)
+
+    df_rslt = bootstrap(model_obj, num_boots=num_boots, workers=2, seed=123,
+                        is_full=np.random.choice([True, False]))
+
+    labels = PREFERENCE_PARAMETERS[model_obj.get_attr('version')] + model_obj.get_attr('questions')
+    np.testing.assert_equal(df_rslt.shape, (num_boots, len(labels) + 1))
+
+
+def test_5():
+    """Run a small Monte Carlo study and resume it after extending its grid."""
+    study = dict()
+    study['versions'] = [np.random.choice(['scaled_archimedean', 'nonstationary'])]
+    study['num_agents'] = [np.random.randint(2, 5)]
+    study['perturbations'] = [0.0, np.random.choice([0.1, None])]
+    study['maxfun'] = np.random.randint(1, 3)
+    study['seeds'] = [1]
+
+    run_study(study, workers=2)
+    with sqlite3.connect('montecarlo.trempy.db') as conn:
+        df_jobs = pd.read_sql_query('SELECT * FROM jobs ORDER BY job', conn)
+    np.testing.assert_equal(df_jobs.shape[0], 2)
+
+    # Only the additional jobs are run once the grid is extended.
+    study['seeds'] = [1, 2]
+    df_rslt = run_study(study, workers=2)
+    with sqlite3.connect('montecarlo.trempy.db') as conn:
+        df_resumed = pd.read_sql_query('SELECT * FROM jobs ORDER BY job', conn)
+    np.testing.assert_equal(df_resumed.shape[0], 4)
+
+    for _, row in df_jobs[df_jobs['status'] == 'finished'].iterrows():
+        np.testing.assert_equal(df_resumed.set_index('job').loc[row['job'], 'elapsed'],
+                                row['elapsed'])
+
+    # All jobs run the same fully specified estimator, so none of them fails.
+    np.testing.assert_equal((df_resumed['status'] == 'finished').all(), True)
+    np.testing.assert_equal(set(df_rslt['job']), set(df_resumed['job']))
+
+
+def test_6():
+    """Drain a queue of simulations and estimations with several workers."""
+    constr = dict()
+    constr['maxfun'] = np.random.randint(1, 5 + 1)
+    constr['start'] = 'init'
+
+    get_random_init(constr)
+    model_obj = ModelCls('test.trempy.ini')
+    with open('test.trempy.ini') as infile:
+        spec = infile.read()
+
+    dataset = os.path.abspath(model_obj.get_attr('est_file'))
+
+    queue_obj = QueueCls('queue.trempy.db')
+    queue_obj.submit('simulate', spec, dataset)
+
+    workers = [multiprocessing.Process(target=run_worker, args=('queue.trempy.db',))
+               for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    num_jobs = np.random.randint(1, 4)
+    for _ in range(num_jobs):
+        queue_obj.submit('estimate', spec, dataset)
+
+    # A worker crashes after it claimed a job, which is claimed again once the lease expires.
+    crashed_obj = QueueCls('queue.trempy.db', lease=0.1)
+    job = crashed_obj.claim('crashed')
+    crashed_obj.close()
+    multiprocessing.Event().wait(0.2)
+
+    np.testing.assert_equal(run_worker('queue.trempy.db', worker='alive'), num_jobs)
+
+    df_jobs = queue_obj.get_jobs()
+    queue_obj.close()
+
+    np.testing.assert_equal((df_jobs['status'] == 'finished').all(), True)
+    np.testing.assert_equal(df_jobs.loc[job['id'], ['worker', 'attempts']].tolist(), ['alive', 2])
+
+
+def test_7():
+    """Ensure that importing the package does not import any of its dependencies."""
+    code = 'import sys, trempy; print(" ".join(sys.modules.keys()))'
+    modules = subprocess.check_output([sys.executable, '-c', code]).decode('utf-8').split()
+    for module in ['pandas', 'scipy', 'copulpy', 'statsmodels', 'matplotlib']:
+        np.testing.assert_equal(module in modules, False)
@@ -1,14 +1,17 @@
-"""Contains the Monte Carlo simulation tests."""
+"""Contains the Monte Carlo simulation tests.
+
+The studies over a whole grid of specifications are run by trempy.montecarlo.montecarlo.run_study().
+"""
 
 import numpy as np
-import copy
 
+from trempy.montecarlo.montecarlo_auxiliary import perturbate_single
 from trempy.estimate.estimate_auxiliary import estimate_cleanup
+from trempy.montecarlo.montecarlo_auxiliary import perturbate_econ
+from trempy.montecarlo.montecarlo_auxiliary import set_questions
 from trempy.shared.shared_auxiliary import print_init_dict
 from trempy.config_trempy import PREFERENCE_PARAMETERS
 from trempy.tests.test_auxiliary import random_dict
-from trempy.custom_exceptions import TrempyError
-from trempy.config_trempy import DEFAULT_BOUNDS
 from trempy.read.read import ESTIMATION_GROUP
 from trempy.estimate.estimate import estimate
 from trempy.simulate.simulate import simulate
@@ -45,29 +48,6 @@ def basic_dict(version, fname, optimizer, maxfun, num_agents, std=None,
     return init_dict
 
 
-def set_questions(init_dict, is_fixed, std=None):
-    """Manipulate questions."""
-    # Change free and fixed status
-    if is_fixed in ['fix_all']:
-        for q in init_dict['QUESTIONS'].keys():
-            init_dict['QUESTIONS'][q][1] = True
-    else:
-        np.testing.assert_equal(len(is_fixed), len(init_dict['QUESTIONS'].keys()))
-        for q, fix_value in enumerate(is_fixed):
-            init_dict['QUESTIONS'][q][1] = fix_value
-    # Change standard deviations
-    if std is not None:
-        np.testing.assert_equal(len(std), len(init_dict['QUESTIONS'].keys()))
-        for q, sd in enumerate(std):
-            init_dict['QUESTIONS'][q][0] = sd
-
-
-def remove_cutoffs(init_dict):
-    """Remove cutoffs."""
-    init_dict['CUTOFFS'] = dict()
-    return dict
-
-
 def estimate_at_truth(fix_question_paras):
     """Stability of the likelihood at the truth."""
     estimate_cleanup()
@@ -113,44 +93,6 @@ def estimate_at_truth(fix_question_paras):
     return results
 
 
-def perturbate_econ(init_dict, no_temporal_choices=True, max_dist=None):
-    """Perturbate all economic parameters and set bounds to default bounds."""
-    old_dict = copy.deepcopy(init_dict)
-
-    version = init_dict['VERSION']['version']
-
-    for group in ESTIMATION_GROUP[version]:
-        for label in PREFERENCE_PARAMETERS[version]:
-            if label in init_dict[group].keys():
-                # Distribute parameters
-                value, is_fixed, _ = init_dict[group][label]
-
-                # Handle optional or unused arguments.
-                if value is None:
-                    continue
-                lower, upper = DEFAULT_BOUNDS[label]
-
-                # Move the parameter by less than max_dist away.
-                if max_dist is not None:
-                    new_value = np.random.uniform(value - max_dist, value + max_dist)
-                    new_value = min(upper, new_value)
-                    new_value = max(lower, new_value)
-                else:
-                    # Get new value
-                    new_value = np.random.uniform(lower, upper)
-
-                if group in ['DISCOUNTING'] and no_temporal_choices is True:
-                    is_fixed = True
-                    new_value = value
-                else:
-                    is_fixed = False
-
-                # Update
-                old_dict[group][label] = [value, is_fixed, [lower, upper]]
-                init_dict[group][label] = [new_value, is_fixed, [lower, upper]]
-    return old_dict, init_dict
-
-
 def pertubation_robustness_all(version, no_temporal_choices=True,
                                max_dist=None, set_std_to=None):
     """Test pertubation of all parameters."""
@@ -206,48 +148,6 @@ def pertubation_robustness_all(version, no_temporal_choices=True,
     print('fval_truth: {:>25}'.format(fval))
 
 
-def perturbate_single(init_dict, label, value=None):
-    """Perturbate a single parameter and fix all other parameters for estimation.
-
-    We also set the bounds for the perturbed parameter to its default bounds.
-    This increases the scope for perturbations.
-    """
-    old_dict = copy.deepcopy(init_dict)
-
-    version = init_dict['VERSION']['version']
-    if label not in PREFERENCE_PARAMETERS[version]:
-        raise TrempyError('Version {0} has no parameters {1}'.format(version, label))
-
-    # Fix variance for each question.
-    for q in init_dict['QUESTIONS'].keys():
-        init_dict['QUESTIONS'][q][1] = True
-
-    # Handle optional parameters
-    if label.startswith('unrestricted_weights'):
-        not_used = (None in init_dict['TEMPORAL'].values())
-        if not_used:
-            raise TrempyError('Cannot set value for unused argument: {}.'.format(label))
-
-    # Fix every parameter except for perturbed one. The perturbed one is "un-fixed".
-    for group in ESTIMATION_GROUP[version]:
-        for key in init_dict[group].keys():
-            current_value, _, bounds = init_dict[group][key]
-            if key == label:
-                # Reset bounds to default
-                lower, upper = DEFAULT_BOUNDS[label]
-                # If no value is specified, draw a random value.
-                if value is None:
-                    value = np.random.uniform(lower + SMALL_FLOAT, upper - SMALL_FLOAT)
-                init_dict[group][key] = [value, False, [lower, upper]]
-                # Also, override old bounds in old dict.
-                old_dict[group][key] = [current_value, False, [lower, upper]]
-            # Fix all other parameters.
-            else:
-                init_dict[group][key] = [current_value, True, bounds]
-
-    return old_dict, init_dict
-
-
 def pertubation_robustness_single(version, label=None, value=None, num_agents=None, maxfun=None,
                                   optimizer='SCIPY-BFGS'):
     """Check robustness against single perturbations."""
@@ -1,8 +1,11 @@
 """This module contains some integration tests."""
 import pickle as pkl
+import json
+import os
 
 import numpy as np
 
+from trempy.shared.shared_auxiliary import floating_point_policy
 from trempy.shared.shared_auxiliary import dist_class_attributes
 from trempy.shared.shared_auxiliary import criterion_function
 from trempy.shared.shared_auxiliary import print_init_dict
@@ -10,6 +13,10 @@ from trempy.config_trempy import PACKAGE_DIR
 from trempy.clsModel import ModelCls
 from trempy import simulate
 
+# The vault stores a header line with its format and version, followed by one line per test.
+VAULT_FORMAT = 'trempy-regression-vault'
+VAULT_VERSION = 1
+
 
 def run_regression_test(test):
     """Run a single regression test.
@@ -17,9 +24,15 @@ def run_regression_test(test):
     It is repeatedly used by the testing infrastructure.
     Thus, manual modifications are only required here.
     """
-    # Create and process initialization file
     init_dict, crit_val = test
 
+    stat = get_regression_stat(init_dict)
+    np.testing.assert_almost_equal(stat, crit_val)
+
+
+@floating_point_policy
+def get_regression_stat(init_dict):
+    """Evaluate the criterion function for the simulated sample of a regression test."""
     # Temporary: code to handle old dictionaries in the vault without:
     version_keys = init_dict['VERSION'].keys()
     if 'discounting' not in version_keys:
@@ -58,13 +71,62 @@ def run_regression_test(test):
 
     stat, _ = criterion_function(df, questions, cutoffs, paras_obj,
                                  version, sds, **version_specific)
-    np.testing.assert_almost_equal(stat, crit_val)
+
+    return stat
+
+
+def read_vault(fname):
+    """Read the tests from a regression vault.
+
+    Each test is a dictionary with the initialization dictionary, the value of the criterion
+    function and the time it took to create the test. The legacy vaults, i.e. a pickle of tuples,
+    are still supported but do not provide any timing information.
+    """
+    if fname.endswith('.pkl'):
+        with open(fname, 'rb') as infile:
+            return [{'init_dict': init_dict, 'stat': stat, 'seconds': None}
+                    for init_dict, stat in pkl.load(infile)]
+
+    with open(fname) as infile:
+        header = json.loads(infile.readline())
+        if header.get('format') != VAULT_FORMAT or header.get('version') != VAULT_VERSION:
+            raise AssertionError('regression vault in unknown format')
+
+        return [json.loads(line, object_pairs_hook=_restore_keys) for line in infile]
+
+
+def write_vault(tests, fname, is_append=False):
+    """Write tests to a regression vault, possibly appending them to an existing one."""
+    is_header = not (is_append and os.path.exists(fname))
+
+    with open(fname, 'a' if is_append else 'w') as outfile:
+        if is_header:
+            header = {'format': VAULT_FORMAT, 'version': VAULT_VERSION}
+            outfile.write(json.dumps(header) + '\n')
+
+        for test in tests:
+            outfile.write(json.dumps(_to_builtin(test)) + '\n')
+
+
+def _to_builtin(obj):
+    """Convert the NUMPY types in the initialization dictionary to their builtin counterparts."""
+    if isinstance(obj, dict):
+        return {_to_builtin(key): _to_builtin(value) for key, value in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_to_builtin(value) for value in obj]
+    elif isinstance(obj, np.generic):
+        return obj.item()
+    else:
+        return obj
+
+
+def _restore_keys(pairs):
+    """Restore the integer labels of the questions, which are turned into strings by JSON."""
+    return {int(key) if key.isdigit() else key: value for key, value in pairs}
 
 
 def test_1():
     """Run a small sample of the regression test battery."""
-    tests = pkl.load(open(PACKAGE_DIR + '/tests/regression_vault.trempy.pkl', 'rb'))
-    i = 0
+    tests = read_vault(PACKAGE_DIR + '/tests/regression_vault.trempy.jsonl')
     for test in tests[:10]:
-        i = i + 1
-        run_regression_test(test)
+        run_regression_test((test['init_dict'], test['stat']))
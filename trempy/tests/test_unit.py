@@ -1,14 +1,52 @@
 """This module contains some unit tests."""
+import threading
+import fractions
 import filecmp
+import json
+import math
+import os
 
+import pandas as pd
 import numpy as np
 
 from trempy.interface.interface_copulpy import get_copula_nonstationary
+from trempy.interface.clsUtilityModel import UtilityModelCls
+from trempy.shared.shared_auxiliary import determine_optimal_compensation
+from trempy.shared.clsLikelihood import ChunkedLikelihoodCls
+from trempy.shared.shared_auxiliary import get_optimal_compensations
+from trempy.shared.shared_auxiliary import get_expected_utilities_a
 from trempy.shared.shared_auxiliary import dist_class_attributes
+from trempy.shared.shared_auxiliary import criterion_function
+from trempy.shared.shared_auxiliary import expected_utility_a
+from trempy.shared.shared_auxiliary import get_likelihood
+from trempy.shared.shared_auxiliary import get_exact_sum
+from trempy.process.process_auxiliary import write_dataset
+from trempy.process.process_auxiliary import get_dataset_fname
+from trempy.estimate.estimate_inference import get_inference_steps
+from trempy.estimate.estimate_inference import get_free_positions
+from trempy.estimate.estimate_auxiliary import get_latin_hypercube
+from trempy.estimate.estimate_inference import get_hessian
+from trempy.estimate.estimate_inference import get_scores
+from trempy.estimate.estimate_auxiliary import StartClass
+from trempy.process.process_auxiliary import read_dataset
+from trempy.shared.shared_auxiliary import print_init_dict
+from trempy.tests.test_auxiliary import get_version_specific
 from trempy.tests.test_auxiliary import get_random_init
+from trempy.tests.test_auxiliary import random_dict
 from trempy.config_trempy import PREFERENCE_PARAMETERS
+from trempy.process.process import read_fingerprints
 from trempy.tests.test_auxiliary import get_bounds
+from trempy.process.process import get_fingerprint
 from trempy.tests.test_auxiliary import get_value
+from trempy.process.process import process_checks
+from trempy.shared.clsLikelihood import LikelihoodCls
+from trempy.shared.clsExecutor import ExecutorCls
+from trempy.config_trempy import NEVER_SWITCHERS
+from trempy.config_trempy import LOTTERY_BOUNDS
+from trempy.config_trempy import QUESTIONS_ALL
+from trempy.config_trempy import EXACT_SCALE
+from trempy.config_trempy import HUGE_FLOAT
+from trempy.process.process import process
 from trempy.clsModel import ModelCls
 from trempy.read.read import read
 from trempy import simulate
@@ -140,3 +178,565 @@ def test_6():
                         lhs = unrestricted_weights[t]
 
                     np.testing.assert_equal(c_t == lhs, True)
+
+
+def test_7():
+    """Ensure that the pickle and columnar storage of a dataset are processed identically."""
+    for _ in range(10):
+        num_agents = np.random.randint(1, 20)
+        questions = sorted(np.random.choice(QUESTIONS_ALL, size=5, replace=False).tolist())
+
+        data = []
+        for i in range(num_agents):
+            for q in questions:
+                data += [[i, q, np.random.choice([np.random.uniform(-10, 10), NEVER_SWITCHERS])]]
+
+        df = pd.DataFrame(data, columns=['Individual', 'Question', 'Compensation'])
+        df.set_index(['Individual', 'Question'], inplace=True, drop=False)
+
+        est_agents = np.random.randint(1, num_agents + 1)
+        num_skip = np.random.randint(0, num_agents - est_agents + 1)
+        subset = sorted(np.random.choice(questions, size=3, replace=False).tolist())
+        cutoffs = {q: [-HUGE_FLOAT, HUGE_FLOAT] for q in QUESTIONS_ALL}
+
+        rslt = []
+        for dataset_format in ['pickle', 'columnar']:
+            fname = write_dataset(df, 'test', dataset_format)
+            rslt += [process(fname, subset, num_skip, est_agents, cutoffs)]
+
+            np.testing.assert_equal(read_dataset(fname).equals(df), True)
+
+        pd.testing.assert_frame_equal(*rslt)
+
+
+def test_8():
+    """Ensure that the checks of the observed dataset detect flawed datasets."""
+    for _ in range(10):
+        num_agents = np.random.randint(1, 20)
+        questions = sorted(np.random.choice(QUESTIONS_ALL, size=5, replace=False).tolist())
+        cutoffs = {q: [-HUGE_FLOAT, HUGE_FLOAT] for q in QUESTIONS_ALL}
+        for q in questions:
+            cutoffs[q] = [-5.0, 5.0]
+
+        data = []
+        for i in range(num_agents):
+            for q in questions:
+                data += [[i, q, np.random.choice([np.random.uniform(-5, 5), NEVER_SWITCHERS])]]
+
+        df = pd.DataFrame(data, columns=['Individual', 'Question', 'Compensation'])
+        df.set_index(['Individual', 'Question'], inplace=True)
+        process_checks(df, num_agents, questions, cutoffs)
+
+        # We now corrupt the dataset by removing, duplicating or changing a single observation.
+        idx = np.random.randint(0, df.shape[0])
+        df_flawed = []
+        df_flawed += [df.drop(df.index[idx])]
+        df_flawed += [pd.concat([df, df.iloc[[idx]]])]
+
+        df_flawed += [df.copy()]
+        df_flawed[-1].iloc[idx, 0] = 10.0
+
+        for df_flawed in df_flawed:
+            np.testing.assert_raises(AssertionError, process_checks, df_flawed, num_agents,
+                                     questions, cutoffs)
+
+        # The validation of a request is only recorded once it is successful.
+        fname = write_dataset(df, 'test', 'pickle')
+        process(fname, questions, 0, num_agents, cutoffs, fingerprint=True)
+        key = get_fingerprint(fname, questions, 0, num_agents, cutoffs)
+        np.testing.assert_equal(key in read_fingerprints(fname), True)
+
+        # Repeated validations do not grow the cache and a rewritten dataset replaces its entries.
+        num_entries = len(read_fingerprints(fname))
+        process(fname, questions, 0, num_agents, cutoffs, fingerprint=True)
+        np.testing.assert_equal(len(read_fingerprints(fname)), num_entries)
+
+        stat = os.stat(fname)
+        os.utime(fname, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        process(fname, questions, 0, num_agents, cutoffs, fingerprint=True)
+        fingerprints = read_fingerprints(fname)
+        np.testing.assert_equal(key in fingerprints, False)
+        np.testing.assert_equal(len(fingerprints), num_entries)
+
+
+def test_9():
+    """Ensure that the instrumentation records all phases of an estimation."""
+    init_dict = get_random_init({'maxfun': 2})
+    init_dict['ESTIMATION']['instrument'] = True
+    print_init_dict(init_dict)
+
+    simulate('test.trempy.ini')
+    estimate('test.trempy.ini')
+
+    with open('est.trempy.json') as infile:
+        rslt = json.load(infile)
+
+    for label in ['copula', 'root-finding', 'likelihood', 'parameters', 'logging']:
+        np.testing.assert_equal(rslt['phases'][label]['calls'] > 0, True)
+
+
+def test_10():
+    """Ensure that a stop request ends the estimation at the best point so far."""
+    constr = {'maxfun': 50, 'detailed': False, 'optimizer': 'SCIPY-POWELL', 'start': 'init'}
+    init_dict = get_random_init(constr)
+    init_dict['ESTIMATION']['adaptive'] = False
+    init_dict['ESTIMATION']['solver'] = 'brenth'
+    print_init_dict(init_dict)
+
+    simulate('test.trempy.ini')
+
+    # A callback receives the progress after each evaluation and requests the stop.
+    progress = []
+    num_eval = np.random.randint(1, 5)
+
+    def callback(info):
+        progress.append(info['f_step'])
+        return info['num_eval'] == num_eval
+
+    fval, _ = estimate('test.trempy.ini', callbacks=[callback])
+    np.testing.assert_equal(len(progress), num_eval)
+    np.testing.assert_equal(fval, min(progress))
+
+    # The stop event is shared with the estimation and can be set from anywhere.
+    stop_event = threading.Event()
+    stop_event.set()
+
+    fval, _ = estimate('test.trempy.ini', stop_event=stop_event)
+    with open('est.trempy.log') as infile:
+        np.testing.assert_equal('Optimization stopped by request.' in infile.read(), True)
+
+
+def test_11():
+    """Ensure that the warm-started root-finding finds the same optimal compensations."""
+    get_random_init()
+    model_obj = ModelCls('test.trempy.ini')
+
+    args = ['paras_obj', 'questions', 'version']
+    paras_obj, questions, version = dist_class_attributes(model_obj, *args)
+
+    version_specific = get_version_specific(model_obj)
+
+    m_optimal = get_optimal_compensations(version, paras_obj, questions, **version_specific)
+
+    # We start from a perturbation of the solution that might even be outside the bounds.
+    m_start = dict()
+    for q in questions:
+        lower, upper = LOTTERY_BOUNDS[q]
+        m_start[q] = m_optimal[q] + np.random.uniform(-0.5, 0.5) * (upper - lower)
+
+    rslt = get_optimal_compensations(version, paras_obj, questions, m_start, **version_specific)
+    for q in questions:
+        np.testing.assert_almost_equal(rslt[q], m_optimal[q], decimal=6)
+
+
+def test_12():
+    """Ensure that the adaptive tolerance reports the criterion function at full precision."""
+    constr = {'maxfun': np.random.randint(2, 50), 'detailed': False, 'start': 'init'}
+    init_dict = get_random_init(constr)
+    init_dict['ESTIMATION']['adaptive'] = True
+    print_init_dict(init_dict)
+
+    simulate('test.trempy.ini')
+    fval, x_econ_all_step = estimate('test.trempy.ini')
+
+    model_obj = ModelCls('test.trempy.ini')
+    args = ['paras_obj', 'questions', 'cutoffs', 'version', 'est_file', 'est_agents', 'num_skip']
+    paras_obj, questions, cutoffs, version, est_file, est_agents, num_skip = \
+        dist_class_attributes(model_obj, *args)
+
+    version_specific = get_version_specific(model_obj)
+
+    df = process(est_file, questions, num_skip, est_agents, cutoffs)
+    paras_obj.set_values('econ', 'all', x_econ_all_step)
+    sds = x_econ_all_step[paras_obj.attr['nparas_econ']:]
+
+    stat, _ = criterion_function(df, questions, cutoffs, paras_obj, version, sds,
+                                 **version_specific)
+    np.testing.assert_equal(fval, stat)
+
+
+def test_13():
+    """Ensure that the shared evaluation of the utility points does not change the results."""
+    get_random_init({'version': 'nonstationary'})
+    model_obj = ModelCls('test.trempy.ini')
+
+    paras_obj, questions = dist_class_attributes(model_obj, 'paras_obj', 'questions')
+
+    nparas_econ = paras_obj.attr['nparas_econ']
+    copula = get_copula_nonstationary(
+        *paras_obj.get_values('econ', 'all')[:nparas_econ],
+        discounting=paras_obj.attr['discounting'],
+        stationary_model=paras_obj.attr['stationary_model'],
+        df_other=paras_obj.attr['df_other'])
+
+    eu_a = get_expected_utilities_a(copula, questions)
+    for q in questions:
+        np.testing.assert_equal(eu_a[q], expected_utility_a(copula, q))
+        np.testing.assert_equal(determine_optimal_compensation(copula, q, eu_a=eu_a[q]),
+                                determine_optimal_compensation(copula, q))
+
+
+def test_14():
+    """Ensure that the Chebyshev solver finds the same optimal compensations."""
+    get_random_init()
+    model_obj = ModelCls('test.trempy.ini')
+
+    args = ['paras_obj', 'questions', 'version']
+    paras_obj, questions, version = dist_class_attributes(model_obj, *args)
+
+    version_specific = get_version_specific(model_obj)
+
+    m_optimal = get_optimal_compensations(version, paras_obj, questions, **version_specific)
+    rslt = get_optimal_compensations(version, paras_obj, questions, solver='chebyshev',
+                                     **version_specific)
+    for q in questions:
+        np.testing.assert_almost_equal(rslt[q], m_optimal[q], decimal=6)
+
+
+def test_15():
+    """Ensure that the persistent utility model only rebuilds the copula if required."""
+    get_random_init()
+    model_obj = ModelCls('test.trempy.ini')
+
+    args = ['paras_obj', 'questions', 'version']
+    paras_obj, questions, version = dist_class_attributes(model_obj, *args)
+
+    version_specific = get_version_specific(model_obj)
+
+    utility_obj = UtilityModelCls(paras_obj, questions, **version_specific)
+
+    m_optimal = get_optimal_compensations(version, paras_obj, questions, **version_specific)
+    np.testing.assert_equal(utility_obj.get_optimal_compensations(paras_obj), m_optimal)
+
+    np.testing.assert_equal(utility_obj.get_attr('is_rebuilt'), True)
+    np.testing.assert_equal(utility_obj.get_optimal_compensations(paras_obj), m_optimal)
+    np.testing.assert_equal(utility_obj.get_attr('is_rebuilt'), False)
+
+    # A change in the preference parameters requires a new copula.
+    nparas_econ = paras_obj.attr['nparas_econ']
+    x_econ_all = paras_obj.get_values('econ', 'all')
+    for i in range(nparas_econ):
+        value, is_fixed, bounds = paras_obj.get_para(PREFERENCE_PARAMETERS[version][i])
+        if is_fixed or value is None:
+            continue
+        x_econ_all[i] = (value + bounds[0]) / 2.0
+        break
+    else:
+        return
+
+    paras_obj.set_values('econ', 'all', x_econ_all)
+    utility_obj.update(paras_obj)
+    np.testing.assert_equal(utility_obj.get_attr('is_rebuilt'), True)
+
+
+def test_16():
+    """Ensure that all backends determine the same optimal compensations."""
+    get_random_init()
+    model_obj = ModelCls('test.trempy.ini')
+
+    args = ['paras_obj', 'questions', 'version']
+    paras_obj, questions, version = dist_class_attributes(model_obj, *args)
+
+    version_specific = get_version_specific(model_obj)
+
+    m_optimal = get_optimal_compensations(version, paras_obj, questions, **version_specific)
+
+    for backend in ['serial', 'threads', 'processes']:
+        executor_obj = ExecutorCls(backend, np.random.randint(1, 5))
+        utility_obj = UtilityModelCls(paras_obj, questions, executor_obj, **version_specific)
+
+        np.testing.assert_equal(utility_obj.get_optimal_compensations(paras_obj), m_optimal)
+        executor_obj.close()
+
+        # The copula is only built locally if the worker processes do not rebuild it.
+        is_local = utility_obj.get_attr('copula') is not None
+        np.testing.assert_equal(is_local, not executor_obj.is_remote())
+
+        # Each question is assigned to exactly one worker.
+        chunks = executor_obj.get_chunks(questions)
+        np.testing.assert_equal(sorted(sum(chunks, [])), sorted(questions))
+
+
+def test_17():
+    """Ensure that the likelihood does not depend on the number of shards or the order of data."""
+    get_random_init()
+    df, _ = simulate('test.trempy.ini')
+    model_obj = ModelCls('test.trempy.ini')
+
+    args = ['paras_obj', 'questions', 'cutoffs', 'version']
+    paras_obj, questions, cutoffs, version = dist_class_attributes(model_obj, *args)
+
+    version_specific = get_version_specific(model_obj)
+
+    m_optimal = get_optimal_compensations(version, paras_obj, questions, **version_specific)
+    sds = paras_obj.get_values('econ', 'all')[paras_obj.attr['nparas_econ']:]
+
+    stat = get_likelihood(df, questions, cutoffs, paras_obj, sds, m_optimal)
+
+    df_shuffled = df.sample(frac=1.0)
+    for shards in [1, 2, np.random.randint(3, 6)]:
+        likelihood_obj = LikelihoodCls(df_shuffled, questions, cutoffs, shards)
+        for _ in range(2):
+            np.testing.assert_equal(likelihood_obj.evaluate(paras_obj, sds, m_optimal), stat)
+        likelihood_obj.close()
+
+    # The exact sums are correctly rounded.
+    values = np.random.normal(size=1000) * 10.0 ** np.random.randint(-200, 200, size=1000)
+    total = get_exact_sum(values)
+    np.testing.assert_equal(float(fractions.Fraction(total, EXACT_SCALE)), math.fsum(values))
+
+
+def test_18():
+    """Ensure that the chunked evaluation of the likelihood is the same as in memory."""
+    constr = dict()
+    constr['detailed'] = False
+    constr['start'] = 'init'
+    constr['maxfun'] = 1
+
+    init_dict = random_dict(constr)
+    init_dict['SIMULATION']['format'] = 'columnar'
+    init_dict['ESTIMATION']['file'] = get_dataset_fname(init_dict['SIMULATION']['file'],
+                                                        'columnar')
+    print_init_dict(init_dict)
+    simulate('test.trempy.ini')
+
+    stats = []
+    for chunk in [None, np.random.randint(1, 10)]:
+        init_dict['ESTIMATION']['chunk'] = chunk
+        print_init_dict(init_dict)
+        stats += [estimate('test.trempy.ini')[0]]
+
+    np.testing.assert_equal(stats[0], stats[1])
+
+
+def test_19():
+    """Ensure that the automatic starting values match the moments generated by the model."""
+    get_random_init()
+    model_obj = ModelCls('test.trempy.ini')
+
+    args = ['paras_obj', 'questions', 'version']
+    paras_obj, questions, version = dist_class_attributes(model_obj, *args)
+
+    version_specific = get_version_specific(model_obj)
+
+    m_optimal = get_optimal_compensations(version, paras_obj, questions, **version_specific)
+    m_optimal_obs = np.array([m_optimal[q] for q in questions])
+    m_optimal_obs[np.random.choice([True, False], size=len(questions))] = np.nan
+
+    executor_obj = ExecutorCls(np.random.choice(['serial', 'threads']), np.random.randint(1, 3))
+    start_obj = StartClass(questions, m_optimal_obs, paras_obj, executor_obj,
+                           **version_specific)
+
+    x_vals, bounds = start_obj.get_free()
+    if len(x_vals) > 0 and np.all(x_vals > bounds[:, 0]) and np.all(x_vals < bounds[:, 1]):
+        np.testing.assert_almost_equal(start_obj.residuals(x_vals), 0.0)
+
+        jac = start_obj.jacobian(x_vals)
+        np.testing.assert_equal(jac.shape, ((~np.isnan(m_optimal_obs)).sum(), len(x_vals)))
+
+        x_vals_step = start_obj.optimize()
+        np.testing.assert_equal(start_obj.get_attr('f_step') <= start_obj.get_attr('f_start'),
+                                True)
+        np.testing.assert_equal(np.all(x_vals_step >= bounds[:, 0]), True)
+        np.testing.assert_equal(np.all(x_vals_step <= bounds[:, 1]), True)
+
+    executor_obj.close()
+
+
+def test_20():
+    """Ensure that the pre-search for the starting values covers the bounds and improves them."""
+    bounds = np.sort(np.random.uniform(-10, 10, size=(np.random.randint(1, 5), 2)), axis=1)
+    num_points = np.random.randint(1, 100)
+
+    design = get_latin_hypercube(num_points, bounds)
+    np.testing.assert_equal(design, get_latin_hypercube(num_points, bounds))
+
+    # Each stratum of each parameter contains exactly one point of the design.
+    strata = np.floor((design - bounds[:, 0]) / (bounds[:, 1] - bounds[:, 0]) * num_points)
+    for j in range(bounds.shape[0]):
+        np.testing.assert_equal(np.sort(strata[:, j]), range(num_points))
+
+    get_random_init()
+    model_obj = ModelCls('test.trempy.ini')
+
+    args = ['paras_obj', 'questions', 'version']
+    paras_obj, questions, version = dist_class_attributes(model_obj, *args)
+
+    version_specific = get_version_specific(model_obj)
+
+    m_optimal_obs = np.random.uniform(size=len(questions))
+
+    start_obj = StartClass(questions, m_optimal_obs, paras_obj, **version_specific)
+    if any(start_obj.get_attr('is_free')):
+        x_vals_best = start_obj.presearch(num_points)
+        f_presearch = start_obj.get_attr('f_step')
+        np.testing.assert_almost_equal(np.mean(start_obj.residuals(x_vals_best[0]) ** 2),
+                                       f_presearch)
+
+        # The local search starts from the best points of the design.
+        start_obj = StartClass(questions, m_optimal_obs, paras_obj, **version_specific)
+        start_obj.optimize(num_points)
+        np.testing.assert_equal(start_obj.get_attr('f_step') <= f_presearch, True)
+
+
+def test_21():
+    """Ensure that the inference at the estimate reuses the optimal compensations correctly."""
+    get_random_init()
+    df, _ = simulate('test.trempy.ini')
+    model_obj = ModelCls('test.trempy.ini')
+
+    args = ['paras_obj', 'questions', 'cutoffs', 'version']
+    paras_obj, questions, cutoffs, version = dist_class_attributes(model_obj, *args)
+
+    version_specific = get_version_specific(model_obj)
+
+    utility_obj = UtilityModelCls(paras_obj, questions, **version_specific)
+    likelihood_obj = LikelihoodCls(df, questions, cutoffs)
+
+    x_econ_all = paras_obj.get_values('econ', 'all')
+    nparas_econ = paras_obj.attr['nparas_econ']
+
+    m_optimal = get_optimal_compensations(version, paras_obj, questions, **version_specific)
+    hessian = get_hessian(utility_obj, likelihood_obj, paras_obj, x_econ_all)
+    np.testing.assert_equal(hessian, hessian.T)
+
+    # The entries for the standard deviations only require the evaluation of the likelihood.
+    positions = get_free_positions(paras_obj, questions)
+    steps = get_inference_steps(paras_obj, questions, x_econ_all)
+    for i, pos in enumerate(positions):
+        if pos < nparas_econ:
+            continue
+
+        stats = []
+        for step in [2 * steps[i], -2 * steps[i], 0.0]:
+            x_econ_shifted = list(x_econ_all)
+            x_econ_shifted[pos] += step
+            sds = x_econ_shifted[nparas_econ:]
+            stats += [get_likelihood(df, questions, cutoffs, paras_obj, sds, m_optimal)]
+
+        stat = (stats[0] + stats[1] - 2 * stats[2]) / (4.0 * steps[i] ** 2)
+        np.testing.assert_equal(hessian[i, i], stat)
+
+    init_dict = get_random_init({'maxfun': 1})
+    init_dict['ESTIMATION']['inference'] = 'hessian'
+    print_init_dict(init_dict)
+    simulate('test.trempy.ini')
+    _, x_econ_all_step, results_obj = estimate('test.trempy.ini')
+
+    num_free = len(ModelCls('test.trempy.ini').get_attr('paras_obj').get_values('econ', 'free'))
+    np.testing.assert_equal(results_obj.get_attr('cov').shape, (num_free, num_free))
+    np.testing.assert_equal('Standard Errors' in open('est.trempy.info').read(), True)
+
+
+def test_22():
+    """Ensure that the contributions of each observation and agent add up to the likelihood."""
+    constr = dict()
+    constr['detailed'] = False
+    constr['start'] = 'init'
+    constr['maxfun'] = np.random.randint(2, 6)
+
+    init_dict = random_dict(constr)
+    init_dict['SIMULATION']['format'] = 'columnar'
+    init_dict['ESTIMATION']['file'] = get_dataset_fname(init_dict['SIMULATION']['file'],
+                                                        'columnar')
+    init_dict['ESTIMATION']['inference'] = np.random.choice(['opg', 'sandwich'])
+    init_dict['ESTIMATION']['optimizer'] = 'BHHH'
+    print_init_dict(init_dict)
+    simulate('test.trempy.ini')
+
+    model_obj = ModelCls('test.trempy.ini')
+
+    args = ['paras_obj', 'questions', 'cutoffs', 'version', 'est_file', 'num_skip', 'est_agents']
+    paras_obj, questions, cutoffs, version, est_file, num_skip, est_agents = \
+        dist_class_attributes(model_obj, *args)
+
+    version_specific = get_version_specific(model_obj)
+
+    df_obs = process(est_file, questions, num_skip, est_agents, cutoffs)
+
+    m_optimal = get_optimal_compensations(version, paras_obj, questions, **version_specific)
+    sds = paras_obj.get_values('econ', 'all')[paras_obj.attr['nparas_econ']:]
+
+    likelihood_obj = LikelihoodCls(df_obs, questions, cutoffs)
+    fval = likelihood_obj.evaluate(paras_obj, sds, m_optimal)
+    num_obs = likelihood_obj.get_attr('num_obs')
+
+    contribs = likelihood_obj.get_contributions(paras_obj, sds, m_optimal)
+    np.testing.assert_equal(-math.fsum(contribs) / num_obs, fval)
+
+    # The chunked evaluation results in the same contributions of each agent.
+    contribs_agent = likelihood_obj.get_contributions(paras_obj, sds, m_optimal, by_agent=True)
+    chunked_obj = ChunkedLikelihoodCls(est_file, questions, num_skip, est_agents, cutoffs,
+                                       np.random.randint(1, 10))
+    np.testing.assert_almost_equal(
+        chunked_obj.get_contributions(paras_obj, sds, m_optimal, by_agent=True), contribs_agent)
+
+    # The gradients of each agent are the sum of the gradients of its observations.
+    utility_obj = UtilityModelCls(paras_obj, questions, **version_specific)
+    x_econ_all = paras_obj.get_values('econ', 'all')
+
+    scores = get_scores(utility_obj, likelihood_obj, paras_obj, x_econ_all, m_optimal)
+    scores_agent = get_scores(utility_obj, likelihood_obj, paras_obj, x_econ_all, m_optimal,
+                              by_agent=True)
+    np.testing.assert_equal(scores.shape[0], contribs.shape[0])
+    np.testing.assert_almost_equal(scores_agent.sum(axis=0), scores.sum(axis=0))
+
+    _, _, results_obj = estimate('test.trempy.ini')
+
+    num_free = len(paras_obj.get_values('econ', 'free'))
+    np.testing.assert_equal(results_obj.get_attr('cov').shape, (num_free, num_free))
+    np.testing.assert_equal(results_obj.get_attr('method'), init_dict['ESTIMATION']['inference'])
+
+
+def test_23():
+    """Ensure that the weights of the agents are the same as copies of their observations."""
+    get_random_init()
+    df, _ = simulate('test.trempy.ini')
+    model_obj = ModelCls('test.trempy.ini')
+
+    args = ['paras_obj', 'questions', 'cutoffs', 'version']
+    paras_obj, questions, cutoffs, version = dist_class_attributes(model_obj, *args)
+
+    version_specific = get_version_specific(model_obj)
+
+    m_optimal = get_optimal_compensations(version, paras_obj, questions, **version_specific)
+    sds = paras_obj.get_values('econ', 'all')[paras_obj.attr['nparas_econ']:]
+
+    agents = df.index.get_level_values(0).unique()
+    weights = np.random.randint(0, 3, size=agents.shape[0])
+    weights[0] += 1
+
+    # We construct the sample with the corresponding copies of each agent.
+    dfs = []
+    for agent, weight in zip(agents, weights):
+        for _ in range(weight):
+            df_agent = df.xs(agent, level=0, drop_level=False).copy()
+            levels = [[len(dfs)] * df_agent.shape[0], df_agent.index.get_level_values(1)]
+            df_agent.index = pd.MultiIndex.from_arrays(levels, names=df.index.names)
+            dfs += [df_agent]
+    df_copies = pd.concat(dfs)
+
+    stat = LikelihoodCls(df_copies, questions, cutoffs).evaluate(paras_obj, sds, m_optimal)
+    for shards in [1, 2]:
+        likelihood_obj = LikelihoodCls(df, questions, cutoffs, shards, weights)
+        np.testing.assert_equal(likelihood_obj.evaluate(paras_obj, sds, m_optimal), stat)
+        likelihood_obj.close()
+
+
+def test_24():
+    """Ensure that an estimation with worker processes is the same as a serial estimation."""
+    init_dict = get_random_init({'version': 'scaled_archimedean', 'maxfun': 5, 'start': 'init',
+                                 'detailed': False})
+    init_dict['ESTIMATION']['inference'] = 'none'
+    init_dict['ESTIMATION']['chunk'] = None
+    simulate('test.trempy.ini')
+
+    rslt = []
+    for backend, workers in [('serial', 1), ('processes', 2)]:
+        init_dict['ESTIMATION']['backend'] = backend
+        init_dict['ESTIMATION']['workers'] = workers
+        print_init_dict(init_dict)
+        rslt += [estimate('test.trempy.ini')]
+
+    np.testing.assert_equal(rslt[1][0], rslt[0][0])
+    np.testing.assert_equal(rslt[1][1], rslt[0][1])